@@ -13,7 +13,64 @@ APPLICATION_NAME: str = "TBASOURCEMATCHER-SERVICE"
 APPLICATION_PORT: int = int(os.environ["APPLICATION_PORT"])
 CONTENT_TYPE: str = os.environ["CONTENT_TYPE"]
 ENVIRONMENT_VARIABLE: str = os.environ["ENVIRONMENT_VARIABLE"]
-WORKERS = 2
+# auto (orjson > ujson > json), orjson, ujson or json
+JSON_CODEC: str = os.environ.get("JSON_CODEC", "auto").lower()
+# responses this big are gzip compressed for clients sending Accept-Encoding: gzip
+RESPONSE_GZIP_MIN_LENGTH: int = int(os.environ.get("RESPONSE_GZIP_MIN_LENGTH", 1024))
+RESPONSE_GZIP_LEVEL: int = int(os.environ.get("RESPONSE_GZIP_LEVEL", 6))
+# audits with more participant rows than this are stored in the docstore, 0 keeps them inline
+AUDIT_OFFLOAD_ROWS: int = int(os.environ.get("AUDIT_OFFLOAD_ROWS", 0))
+# fixed seed makes the pptVerifyTba participant sample reproducible, unset draws a new one per request
+PPT_SAMPLE_SEED = int(os.environ["PPT_SAMPLE_SEED"]) if os.environ.get("PPT_SAMPLE_SEED") else None
+# SQLite file remembering verified participants per client/pjmId, empty samples uniformly at random
+PPT_COVERAGE_DB: str = os.environ.get("PPT_COVERAGE_DB", "")
+# seconds a verified participant is ranked behind the unverified ones (default 7 days)
+PPT_COVERAGE_TTL: int = int(os.environ.get("PPT_COVERAGE_TTL", 7 * 24 * 3600))
+# threads inquiring and matching the file/identifiers of a request concurrently, 0 or 1 runs them one by one
+PIPELINE_WORKERS: int = int(os.environ.get("PIPELINE_WORKERS", 0))
+# processes building Rule Engine/TBA Update payloads and audit rows, 0 keeps them in-process
+OFFLOAD_WORKERS: int = int(os.environ.get("OFFLOAD_WORKERS", 0))
+# rows a stage needs to be sent to the offload processes
+OFFLOAD_MIN_ROWS: int = int(os.environ.get("OFFLOAD_MIN_ROWS", 5000))
+# participants per Rule Engine request, 0 sends them all in one request
+RULE_ENGINE_BATCH: int = int(os.environ.get("RULE_ENGINE_BATCH", 0))
+# Rule Engine requests of a file/identifier in flight at once
+RULE_ENGINE_IN_FLIGHT: int = int(os.environ.get("RULE_ENGINE_IN_FLIGHT", 4))
+# gzip Rule Engine request bodies (Content-Encoding: gzip), the Rule Engine has to accept them
+RULE_ENGINE_GZIP: bool = os.environ.get("RULE_ENGINE_GZIP", "false").lower() == "true"
+RULE_ENGINE_GZIP_LEVEL: int = int(os.environ.get("RULE_ENGINE_GZIP_LEVEL", 1))
+# participants inquired and matched at a time when pptVerifyTba is ALL, each window's audit rows go to the docstore
+VERIFY_WINDOW: int = int(os.environ.get("VERIFY_WINDOW", 1000))
+# SQLite file of participant row fingerprints and verdicts, unchanged participants reuse their verdict
+DELTA_DB: str = os.environ.get("DELTA_DB", "")
+# seconds a verdict is reused (default 1 day), TBA changes made outside SourceMatch show up after it
+DELTA_TTL: int = int(os.environ.get("DELTA_TTL", 24 * 3600))
+# bytes of decoded docstore frames each worker keeps, 0 decodes every fetch
+FRAME_CACHE_BYTES: int = int(os.environ.get("FRAME_CACHE_BYTES", 0))
+# seconds a cached frame is used without revalidating it, a key rewritten in the docstore meanwhile isn't seen
+FRAME_CACHE_TTL: float = float(os.environ.get("FRAME_CACHE_TTL", 30))
+# local directory where decoded frames are shared by all workers, takes over from FRAME_CACHE_BYTES
+SHARED_FRAME_DIR: str = os.environ.get("SHARED_FRAME_DIR", "")
+SHARED_FRAME_BYTES: int = int(os.environ.get("SHARED_FRAME_BYTES", 2 * 1024 ** 3))
+# seconds TBA Inquiry results are reused across requests, 0 disables the cache
+INQUIRY_CACHE_TTL: int = int(os.environ.get("INQUIRY_CACHE_TTL", 0))
+# participants kept in each worker's in-process tier
+INQUIRY_CACHE_SIZE: int = int(os.environ.get("INQUIRY_CACHE_SIZE", 10000))
+# CACHES alias shared by the workers (e.g. "inquiry"), empty keeps the cache in-process
+INQUIRY_CACHE_SHARED: str = os.environ.get("INQUIRY_CACHE_SHARED", "")
+# evaluate plain comparisons, simple Compare with TBA rules and report comparisons without a rule in-process
+LOCAL_RULES: bool = os.environ.get("LOCAL_RULES", "false").lower() == "true"
+
+# ------------------------- GUNICORN PROFILE VARIABLES -------------------------
+# dev: single reloading sync worker, prod: CPU sized gthread workers, anything else fails at startup
+GUNICORN_PROFILE: str = os.environ.get("GUNICORN_PROFILE", "prod").lower()
+# 0 means derive from CPU count (2 * cores + 1)
+WORKERS: int = int(os.environ.get("WORKERS", 0))
+WORKER_CLASS: str = os.environ.get("WORKER_CLASS", "gthread")
+WORKER_THREADS: int = int(os.environ.get("WORKER_THREADS", 4))
+WORKER_TIMEOUT: int = int(os.environ.get("WORKER_TIMEOUT", 300))
+MAX_REQUESTS: int = int(os.environ.get("MAX_REQUESTS", 500))
+MAX_REQUESTS_JITTER: int = int(os.environ.get("MAX_REQUESTS_JITTER", 50))
 
 # -------------------------- PROJECT URL VARIABLES ---------------------------
 EUREKA_URL: str = os.environ["EUREKA_URL"]
@@ -29,9 +86,13 @@ EXCEL_FORMATTER_URL = ZUUL + "excelformatter/create_excel/"
 
 # ------------------------ Zipkin-kafka Tracing Settings ----------------------
 PROJECT_NAME = "TBASourceMatcher"
+# ZIPKIN_URL is the V2 spans endpoint (http://<zipkin>:9411/api/v2/spans), empty disables tracing
 ZIPKIN_URL: str = os.environ.get("ZIPKIN_URL", "")
 ZIPKIN_SPAN: int = 9000
-ZIPKIN_SAMPLE_RATE: int = 100
+ZIPKIN_SAMPLE_RATE: float = float(os.environ.get("ZIPKIN_SAMPLE_RATE", 100))
+ZIPKIN_QUEUE_SIZE: int = int(os.environ.get("ZIPKIN_QUEUE_SIZE", 1000))
+ZIPKIN_BATCH_SIZE: int = int(os.environ.get("ZIPKIN_BATCH_SIZE", 50))
+ZIPKIN_FLUSH_INTERVAL: float = float(os.environ.get("ZIPKIN_FLUSH_INTERVAL", 1.0))
 
 # =========================== DJANGO SETTINGS ================================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -92,6 +153,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "inquiry": {
+        "BACKEND": os.environ.get("INQUIRY_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.environ.get("INQUIRY_CACHE_LOCATION", "/tmp/tbasourcematcher-inquiry"),
+        "TIMEOUT": INQUIRY_CACHE_TTL,
+        "OPTIONS": {"MAX_ENTRIES": INQUIRY_CACHE_SIZE},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator", },
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator", },
@@ -110,8 +181,8 @@ USE_L10N = True
 USE_TZ = True
 
 REST_FRAMEWORK = {
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
-    "DEFAULT_PARSER_CLASSES": ("rest_framework.parsers.JSONParser",),
+    "DEFAULT_RENDERER_CLASSES": ("utilities.jsoncodec.JSONCodecRenderer",),
+    "DEFAULT_PARSER_CLASSES": ("utilities.jsoncodec.JSONCodecParser",),
 }
 
 STATIC_URL = "/static/"
@@ -0,0 +1,87 @@
+"""
+Startup phase of the service.
+
+Nothing here runs at import time. The gunicorn master calls
+`register_in_background` from its `when_ready` hook, and `prewarm` before
+forking workers when `preload_app` is enabled. `manage.py runserver`
+registers from the process serving requests.
+"""
+import importlib
+import os
+import sys
+import threading
+
+from TBASourceMatcherV2.settings import EUREKA_URL, APPLICATION_NAME, APPLICATION_PORT
+
+# heavy modules the first request would otherwise pay for
+PREWARM_MODULES = (
+    "pandas",
+    "dateutil.parser",
+    "fileValidation.views",
+)
+
+_registered = threading.Event()
+_lock = threading.Lock()
+
+
+class EurekaRegister:
+    def __init__(self, eureka_url, app_name, instance_port, strategy):
+        self.eureka_url = eureka_url
+        self.app_name = APPLICATION_NAME
+        self.instance_port = instance_port
+        self.strategy = strategy
+        print(self.eureka_url)
+
+    def register(self):
+        import py_eureka_client.eureka_client as eureka_client
+
+        eureka_client.init(
+            eureka_server=self.eureka_url,
+            app_name=self.app_name,
+            instance_port=self.instance_port,
+            ha_strategy=self.strategy,
+        )
+
+
+def register_eureka():
+    """Register with Eureka, failures are logged and never raised"""
+    try:
+        import py_eureka_client.eureka_client as eureka_client
+
+        print("Registering with the Eureka")
+        eurekaclient = EurekaRegister(
+            eureka_url=EUREKA_URL,
+            app_name=APPLICATION_NAME,
+            instance_port=int(os.getenv("TBA_PORT", APPLICATION_PORT)),
+            strategy=eureka_client.HA_STRATEGY_STICK,
+        )
+
+        eurekaclient.register()
+    except AttributeError as aerr:
+        print(f"No Eureka networks found {repr(aerr)}")
+    except Exception as err:
+        print(f"Eureka Registration Failed with {repr(err)}")
+
+
+def register_in_background() -> bool:
+    """
+    Register with Eureka on a daemon thread so an unreachable Eureka never
+    blocks worker boot. Only the first call in a process starts the thread.
+    """
+    if sys.platform == "win32":
+        return False
+    with _lock:
+        if _registered.is_set():
+            return False
+        _registered.set()
+    threading.Thread(target=register_eureka, name="eureka-register", daemon=True).start()
+    return True
+
+
+def prewarm(modules=PREWARM_MODULES):
+    """Import heavy modules so forked workers share them copy-on-write"""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as err:
+            print(f"Prewarm of {module} failed with {repr(err)}")
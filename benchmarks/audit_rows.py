@@ -0,0 +1,106 @@
+"""
+Audit row memory benchmark.
+
+Builds the audit rows of `get_participant_details` as plain dicts and as
+`AuditRow` records and reports the Python memory they hold and the time to
+encode them::
+
+    python -m benchmarks.audit_rows --rows 10000 50000
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+from benchmarks import workload
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "TBASourceMatcherV2.settings")
+
+
+def row_fields(index: int) -> tuple:
+    """Per-participant fields and action fields of one mismatch row"""
+    field = index % 10
+    common = {
+        "id": str(field),
+        "uid": "RQ-BENCH-0001",
+        "participantSsn": workload.participant_id(index),
+        "participantName": "",
+        "fileName": workload.FILE_NAME,
+        "sheetName": "",
+        "dataMismatch": f"Field 0 {field}",
+        "tbaFieldName": f"TBA Field 0 {field}",
+        "mainframeValue": f"VALUE{index:06d}",
+        "tbaValue": f"VALUE{index:06d}X",
+        "ruleName": "",
+        "ruleFailedOnField": [f"Field 0 {field}"],
+        "reason": "Mismatch",
+        "eventName": "",
+        "rerunEvent": "",
+        "noticeCancel": list(),
+        "noticeUpdate": "",
+        "pendingEventName": "",
+        "effectiveDate": "",
+        "resultsVarable": list(),
+        "matchType": "Compare with TBA",
+    }
+    template = {
+        "correctiveAction": ["Human In Loop"],
+        "conditionName": [""],
+        "ifCondition": "Not Met",
+        "actionStatus": "",
+        "updateAction": list(),
+    }
+    return common, template
+
+
+def measure(build, count: int) -> tuple:
+    """(rows, bytes held by the rows, seconds to build them untraced)"""
+    fields = [row_fields(index) for index in range(count)]
+    start = time.perf_counter()
+    rows = [build(common, template) for common, template in fields]
+    elapsed = time.perf_counter() - start
+    del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = [build(common, template) for common, template in fields]
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, held, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit row memory benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    args = parser.parse_args(argv)
+
+    import django
+
+    django.setup()
+    from fileValidation.records import AuditRow
+    from utilities import jsoncodec
+
+    kinds = {
+        "dict": lambda common, template: dict(common, **template),
+        "AuditRow": lambda common, template: AuditRow({**common, **template}),
+    }
+    print(f"{'rows':>8} {'record':>9} {'held (MB)':>10} {'bytes/row':>10} {'build (ms)':>11} {'encode (ms)':>12}")
+    for count in args.rows:
+        encoded = set()
+        for name, build in kinds.items():
+            rows, held, elapsed = measure(build, count)
+            start = time.perf_counter()
+            encoded.add(jsoncodec.dumpb({"MFvsTba": rows}))
+            encode = time.perf_counter() - start
+            print(
+                f"{count:>8} {name:>9} {held / 1024 / 1024:>10.1f} {held / count:>10.0f} "
+                f"{elapsed * 1000:>11.1f} {encode * 1000:>12.1f}"
+            )
+            del rows
+        if len(encoded) != 1:
+            raise RuntimeError("dict and AuditRow rows encode differently")
+
+
+if __name__ == "__main__":
+    main()
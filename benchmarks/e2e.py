@@ -0,0 +1,212 @@
+"""
+End-to-end benchmark of `Processing.post` against local fake services.
+
+    python -m benchmarks.e2e --participants 2000 --match-fields 10 --identifiers 2 --rules 5 \\
+        --action-mix human=0.5,update=0.5 --iterations 5 --concurrency 2 \\
+        --latency inquiry=0.05 --latency rule=0.1
+
+Reports per-stage timings, peak memory and requests/sec. `--save` writes the
+result as json, `--baseline` compares against a saved result and exits with
+status 1 when requests/sec dropped by more than `--tolerance`.
+"""
+import argparse
+import functools
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import workload
+from benchmarks.fakes import FakeServices
+
+URL = "/sourceMatcher/fileVerification/"
+
+# SourceMatch methods timed as stages, missing ones are skipped
+STAGES = (
+    "get_response",
+    "get_ksdfiles_details",
+    "fetch_file_redis",
+    "get_filtered_ppt_from_redis_frame",
+    "get_tba_inquiry_payload",
+    "call_tba_inquiry",
+    "is_not_in_tba",
+    "call_rule_engine",
+    "call_file_update",
+    "call_tba_update",
+)
+
+DEFAULT_ENV = {
+    "APPLICATION_PORT": "8082",
+    "CONTENT_TYPE": "application/json",
+    "ENVIRONMENT_VARIABLE": "bench",
+    "EUREKA_URL": "http://127.0.0.1:1/eureka",
+}
+
+
+class StageTimer:
+    """Accumulate wall time per stage across threads"""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def wrap(self, name: str, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.timings[name].append(elapsed)
+
+        return timed
+
+    def instrument(self, cls):
+        for stage in STAGES:
+            if hasattr(cls, stage):
+                setattr(cls, stage, self.wrap(stage, getattr(cls, stage)))
+
+    def summary(self, iterations: int) -> dict:
+        return {
+            stage: {
+                "calls": len(values),
+                "total_s": sum(values),
+                "per_request_ms": sum(values) / iterations * 1000,
+            }
+            for stage, values in self.timings.items()
+        }
+
+
+def setup_django(fakes: FakeServices):
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ.update(fakes.environ())
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "TBASourceMatcherV2.settings")
+    import django
+
+    django.setup()
+
+
+def parse_latency(values: list) -> dict:
+    latency = dict()
+    for value in values or []:
+        service, seconds = value.split("=", 1)
+        latency[service] = float(seconds)
+    return latency
+
+
+def run(args) -> dict:
+    latency = parse_latency(args.latency)
+    with FakeServices(latency=latency) as fakes:
+        setup_django(fakes)
+        from django.test import Client
+        from fileValidation.utils import SourceMatch
+
+        generated = workload.workload_from_args(args)
+        fakes.load_frames(generated["frames"], workload.pickle_frame)
+        body = json.dumps(generated["request"])
+
+        timer = StageTimer()
+        timer.instrument(SourceMatch)
+        client = Client()
+
+        def one_request(_):
+            start = time.perf_counter()
+            response = client.post(URL, data=body, content_type="application/json")
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200 or response.json().get("status") == "Failed":
+                raise RuntimeError(f"request failed: {response.status_code} {response.content[:500]}")
+            return elapsed
+
+        one_request(0)  # warm up imports and caches
+        timer.timings.clear()
+
+        if args.tracemalloc:
+            tracemalloc.start()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = list(pool.map(one_request, range(args.iterations)))
+        wall = time.perf_counter() - start
+        peak_traced = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        if args.tracemalloc:
+            tracemalloc.stop()
+
+        return {
+            "params": {
+                "participants": args.participants,
+                "match_fields": args.match_fields,
+                "identifiers": args.identifiers,
+                "rules": args.rules,
+                "verify": args.verify,
+                "mismatch_rate": args.mismatch_rate,
+                "action_mix": args.action_mix,
+                "seed": args.seed,
+                "iterations": args.iterations,
+                "concurrency": args.concurrency,
+                "latency": latency,
+            },
+            "requests_per_sec": args.iterations / wall,
+            "latency_ms": {
+                "p50": statistics.median(latencies) * 1000,
+                "max": max(latencies) * 1000,
+            },
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024,
+            "peak_traced_mb": peak_traced / 1024 / 1024 if peak_traced is not None else None,
+            "stages": timer.summary(args.iterations),
+            "downstream_calls": dict(fakes.state.calls),
+        }
+
+
+def report(result: dict):
+    print(f"requests/sec   : {result['requests_per_sec']:.2f}")
+    print(f"latency p50/max: {result['latency_ms']['p50']:.1f} / {result['latency_ms']['max']:.1f} ms")
+    print(f"peak rss       : {result['peak_rss_mb']:.1f} MB (+{result['rss_growth_mb']:.1f} MB during run)")
+    if result["peak_traced_mb"] is not None:
+        print(f"peak traced    : {result['peak_traced_mb']:.1f} MB")
+    print(f"downstream     : {result['downstream_calls']}")
+    print(f"\n{'stage':<36} {'calls':>6} {'ms/request':>12}")
+    for stage, timing in sorted(result["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        print(f"{stage:<36} {timing['calls']:>6} {timing['per_request_ms']:>12.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end SourceMatch benchmark")
+    workload.add_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", action="append", help="service=seconds, services: redis inquiry rule excel update")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace python allocations (slower)")
+    parser.add_argument("--save", help="write result json to this path")
+    parser.add_argument("--baseline", help="compare requests/sec with a saved result")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    report(result)
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(result, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        ratio = result["requests_per_sec"] / baseline["requests_per_sec"]
+        print(f"\nrequests/sec vs baseline: {ratio:.2%}")
+        if ratio < 1 - args.tolerance:
+            print("Regression: throughput dropped beyond tolerance")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Local stand-ins for the downstream services.
+
+One threaded HTTP server answers the Redis docstore, TBA Inquiry, Rule
+Engine, Excel Formatter and TBA Update routes with a configurable latency
+per service. Point the service at it with `FakeServices.environ()`.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from benchmarks.workload import tba_value
+
+REDIS_GET = "/redis/docstore/get"
+REDIS_SET = "/redis/docstore/set"
+TBA_INQUIRY = "/tbaenquiry/inquiry/generalInquiry/"
+TBA_UPDATE = "/tbaupdate/App/update/"
+EXCEL_FORMATTER = "/excelformatter/create_excel/"
+RULE_ENGINE = "/ruleengine/sourceMatch/"
+
+SERVICES = ("redis", "inquiry", "rule", "excel", "update")
+INTERNAL_ID_DEF = "UNMASKEDSSN_INTERNALID"
+
+
+def field_values(fields: list) -> tuple:
+    """(compared element, value) from Rule Engine file/tba field list"""
+    element = fields[0].get("comp_element") if fields else None
+    for field in fields[1:]:
+        if element in field:
+            return element, field[element]
+    return element, None
+
+
+class FakeState:
+    """Shared state of the fake services"""
+
+    def __init__(self, latency: dict = None):
+        self.latency = {service: 0.0 for service in SERVICES}
+        self.latency.update(latency or {})
+        self.docstore = dict()
+        self.calls = {service: 0 for service in SERVICES}
+        self.lock = threading.Lock()
+
+    def hit(self, service: str):
+        with self.lock:
+            self.calls[service] += 1
+        if self.latency[service] > 0:
+            time.sleep(self.latency[service])
+
+    # ---------------------------------------------------------------- inquiry
+    def inquiry(self, body: dict) -> list:
+        success = list()
+        for inquiry in body["inquiryData"]:
+            def_names = [field["inquiryDefName"] for field in inquiry["TBA"]]
+            def_names += [field["inquiryDefName"] for field in inquiry["tbaNoticeInqConfig"]]
+            for participant in inquiry["participants"]:
+                ppt_id = str(next(iter(participant.values())))
+                data = {def_name: tba_value(def_name, ppt_id) for def_name in def_names}
+                if INTERNAL_ID_DEF in data:
+                    data[INTERNAL_ID_DEF] = [{INTERNAL_ID_DEF: f"INT{ppt_id}"}]
+                success.append(data)
+        return [success, list()]
+
+    # ------------------------------------------------------------ rule engine
+    def rule_engine(self, body: dict) -> dict:
+        rule_names = {detail["id"]: detail["ruleName"] for detail in body["sourceMatcherDetails"]}
+        participants = list()
+        for participant in body["participants"]:
+            failed, success = list(), list()
+            for key, file_fields in participant["fileFields"].items():
+                _, file_value = field_values(file_fields)
+                _, tba_val = field_values(participant["tbaFields"].get(key, []))
+                matched = str(file_value).strip() == str(tba_val).strip()
+                (success if matched else failed).append(
+                    {
+                        "id": key,
+                        "uniq": key,
+                        "ruleName": rule_names.get(key, ""),
+                        "conditionName": "",
+                        "fileFieldValue": file_value,
+                        "tbaFieldValue": tba_val,
+                        "reason": "Matched" if matched else "Mismatch",
+                        "resultsVarable": [],
+                    }
+                )
+            participants.append(
+                {"participantId": participant["participantId"], "failedRules": failed, "successRules": success}
+            )
+        return {"participants": participants}
+
+    # ------------------------------------------------------------- tba update
+    def tba_update(self, body: dict) -> dict:
+        response = {
+            "NewUpdate": [
+                {"identifier": item["identifier"], "status": "Success", "fields": item["field_value"]}
+                for item in body.get("requestData", [])
+            ],
+            "TBA_Rerun_response": [
+                {
+                    "identifier": item["identifier"],
+                    "eventName": item.get("event name", item.get("event_name", "")),
+                    "action": item["action"],
+                    "reason": "Success",
+                }
+                for item in body.get("rerun", [])
+            ],
+            "TBA_Notice_response": [
+                {"participantId": item["identifier"], "inquiryDefName": item["inquiryDefName"], "reason": "Success"}
+                for item in body.get("notice", [])
+            ],
+        }
+        # like TBA Update, only answer pending events when they were requested
+        if "pendingEvents" in body:
+            response["TBA_pendingevents_response"] = [
+                {"identifier": item["identifier"], "inquiryDefName": item["inquiryDefName"], "reason": "Success"}
+                for item in body["pendingEvents"]
+            ]
+        return response
+
+    # -------------------------------------------------------- excel formatter
+    def excel_formatter(self, body: dict) -> dict:
+        output_reports = body.get("outputReports") or {
+            detail["fileName"]: [
+                {"identifier_name": "", "sheet_name": detail["sheetNameWoutSpace"], "key": detail["fileName"]}
+            ]
+            for detail in body.get("ksdOutputFileDetails", [])
+        }
+        output_files = body.get("outputFiles") or {name: f"{name}.xlsx" for name in output_reports}
+        return {"status": "Success", "botOutput": {"outputReports": output_reports, "outputFiles": output_files}}
+
+
+def make_handler(state: FakeState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                chunks = list()
+                while True:
+                    size = int(self.rfile.readline().strip(), 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    chunks.append(self.rfile.read(size))
+                    self.rfile.readline()
+                return b"".join(chunks)
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def _send(self, status: int, body, content_type="application/json", headers: dict = None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != REDIS_GET:
+                return self._send(404, {"status": "not found"})
+            state.hit("redis")
+            key = unquote(parse_qs(url.query).get("key", [""])[0])
+            if key not in state.docstore:
+                return self._send(404, {"status": "key not found"})
+            content = state.docstore[key]
+            etag = f'"{hashlib.md5(content).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", headers={"ETag": etag})
+            self._send(200, content, "application/octet-stream", headers={"ETag": etag})
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            body = self._body()
+            if self.headers.get("Content-Encoding", "").lower() == "gzip":
+                import gzip
+
+                body = gzip.decompress(body)
+
+            if path == REDIS_SET:
+                state.hit("redis")
+                match = re.search(rb'filename="([^"]+)"\r\n(?:[^\r\n]+\r\n)*\r\n', body)
+                if match is None:
+                    return self._send(400, {"status": "failed"})
+                boundary = body.split(b"\r\n", 1)[0]
+                content = body[match.end():].split(b"\r\n" + boundary, 1)[0]
+                key = match.group(1).decode("utf-8")
+                state.docstore[key] = content
+                return self._send(201, {"status": "success", "key": key})
+
+            routes = {
+                TBA_INQUIRY: ("inquiry", state.inquiry),
+                RULE_ENGINE: ("rule", state.rule_engine),
+                TBA_UPDATE: ("update", state.tba_update),
+                EXCEL_FORMATTER: ("excel", state.excel_formatter),
+            }
+            if path not in routes:
+                return self._send(404, {"status": "not found"})
+            service, handler = routes[path]
+            state.hit(service)
+            self._send(200, handler(json.loads(body)))
+
+    return Handler
+
+
+class FakeServices:
+    """Run every fake service on one local port"""
+
+    def __init__(self, latency: dict = None, host: str = "127.0.0.1", port: int = 0):
+        self.state = FakeState(latency)
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-services", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def environ(self) -> dict:
+        """Environment variables pointing the service settings at the fakes"""
+        return {
+            "ZUUL_URL": self.base_url,
+            "RULE_ENGINE_URL": self.base_url + RULE_ENGINE.lstrip("/"),
+            "TBA_API_URL": self.base_url + "tba",
+        }
+
+    def load_frames(self, frames: dict, pickler):
+        for key, frame in frames.items():
+            self.state.docstore[key] = pickler(frame)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,79 @@
+"""
+Import-time benchmark.
+
+Every target is imported in a fresh interpreter so nothing is cached between
+runs. Usage (same environment variables as the service)::
+
+    python -m benchmarks.import_time --repeat 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TBASourceMatcherV2.settings')"
+
+TARGETS = {
+    "package": "import TBASourceMatcherV2",
+    "logman": "import utilities.logman",
+    "wsgi": "import TBASourceMatcherV2.wsgi",
+    "views": "import django; django.setup(); import fileValidation.views",
+}
+
+
+def time_statement(statement: str) -> float:
+    """Seconds spent on `statement` in a fresh interpreter"""
+    code = (
+        f"{SETUP}\nimport time\nstart = time.perf_counter()\n{statement}\n"
+        "print('__elapsed__', time.perf_counter() - start)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("__elapsed__"):
+            return float(line.split()[1])
+    raise RuntimeError(f"no timing reported for {statement!r}")
+
+
+def slowest_imports(statement: str, top: int) -> list:
+    """Parse `-X importtime` output and return the `top` cumulative offenders"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{SETUP}\n{statement}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = list()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.split("|", 2)
+        rows.append((int(cumulative_us), int(self_us.split(":")[-1]), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("targets", nargs="*", default=list(TARGETS))
+    args = parser.parse_args(argv)
+
+    print(f"{'target':<10} {'median (ms)':>12} {'min (ms)':>10} {'max (ms)':>10}")
+    for name in args.targets:
+        timings = [time_statement(TARGETS[name]) * 1000 for _ in range(args.repeat)]
+        print(f"{name:<10} {statistics.median(timings):>12.1f} {min(timings):>10.1f} {max(timings):>10.1f}")
+
+    if args.top:
+        print("\nslowest imports for 'views' (cumulative ms):")
+        for cumulative, self_time, module in slowest_imports(TARGETS["views"], args.top):
+            print(f"{cumulative / 1000:>10.1f} {self_time / 1000:>8.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
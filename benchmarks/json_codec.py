@@ -0,0 +1,91 @@
+"""
+JSON codec benchmark.
+
+Encodes and decodes representative payloads with every installed backend of
+`utilities.jsoncodec`::
+
+    python -m benchmarks.json_codec --participants 1000 5000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks import workload
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "TBASourceMatcherV2.settings")
+
+
+def audit_rows(participants: int, match_fields: int) -> list:
+    """Audit mismatch rows shaped like `get_participant_details` output"""
+    return [
+        {
+            "uid": "RQ-BENCH-0001",
+            "participantSsn": workload.participant_id(ppt),
+            "participantName": "",
+            "fileName": workload.FILE_NAME,
+            "sheetName": "",
+            "dataMismatch": f"Field 0 {field}",
+            "tbaFieldName": f"TBA Field 0 {field}",
+            "mainframeValue": f"VALUE{ppt:06d}",
+            "tbaValue": f"VALUE{ppt:06d}X",
+            "ruleName": "",
+            "ruleFailedOnField": [f"Field 0 {field}"],
+            "reason": "Mismatch",
+            "correctiveAction": ["Human In Loop"],
+            "conditionName": [""],
+            "ifCondition": "Not Met",
+            "eventName": "",
+            "effectiveDate": "",
+            "actionStatus": "",
+        }
+        for ppt in range(participants)
+        for field in range(match_fields)
+    ]
+
+
+def payloads(participants: int, match_fields: int) -> dict:
+    request = workload.build_request(participants=participants, match_fields=match_fields, rules=match_fields)
+    return {
+        "request": request,
+        "audit": {"status": "Success", "mismatchData": audit_rows(participants, match_fields)},
+    }
+
+
+def time_call(func, value, repeat: int) -> float:
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(value)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON codec benchmark")
+    parser.add_argument("--participants", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--match-fields", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from utilities import jsoncodec
+
+    backends = list()
+    for name in jsoncodec.BACKENDS:
+        backend = jsoncodec.select(name)
+        if backend[0] == name:
+            backends.append(backend)
+
+    print(f"{'payload':<22} {'size (KB)':>10} {'backend':>8} {'dumps (ms)':>11} {'loads (ms)':>11}")
+    for participants in args.participants:
+        for name, value in payloads(participants, args.match_fields).items():
+            label = f"{name} x{participants}"
+            encoded = jsoncodec.select("json")[1](value)
+            for backend, dumpb, loads in backends:
+                dump_ms = time_call(dumpb, value, args.repeat) * 1000
+                load_ms = time_call(loads, encoded, args.repeat) * 1000
+                print(f"{label:<22} {len(encoded) / 1024:>10.0f} {backend:>8} {dump_ms:>11.1f} {load_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
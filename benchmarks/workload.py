@@ -0,0 +1,513 @@
+"""
+Synthetic SourceMatch workloads.
+
+`build_workload` returns a self-consistent `Processing` request body and the
+docstore frames it points at, for one mainframe file with `identifiers`
+record identifiers (one frame each) and `match_fields` "Compare with TBA"
+fields per identifier. The first `rules` match fields get a business rule
+(`json`/`jsonWoutName`/`varOperationJson`) comparing the file field with its
+TBA counterpart, and every match field gets a corrective action picked from
+`action_mix`. File and TBA values are derived from `tba_value` so the fake
+TBA Inquiry agrees with the file except for the pairs picked by
+`mismatch_rate`.
+
+Dump a workload for other load-testing tools with::
+
+    python -m benchmarks.workload --participants 5000 --match-fields 10 --rules 4 \\
+        --action-mix human=0.5,update=0.3,rerun=0.2 --out /tmp/workload
+"""
+import argparse
+import json
+import os
+import random
+import zlib
+from io import BytesIO
+
+import pandas as pd
+
+FILE_NAME = "BENCH_MAINFRAME_FILE"
+FILE_NAME_WS = "BENCH_MAINFRAME_FILE"
+PPT_IDENTIFIER = "SSN"
+PPT_FIELD = "ssn"
+TBA = "TBA"
+
+EFF_FROM_DATE = json.dumps(
+    {
+        "effectiveFromDateAppNameWithoutSpace": "",
+        "effectiveFromDateSheetName": "",
+        "effectiveFromDateRIdentifier": "",
+        "effectiveFromDateField": "",
+        "effectiveFromDatePeriod": "Current",
+        "effectiveFromDateInterval": "Date",
+    }
+)
+EFF_TO_DATE = json.dumps(
+    {
+        "effectiveToDateAppNameWithoutSpace": "",
+        "effectiveToDateSheetName": "",
+        "effectiveToDateRIdentifier": "",
+        "effectiveToDateField": "",
+        "effectiveToDatePeriod": "",
+        "effectiveToDateFrequency": "",
+        "effectiveToDateInterval": "",
+    }
+)
+
+# corrective actions taken on a mismatch, keyed by their --action-mix name
+HUMAN_IN_LOOP = "human"
+TBA_UPDATE = "update"
+RERUN_EVENT = "rerun"
+CORRECTIVE_ACTIONS = {
+    HUMAN_IN_LOOP: "Human In Loop",
+    TBA_UPDATE: "TBA Update",
+    RERUN_EVENT: "Rerun-Event",
+}
+DEFAULT_ACTION_MIX = {HUMAN_IN_LOOP: 1.0}
+
+
+def participant_id(index: int) -> str:
+    """Nine digit participant id"""
+    return str(100000000 + index)
+
+
+def identifier_name(index: int) -> str:
+    return f"REC{index}"
+
+
+def inquiry_def_name(identifier: int, field: int) -> str:
+    return f"BENCH_{identifier}_{field}"
+
+
+def field_name(identifier: int, field: int) -> str:
+    return f"field{identifier}x{field}"
+
+
+def rule_name(index: int) -> str:
+    return f"BENCH_RULE_{index}"
+
+
+def update_name(action: str, def_name: str) -> str:
+    return f"{action.upper()}_{def_name}"
+
+
+def redis_key(identifier: int) -> str:
+    return f"{FILE_NAME}_{identifier_name(identifier)}_detail_data.pkl"
+
+
+def tba_value(def_name: str, ppt_id: str) -> str:
+    """Value TBA holds for `def_name` of `ppt_id`"""
+    return f"{def_name[-6:]}{ppt_id[-4:]}"
+
+
+def is_mismatch(ppt_id: str, def_name: str, mismatch_rate: float) -> bool:
+    """Deterministic pick of mismatching (participant, field) pairs"""
+    if mismatch_rate <= 0:
+        return False
+    return zlib.crc32(f"{ppt_id}:{def_name}".encode()) % 10000 < mismatch_rate * 10000
+
+
+def parse_action_mix(value: str) -> dict:
+    """`human=0.6,update=0.3,rerun=0.1` -> {"human": 0.6, ...}"""
+    mix = dict()
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        action, weight = item.split("=", 1)
+        if action not in CORRECTIVE_ACTIONS:
+            raise ValueError(f"unknown corrective action {action!r}, use one of {', '.join(CORRECTIVE_ACTIONS)}")
+        mix[action] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("action mix needs at least one positive weight")
+    return mix
+
+
+def pick_actions(count: int, action_mix: dict, seed: int) -> list:
+    """Corrective action per match field, reproducible for a seed"""
+    actions, weights = zip(*sorted(action_mix.items()))
+    return random.Random(seed).choices(actions, weights=weights, k=count)
+
+
+def rule_condition(ident: int, field: int, wout: bool) -> dict:
+    """Condition comparing the file field with its TBA inquiry def"""
+    return {
+        "conditionName": "",
+        "resultVariableRadio": "application",
+        "field": field_name(ident, field),
+        "appName": FILE_NAME_WS if wout else FILE_NAME,
+        "sheetName": "",
+        "recordIdentifier": identifier_name(ident),
+        "operator": "Equal To",
+        "radio": "field",
+        "value": inquiry_def_name(ident, field),
+        "valueAppName": TBA,
+        "valueSheetName": "",
+        "valueRecordIdentifier": identifier_name(ident),
+        "logicalOperator": "",
+    }
+
+
+def rule_variable(ident: int, field: int, wout: bool) -> dict:
+    """Variable operation reading the identifier's participant id"""
+    return {
+        "varName": f"pptVar{ident}x{field}",
+        "varRadio": "varApplicationValue",
+        "varField": PPT_FIELD,
+        "varApplication": FILE_NAME_WS if wout else FILE_NAME,
+        "varSheetName": "",
+        "varRecordIdentifier": identifier_name(ident),
+    }
+
+
+def build_rule(name: str, ident: int, field: int) -> dict:
+    """`rulesConfig` entry with one business rule definition"""
+
+    def dump(wout: bool, key: str, builder) -> str:
+        return json.dumps([{key: [builder(ident, field, wout)]}])
+
+    return {
+        "id": field + 1,
+        "rulesDefinitions": [
+            {
+                "ruleName": name,
+                "validationType": {"valTypeName": "Business"},
+                "json": dump(False, "conditions", rule_condition),
+                "jsonWoutName": dump(True, "conditions", rule_condition),
+                "varOperationJson": dump(False, "variableRowOp", rule_variable),
+                "varOperationJsonWoutSpace": dump(True, "variableRowOp", rule_variable),
+            }
+        ],
+    }
+
+
+def build_actions(action: str, ident: int, field: int) -> str:
+    """`actions` json of a match field for its corrective action"""
+    def_name = inquiry_def_name(ident, field)
+    inner_actions = list()
+
+    if action == TBA_UPDATE:
+        inner_actions.append(
+            {
+                "updateToRadio": "field",
+                "updateToFileName": FILE_NAME,
+                "updateToSheetName": "",
+                "updateToFileIdentifier": identifier_name(ident),
+                "updateToFileField": field_name(ident, field),
+                "effectiveFromRadio": "date",
+                "effectiveFromDate": "Current Date",
+                "eventName": update_name(action, def_name),
+            }
+        )
+    elif action == RERUN_EVENT:
+        inner_actions.append(
+            {
+                "updateToRadio": "text",
+                "updateToText": "",
+                "effectiveFromRadio": "date",
+                "effectiveFromDate": "Current Date",
+                "reRunEvent": update_name(action, def_name),
+            }
+        )
+
+    return json.dumps(
+        [
+            {
+                "condition": "",
+                "satisfied": "Not Met",
+                "correctAction": CORRECTIVE_ACTIONS[action],
+                "actions": inner_actions,
+            }
+        ]
+    )
+
+
+def build_update_config(action: str, ident: int, field: int, index: int) -> dict:
+    """`tbaUpdateConfig` entry used by a TBA Update or Rerun-Event action"""
+    def_name = inquiry_def_name(ident, field)
+    name = update_name(action, def_name)
+    return {
+        "id": index,
+        "updateName": name,
+        # Rerun-Event responses come back with the event name of the request
+        "eventName": name if action == RERUN_EVENT else f"EVT_{def_name}",
+        "tbaUpdateAction": "Update",
+        "rerunFlag": "N",
+        "actLngDesc": f"Bench {action} {def_name}",
+        "sequence": "1",
+        "overrideEdits": "",
+        "panelId": "1234",
+        "parNm": "AB1234",
+        "jsonKey": def_name.lower(),
+        "tbaFieldName": f"TBA Field {ident} {field}",
+    }
+
+
+def build_request(
+    participants: int = 100,
+    match_fields: int = 5,
+    identifiers: int = 1,
+    rules: int = 0,
+    action_mix: dict = None,
+    verify=None,
+    uid: str = "RQ-BENCH-0001",
+    seed: int = 0,
+) -> dict:
+    """Processing request body, `verify` defaults to every participant"""
+    match_config = list()
+    inquiry_config = list()
+    rules_config = list()
+    update_config = list()
+    layout_config = [
+        {
+            "id": 1,
+            "fileName": FILE_NAME,
+            "recordType": "Detail Record",
+            "mfFieldName": PPT_IDENTIFIER,
+            "recordFormat": "X(09)",
+            "fieldType": "Text",
+            "mfFieldWoutSpace": PPT_FIELD,
+            "fileNameWoutSpace": FILE_NAME_WS,
+        }
+    ]
+    verify = participants if verify is None else verify
+    actions = pick_actions(identifiers * match_fields, action_mix or DEFAULT_ACTION_MIX, seed)
+
+    for ident in range(identifiers):
+        for field in range(match_fields):
+            def_name = inquiry_def_name(ident, field)
+            action = actions[len(match_config)]
+            name = ""
+            if len(match_config) < rules:
+                name = rule_name(len(rules_config))
+                rules_config.append(build_rule(name, ident, field))
+            if action != HUMAN_IN_LOOP:
+                update_config.append(build_update_config(action, ident, field, len(update_config) + 1))
+
+            match_config.append(
+                {
+                    "id": len(match_config) + 1,
+                    "matchType": "Compare with TBA",
+                    "fileName": FILE_NAME,
+                    "sheetName": "",
+                    "fileNameWoutSpace": FILE_NAME_WS,
+                    "sheetNameWoutSpace": "",
+                    "mfFieldName": f"Field {ident} {field}",
+                    "mfFieldWoutSpace": field_name(ident, field),
+                    "identifier": identifier_name(ident),
+                    "tbaFieldName": f"TBA Field {ident} {field}",
+                    "inquiryDefName": def_name,
+                    "ruleName": name,
+                    "actions": build_actions(action, ident, field),
+                    "pptVerifyTba": str(verify),
+                }
+            )
+            inquiry_config.append(
+                {
+                    "id": len(inquiry_config) + 1,
+                    "inquiryName": "Bench Data",
+                    "parNM": "AB1234",
+                    "panelId": 1234,
+                    "tbaFieldName": f"TBA Field {ident} {field}",
+                    "fieldType": "string",
+                    "jsonKey": def_name.lower(),
+                    "subJsonKey": "",
+                    "metaData": "",
+                    "identifier": identifier_name(ident),
+                    "recordIdentifier": "",
+                    "inquiryDefName": def_name,
+                    "sequence": "1",
+                    "effDateType": "date",
+                    "effFromDate": EFF_FROM_DATE,
+                    "effToDate": EFF_TO_DATE,
+                    "rowMatrix": "",
+                    "columnMatrix": "",
+                }
+            )
+            layout_config.append(
+                {
+                    "id": len(layout_config) + 1,
+                    "fileName": FILE_NAME,
+                    "recordType": "Detail Record",
+                    "mfFieldName": f"Field {ident} {field}",
+                    "recordFormat": "X(10)",
+                    "fieldType": "Text",
+                    "mfFieldWoutSpace": field_name(ident, field),
+                    "fileNameWoutSpace": FILE_NAME_WS,
+                }
+            )
+
+    ksd_file = {
+        "dateFormat": "YYYYMMDD",
+        "delimiter": "",
+        "fileFormatType": "Position",
+        "fileName": FILE_NAME,
+        "fileNameWoutSpace": FILE_NAME_WS,
+        "fileType": "Mainframe",
+        "id": 1,
+        "pptidentifier": PPT_IDENTIFIER,
+        "pptidentifierType": "PID",
+        "processJobMappingId": 101,
+        "sheetName": "",
+        "sheetNameWoutSpace": "",
+        "subj": None,
+    }
+    detail_keys = [
+        {"identifier_name": identifier_name(ident), "key": redis_key(ident), "sheet_name": ""}
+        for ident in range(identifiers)
+    ]
+
+    return {
+        "ksdConfig": {
+            "processJobMapping": {
+                "eftSubject": "BENCH",
+                "jobName": "BENCH",
+                "businessUnitOps": {},
+                "clientDetails": {
+                    "businessUnitClients": [],
+                    "createdDate": "2020-04-03T09:18:05.607+0000",
+                    "clientName": "Bench Client",
+                    "createdBy": "ADMIN",
+                    "clientCode": "9999",
+                    "id": 1,
+                },
+                "process": {},
+                "createdDate": "2020-04-23T12:37:31.364+0000",
+                "createdBy": "ADMIN",
+                "ksdName": "BENCH",
+                "id": 101,
+            },
+            "ksdFileDetails": [json.dumps(ksd_file)],
+        },
+        "botOutput": {
+            "File Formatter": {FILE_NAME: {"detailRedisKey": detail_keys}},
+            "File Validator": {},
+        },
+        "requestDetails": {
+            "uid": uid,
+            "userName": "bench",
+            "pluginName": "Source Match",
+            "phase": 4,
+            "createTimeStamp": "1611936788504",
+        },
+        "processFeatureConfig": {
+            "businessUnitName": "HWS",
+            "phaseNames": json.dumps({"SourceMatch": FILE_NAME}),
+            "processType": "INBOUND",
+            "businessOpsName": "Files & Interfaces",
+            "processName": "BENCH",
+            "processJobMapping": {"id": 101, "jobName": "BENCH"},
+        },
+        "configTables": {
+            "tbaUpdateConfig": update_config,
+            "rulesConfig": rules_config,
+            "tbaMatchConfig": match_config,
+            "tbaInquiryConfig": inquiry_config,
+            "tbaNoticeInqConfig": [],
+            "tbaEventHistInqConfig": [],
+            "tbaPendingEventInqConfig": [],
+            "ksdOutputFileDetails": [],
+            "layoutConfig": layout_config,
+        },
+        "redisKeys": {},
+    }
+
+
+def build_frames(
+    participants: int = 100, match_fields: int = 5, identifiers: int = 1, mismatch_rate: float = 0.1
+) -> dict:
+    """Docstore frames matching `build_request`, keyed by redis key"""
+    ppt_ids = [participant_id(index) for index in range(participants)]
+    frames = dict()
+
+    for ident in range(identifiers):
+        columns = {PPT_FIELD: ppt_ids}
+        for field in range(match_fields):
+            def_name = inquiry_def_name(ident, field)
+            columns[field_name(ident, field)] = [
+                tba_value(def_name, ppt) + ("X" if is_mismatch(ppt, def_name, mismatch_rate) else "")
+                for ppt in ppt_ids
+            ]
+        frames[redis_key(ident)] = pd.DataFrame(columns)
+
+    return frames
+
+
+def build_workload(
+    participants: int = 100,
+    match_fields: int = 5,
+    identifiers: int = 1,
+    rules: int = 0,
+    mismatch_rate: float = 0.1,
+    action_mix: dict = None,
+    verify=None,
+    seed: int = 0,
+) -> dict:
+    """Request body and its docstore frames: {"request": dict, "frames": {key: DataFrame}}"""
+    return {
+        "request": build_request(
+            participants=participants,
+            match_fields=match_fields,
+            identifiers=identifiers,
+            rules=rules,
+            action_mix=action_mix,
+            verify=verify,
+            seed=seed,
+        ),
+        "frames": build_frames(participants, match_fields, identifiers, mismatch_rate),
+    }
+
+
+def pickle_frame(frame: pd.DataFrame) -> bytes:
+    """Docstore wire format: zip compressed pickle"""
+    buffer = BytesIO()
+    frame.to_pickle(buffer, compression="zip")
+    return buffer.getvalue()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Workload shape options shared by the benchmark commands"""
+    parser.add_argument("--participants", type=int, default=500)
+    parser.add_argument("--match-fields", type=int, default=5, help="match fields per identifier")
+    parser.add_argument("--identifiers", type=int, default=1)
+    parser.add_argument("--rules", type=int, default=0, help="match fields with a business rule")
+    parser.add_argument(
+        "--verify", default=None, help="pptVerifyTba (a count or ALL), defaults to every participant as a count"
+    )
+    parser.add_argument("--mismatch-rate", type=float, default=0.1)
+    parser.add_argument(
+        "--action-mix",
+        type=parse_action_mix,
+        default=DEFAULT_ACTION_MIX,
+        help=f"corrective action weights, e.g. human=0.6,update=0.3,rerun=0.1 ({', '.join(CORRECTIVE_ACTIONS)})",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def workload_from_args(args) -> dict:
+    return build_workload(
+        participants=args.participants,
+        match_fields=args.match_fields,
+        identifiers=args.identifiers,
+        rules=args.rules,
+        mismatch_rate=args.mismatch_rate,
+        action_mix=args.action_mix,
+        verify=args.verify,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic SourceMatch request and its docstore frames")
+    add_arguments(parser)
+    parser.add_argument("--out", required=True, help="directory for request.json and the pickled frames")
+    args = parser.parse_args(argv)
+
+    workload = workload_from_args(args)
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "request.json"), "w") as output:
+        json.dump(workload["request"], output, indent=2)
+    for key, frame in workload["frames"].items():
+        with open(os.path.join(args.out, key), "wb") as output:
+            output.write(pickle_frame(frame))
+    print(f"wrote request.json and {len(workload['frames'])} frame(s) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
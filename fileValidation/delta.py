@@ -0,0 +1,108 @@
+"""
+Delta verification of files received again.
+
+Every participant row is fingerprinted over the columns the request matches
+and its rules read. `DeltaStore` keeps the digest and fingerprint of each
+verified participant with a minimal verdict: the corrective action and action
+status of each match field id, never identifiers or field values. On the next
+run participants whose rows are unchanged get their audit rows rebuilt from
+the current frame and the verdict, only new or changed ones go through TBA
+Inquiry and the Rule Engine. Entries expire after the store's ttl, TBA side
+changes made outside SourceMatch are picked up then.
+"""
+import time
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities import jsoncodec
+
+from .sampling import LocalStore, participant_digest
+from .shared_frames import materialize
+
+
+class Verdict:
+    """Match field id -> [correctiveAction, actionStatus] of a participant's audit rows"""
+
+    __slots__ = ("actions",)
+
+    def __init__(self, actions: Dict[str, list]):
+        self.actions = actions
+
+
+def config_digest(*parts) -> str:
+    """Digest of the configurations a verdict depends on"""
+    return blake2b(jsoncodec.dumpb(parts), digest_size=16).hexdigest()
+
+
+def row_fingerprints(frame: pd.DataFrame, keys: pd.Series, columns: List[str]) -> pd.Series:
+    """
+    Fingerprint of every participant over `columns` of its rows, as
+    stripped text. Duplicate rows and the row order don't change it.
+    """
+    values = materialize(frame[columns]).fillna("").astype(str).apply(lambda column: column.str.strip())
+    rows = pd.DataFrame(
+        {"key": keys.to_numpy(dtype=object), "hash": pd.util.hash_pandas_object(values, index=False).to_numpy()}
+    )
+    rows = rows[rows["key"].notna() & (rows["key"] != "")].drop_duplicates().sort_values("key")
+
+    participants = rows["key"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, participants[1:] != participants[:-1]])
+    return pd.Series(np.bitwise_xor.reduceat(rows["hash"].to_numpy(), starts), index=participants[starts])
+
+
+def combine_fingerprints(fingerprints: List[pd.Series], participants: np.ndarray) -> np.ndarray:
+    """Signed 64 bit fingerprint of `participants` over several frames"""
+    combined = np.zeros(len(participants), dtype=np.uint64)
+    for fingerprint in fingerprints:
+        combined = combined * np.uint64(1000003) ^ fingerprint.reindex(participants).to_numpy(dtype=np.uint64)
+    return combined.view(np.int64)
+
+
+class DeltaStore(LocalStore):
+    """Fingerprint and per match field actions of the participants verified per scope"""
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS verdicts ("
+        "scope TEXT, participant INTEGER, fingerprint INTEGER, actions TEXT, verified_at REAL, "
+        "PRIMARY KEY (scope, participant)) WITHOUT ROWID"
+    )
+
+    def verdicts(self, scope: str, fingerprints: Dict[str, int]) -> Dict[str, Verdict]:
+        """
+        Verdicts of the participants verified with the same fingerprint
+
+        Args:
+            scope (str): client, files and configurations verified
+            fingerprints (Dict[str, int]): participant -> current fingerprint
+        """
+        digests = {participant_digest(ppt): ppt for ppt in fingerprints}
+        rows = self.connection().execute(
+            "SELECT participant, fingerprint, actions FROM verdicts WHERE scope = ? AND verified_at > ?",
+            (scope, time.time() - self.ttl),
+        )
+        verdicts = dict()
+        for digest, fingerprint, actions in rows:
+            ppt = digests.get(digest)
+            if ppt is not None and fingerprints[ppt] == fingerprint:
+                verdicts[ppt] = Verdict(jsoncodec.loads(actions))
+        return verdicts
+
+    def record(self, scope: str, verdicts: Iterable[Tuple[str, int, Verdict]]):
+        """Store (participant, fingerprint, verdict) of a run"""
+        now = time.time()
+        rows = [
+            (
+                scope,
+                participant_digest(ppt),
+                int(fingerprint),
+                jsoncodec.dumps(verdict.actions),
+                now,
+            )
+            for ppt, fingerprint, verdict in verdicts
+        ]
+        with self.connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?)", rows)
+            connection.execute("DELETE FROM verdicts WHERE scope = ? AND verified_at <= ?", (scope, now - self.ttl))
@@ -0,0 +1,89 @@
+"""
+Worker level cache of decoded docstore frames.
+
+Frames are kept by docstore key in an LRU bounded by their in-memory size.
+A frame validated less than FRAME_CACHE_TTL seconds ago is used without
+asking the docstore. Older ones are revalidated, with `If-None-Match` when
+the docstore sent an ETag and by comparing the content digest otherwise, so
+a changed key is decoded again while an unchanged one skips the unpickling.
+Callers get a shallow copy sharing the cached column data: they can add,
+drop or reassign columns, and copy the frame before changing values in
+place.
+"""
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Optional
+
+import pandas as pd
+
+
+def content_digest(content: bytes) -> str:
+    return blake2b(content, digest_size=16).hexdigest()
+
+
+class CachedFrame:
+    """Decoded frame with what is needed to revalidate it"""
+
+    __slots__ = ("etag", "digest", "frame", "nbytes", "validated_at")
+
+    def __init__(self, etag: Optional[str], digest: str, frame: pd.DataFrame):
+        self.etag = etag
+        self.digest = digest
+        self.frame = frame
+        self.nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+        self.validated_at = time.monotonic()
+
+    def checkout(self) -> pd.DataFrame:
+        """Shallow copy of the frame, values are shared with the cache"""
+        return self.frame.copy(deep=False)
+
+    def fresh(self, ttl: float) -> bool:
+        """Validated less than `ttl` seconds ago"""
+        return time.monotonic() - self.validated_at < ttl
+
+    def revalidated(self):
+        self.validated_at = time.monotonic()
+
+
+class FrameCache:
+    """Thread-safe LRU of decoded frames holding at most `max_bytes`"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get(self, key: str) -> Optional[CachedFrame]:
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self._frames.move_to_end(key)
+            return cached
+
+    def put(self, key: str, etag: Optional[str], digest: str, frame: pd.DataFrame) -> Optional[CachedFrame]:
+        """
+        Store a decoded frame
+
+        Returns:
+            Optional[CachedFrame]: None if the frame is bigger than the whole cache
+        """
+        cached = CachedFrame(etag, digest, frame)
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            if cached.nbytes > self.max_bytes:
+                return None
+
+            self._frames[key] = cached
+            self.nbytes += cached.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return cached
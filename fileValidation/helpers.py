@@ -1,12 +1,12 @@
 """
 helper functions are defined here.
 """
-import json
 from datetime import datetime
 
 from rest_framework.status import HTTP_200_OK
 from rest_framework.exceptions import APIException
 
+from utilities.jsoncodec import EmbeddedJSON
 from utilities.logman import logman
 
 LOGGER = logman("TBASourceMatcher")
@@ -21,6 +21,7 @@ MAESTRO = {
     "inq_resp": {"description": "Unable to get response from TBA Inquiry", "title": FAILED_TO_GET_RESPONSE},
     "redis_connect": {"description": "Unable to connect Cache Storage", "title": FAILED_TO_CONNECT},
     "redis_response": {"description": ERROR_MSG_FILE_REPORT, "title": FAILED_TO_GET_RESPONSE},
+    "audit_store": {"description": "Unable to store audit rows in Cache Storage", "title": "Failed to process"},
     "empty_file": {"description": "File/Report key can't be empty or None", "title": "Failed to Process"},
     "inq_connect": {"description": "Unable to connect TBA Inquiry", "title": "Failed to Connect"},
     "rule_connect": {"description": "Unable to connect Rule Engine", "title": FAILED_TO_CONNECT},
@@ -76,7 +77,7 @@ class FileValidationError(APIException):
         if msg:
             self._json.update({"statusMessage": msg})
         default_detail["audit"].update(
-            {"createTimestamp": str(datetime.now().timestamp()), "fileName": name, "json": json.dumps(self._json)}
+            {"createTimestamp": str(datetime.now().timestamp()), "fileName": name, "json": EmbeddedJSON(self._json)}
         )
         default_detail["processLog"][0].update(
             {"timestamp": str(datetime.now().replace(microsecond=0).isoformat()),}
@@ -0,0 +1,144 @@
+"""
+Cross-request cache of TBA Inquiry results.
+
+One entry per participant, keyed by client, identifier type, the participant
+as sent to TBA Inquiry (identifier and effective dates) and the inquired
+definitions. Entries live in a bounded in-process LRU and, when configured,
+in a Django cache shared by the workers. Participants touched by a TBA Update
+are marked so entries cached before the update are not used again.
+"""
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, List, Optional
+
+from utilities import jsoncodec
+
+INQUIRY_CONFIGS = ("TBA", "tbaNoticeInqConfig", "tbaPendEventInqConfig", "tbaEventHistInqConfig")
+
+
+def _digest(*parts) -> str:
+    return blake2b(jsoncodec.dumpb(parts), digest_size=16).hexdigest()
+
+
+class LocalTier:
+    """Thread-safe LRU of at most `size` entries, each with its own expiry"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> dict:
+        now = time.time()
+        found = dict()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+        return found
+
+    def set_many(self, values: dict, timeout: int):
+        expires_at = time.time() + timeout
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+class InquiryCache:
+    """
+    Inquiry results per participant for `ttl` seconds, `shared` is an
+    optional Django cache consulted after the in-process tier
+    """
+
+    def __init__(self, ttl: int, size: int, shared=None):
+        self.ttl = ttl
+        self.local = LocalTier(size)
+        self.shared = shared
+
+    def _get_many(self, keys: List[str]) -> dict:
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if self.shared is not None and missing:
+            shared = self.shared.get_many(missing)
+            self.local.set_many(shared, self.ttl)
+            found.update(shared)
+        return found
+
+    def _set_many(self, values: dict):
+        self.local.set_many(values, self.ttl)
+        if self.shared is not None:
+            self.shared.set_many(values, self.ttl)
+
+    @staticmethod
+    def touched_key(client_id: str, ppt_id: str) -> str:
+        return f"tba-inquiry-touched:{_digest(str(client_id), str(ppt_id))}"
+
+    def keys(self, client_id: str, identifier_type: str, inquiry_data: dict) -> List[str]:
+        """Cache key of every participant of an inquiry payload"""
+        definitions = _digest(*(inquiry_data.get(config, []) for config in INQUIRY_CONFIGS))
+        return [
+            f"tba-inquiry:{_digest(str(client_id), identifier_type, sorted(participant.items()), definitions)}"
+            for participant in inquiry_data["participants"]
+        ]
+
+    def lookup(self, client_id: str, identifier_type: str, inquiry_data: dict) -> Dict[int, dict]:
+        """
+        Cached results by participant position, skipping participants
+        updated after their result was cached
+        """
+        keys = self.keys(client_id, identifier_type, inquiry_data)
+        cached = self._get_many(keys)
+        if not cached:
+            return dict()
+
+        participants = inquiry_data["participants"]
+        touched_keys = {
+            index: self.touched_key(client_id, participants[index].get(identifier_type))
+            for index, key in enumerate(keys)
+            if key in cached
+        }
+        # markers are read from the shared tier when there is one, another worker may have updated
+        tier = self.local if self.shared is None else self.shared
+        touched = tier.get_many(list(touched_keys.values()))
+
+        hits = dict()
+        for index, touched_key in touched_keys.items():
+            cached_at, result = cached[keys[index]]
+            if touched.get(touched_key, 0) < cached_at:
+                hits[index] = jsoncodec.loads(result)
+        return hits
+
+    def store(self, client_id: str, identifier_type: str, inquiry_data: dict, results: Dict[int, dict]):
+        """Cache results by participant position, stored encoded so callers can't change them"""
+        keys = self.keys(client_id, identifier_type, inquiry_data)
+        now = time.time()
+        self._set_many({keys[index]: (now, jsoncodec.dumpb(result)) for index, result in results.items()})
+
+    def touch(self, client_id: str, ppt_ids):
+        """Results cached before now are stale for these participants"""
+        now = time.time()
+        self._set_many({self.touched_key(client_id, ppt_id): now for ppt_id in ppt_ids})
+
+
+def inquiry_cache(ttl: int, size: int, shared_alias: str = "") -> Optional[InquiryCache]:
+    """Cache configured by the settings, None when `ttl` is 0"""
+    if not ttl:
+        return None
+
+    shared = None
+    if shared_alias:
+        from django.core.cache import caches
+
+        shared = caches[shared_alias]
+    return InquiryCache(ttl, size, shared)
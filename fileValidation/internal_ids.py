@@ -0,0 +1,56 @@
+"""
+Internal ID client registry (`static/internal_info.json`).
+
+Loaded once per process and reloaded when the file's modification time
+changes. Readers never block each other, the file is only read again by one
+thread at a time.
+"""
+import json
+import os
+import threading
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+INTERNAL_INFO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "internal_info.json")
+
+
+class InternalIdRegistry:
+    """Inquiry details (`inquiry_name`, `par_nm`, `panel_id`) by client ID"""
+
+    def __init__(self, path: str = INTERNAL_INFO_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._clients = MappingProxyType({})
+
+    def clients(self) -> Mapping[str, Mapping]:
+        """Current registry, read again if the file changed since the last load"""
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    with open(self.path, "r") as internal:
+                        clients = json.load(internal)
+                    self._clients = MappingProxyType(
+                        {client_id: MappingProxyType(info) for client_id, info in clients.items()}
+                    )
+                    self._mtime = mtime
+        return self._clients
+
+    def get(self, client_id: str) -> Optional[Mapping]:
+        """
+        Details of `client_id`, also matched without leading zeros
+
+        Returns:
+            Optional[Mapping]: None if the client isn't configured
+        """
+        clients = self.clients()
+        if client_id in clients:
+            return clients[client_id]
+        try:
+            return clients.get(str(int(client_id)))
+        except ValueError:
+            return None
+
+
+REGISTRY = InternalIdRegistry()
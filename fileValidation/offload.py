@@ -0,0 +1,52 @@
+"""
+Process pool for the CPU bound stages of a request.
+
+Building the Rule Engine participants, turning the Rule Engine response into
+audit rows and building the TBA Update payload are pure Python and hold the
+GIL for the whole stage. With OFFLOAD_WORKERS set, stages over at least
+OFFLOAD_MIN_ROWS rows are split in one chunk per worker and run in a process
+pool shared by the requests of the gunicorn worker. Chunks carry only the
+configurations and the frame rows of their own participants, frames pickle as
+their NumPy buffers. Smaller stages stay in-process.
+"""
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+from django.conf import settings
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def offloaded(rows: int) -> bool:
+    """True if a stage over `rows` rows runs in the process pool"""
+    return settings.OFFLOAD_WORKERS > 0 and rows >= settings.OFFLOAD_MIN_ROWS
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """
+    Pool of OFFLOAD_WORKERS processes, created on first use. Processes come
+    from a fork server so they don't inherit the threads of the worker.
+    """
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=settings.OFFLOAD_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _POOL
+
+
+def chunks(items: Sequence, count: int) -> List[Sequence]:
+    """`items` split in at most `count` consecutive chunks of the same size"""
+    size = max(1, math.ceil(len(items) / max(1, count)))
+    return [items[start : start + size] for start in range(0, len(items), size)]
+
+
+def run_chunks(function: Callable, arguments: List[tuple]) -> list:
+    """function(*chunk_arguments) of every chunk in the process pool, results in chunk order"""
+    pool = process_pool()
+    return [future.result() for future in [pool.submit(function, *chunk) for chunk in arguments]]
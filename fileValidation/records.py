@@ -0,0 +1,242 @@
+"""
+Typed records built once from the request configurations, and the slotted
+audit rows built from the Rule Engine results.
+"""
+import json
+from collections.abc import MutableMapping
+from itertools import chain, compress, repeat
+from operator import attrgetter, is_not
+from typing import Iterator, List, Optional
+
+# audit row fields in the order of the audit json
+AUDIT_FIELDS = (
+    "id",
+    "uid",
+    "participantSsn",
+    "participantName",
+    "fileName",
+    "sheetName",
+    "dataMismatch",
+    "tbaFieldName",
+    "mainframeValue",
+    "tbaValue",
+    "ruleName",
+    "ruleFailedOnField",
+    "reason",
+    "eventName",
+    "rerunEvent",
+    "noticeCancel",
+    "noticeUpdate",
+    "pendingEventName",
+    "effectiveDate",
+    "resultsVarable",
+    "matchType",
+    "correctiveAction",
+    "conditionName",
+    "ifCondition",
+    "actionStatus",
+    "updateAction",
+    "internalId",
+)
+audit_values = attrgetter(*AUDIT_FIELDS)
+UNSET = object()
+
+
+class KsdFile:
+    """One `ksdFileDetails` entry, decoded from its JSON string"""
+
+    __slots__ = (
+        "fileName",
+        "fileNameWoutSpace",
+        "sheetName",
+        "fileType",
+        "pptidentifier",
+        "pptidentifierType",
+        "prevReportFileName",
+        "prevReportFileNameWs",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_json(cls, value: str) -> "KsdFile":
+        """
+        Decode a `ksdFileDetails` string
+
+        Raises:
+            ValueError: value is not a JSON object
+        """
+        fields = json.loads(value)
+        if not isinstance(fields, dict):
+            raise ValueError("ksdFileDetails entry is not an object")
+        return cls(**fields)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"KsdFile({self.to_dict()})"
+
+
+class KsdFileDetails:
+    """
+    `ksdFileDetails` records indexed by `fileNameWoutSpace` and the names
+    configured under `fileNameWoutSpace`/`prevReportFileNameWs` (both lower
+    cased). When several records match a name the last one wins.
+    """
+
+    def __init__(self, files: List[KsdFile]):
+        self.files = list(files)
+        self.by_name = dict()
+        self.names = dict()
+
+        for ksd_file in self.files:
+            if ksd_file.prevReportFileNameWs:
+                self.names[ksd_file.prevReportFileNameWs.lower()] = ksd_file.prevReportFileName
+            if ksd_file.fileNameWoutSpace:
+                self.by_name[ksd_file.fileNameWoutSpace.lower()] = ksd_file
+                self.names[ksd_file.fileNameWoutSpace.lower()] = ksd_file.fileName
+
+    def __iter__(self) -> Iterator[KsdFile]:
+        return iter(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __repr__(self):
+        return repr(self.files)
+
+    def has_file(self, name_wout_space: str) -> bool:
+        return name_wout_space.lower() in self.by_name
+
+    def file_name(self, name_wout_space: str) -> Optional[str]:
+        """
+        `fileName` configured for a file or previous report name without space
+
+        Returns:
+            Optional[str]: None if neither the file nor a previous report is configured
+        """
+        return self.names.get(name_wout_space.lower())
+
+
+class InquiryIndex:
+    """
+    Inquiry definitions of the config tables, indexed in one pass so
+    reference checks are set/dictionary lookups instead of list scans
+    """
+
+    def __init__(
+        self,
+        inquiry_config: List[dict],
+        notice_config: List[dict],
+        event_hist_config: List[dict] = (),
+        pend_event_config: List[dict] = (),
+    ):
+        # (inquiryDefName, identifier) -> first configured inquiry/notice field
+        self.fields = dict()
+        for field in chain(inquiry_config, notice_config):
+            self.fields.setdefault((field["inquiryDefName"], field["identifier"]), field)
+        self.def_names = {def_name for def_name, _ in self.fields}
+        # event history and pending event definitions don't have identifiers
+        self.without_identifier = {field["eventHistDefName"] for field in event_hist_config} | {
+            field["pendgEvntDefName"] for field in pend_event_config
+        }
+
+    def field(self, def_name: str, identifier: str) -> Optional[dict]:
+        return self.fields.get((def_name, identifier))
+
+    def is_inquired(self, def_name: str) -> bool:
+        """Configured in any inquiry, notice, event history or pending event table"""
+        return def_name in self.def_names or def_name in self.without_identifier
+
+    def missing(self, def_names) -> set:
+        """Referenced definitions which are not inquired"""
+        return set(def_names) - self.def_names - self.without_identifier
+
+
+class AuditParts:
+    """
+    Audit rows of the verified windows, stored in the docstore as each
+    window finishes. Only the docstore keys, the row count, the failed
+    participants and the human in loop flag are held.
+    """
+
+    __slots__ = ("keys", "rows", "failed", "human_in_loop")
+
+    def __init__(self):
+        self.keys = list()
+        self.rows = 0
+        self.failed = set()
+        self.human_in_loop = False
+
+
+class AuditRow(MutableMapping):
+    """
+    Audit row of a Rule Engine result with its fields in slots, under a
+    third of the memory of the same dict. It reads and writes like the dict
+    it replaces (unset fields are missing keys, other keys are kept aside)
+    and the JSON codec writes it as one, fields in AUDIT_FIELDS order.
+    """
+
+    __slots__ = AUDIT_FIELDS + ("extra",)
+    field_names = frozenset(AUDIT_FIELDS)
+
+    def __init__(self, fields: dict):
+        for key, value in zip(AUDIT_FIELDS, map(fields.get, AUDIT_FIELDS, repeat(UNSET))):
+            setattr(self, key, value)
+        self.extra = None
+        if len(fields) != len(self):
+            self.extra = {key: value for key, value in fields.items() if key not in self.field_names}
+
+    def __getitem__(self, key):
+        if key in self.field_names:
+            value = getattr(self, key)
+            if value is UNSET:
+                raise KeyError(key)
+            return value
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.field_names:
+            setattr(self, key, value)
+        elif self.extra is None:
+            self.extra = {key: value}
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.field_names:
+            if getattr(self, key) is UNSET:
+                raise KeyError(key)
+            setattr(self, key, UNSET)
+        elif self.extra is None:
+            raise KeyError(key)
+        else:
+            del self.extra[key]
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(AUDIT_FIELDS) - audit_values(self).count(UNSET) + len(self.extra or ())
+
+    def __reduce__(self):
+        return (AuditRow, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"AuditRow({self.to_dict()})"
+
+    def to_dict(self) -> dict:
+        """Fields set, as the dict the audit json holds"""
+        values = audit_values(self)
+        if UNSET in values:
+            row = dict(compress(zip(AUDIT_FIELDS, values), map(is_not, values, repeat(UNSET))))
+        else:
+            row = dict(zip(AUDIT_FIELDS, values))
+        if self.extra is not None:
+            row.update(self.extra)
+        return row
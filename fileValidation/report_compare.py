@@ -0,0 +1,91 @@
+"""
+Join based comparison of a file/report with another one.
+
+Match fields comparing a file with a previous or another report are compared
+for all participants at once: the source rows are joined with the destination
+frame on the stripped participant identifier (its first row per participant,
+like `get_another_file_row`) and every configured column pair is compared as
+stripped text. Participants present on only one side are returned apart.
+"""
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .rules import MATCHED, MISMATCH, as_text
+from .sampling import participant_ids, participant_keys
+
+KEY = "__participant"
+ID = "__participant_id"
+
+
+class ReportComparison:
+    """
+    `results` are participants in the Rule Engine response shape,
+    `missing_dest`/`missing_source` the identifiers found on one side only
+    """
+
+    __slots__ = ("results", "missing_dest", "missing_source")
+
+    def __init__(self, results: List[dict], missing_dest: list, missing_source: list):
+        self.results = results
+        self.missing_dest = missing_dest
+        self.missing_source = missing_source
+
+
+def compare_reports(
+    source: pd.DataFrame,
+    source_id: str,
+    dest: pd.DataFrame,
+    dest_id: str,
+    pairs: List[Tuple[str, str, str]],
+) -> ReportComparison:
+    """
+    Compare the (id, source column, destination column) `pairs` of every source row
+
+    Args:
+        source (pd.DataFrame): rows of the participants to verify
+        source_id (str): identifier column of source
+        dest (pd.DataFrame): file/report compared with
+        dest_id (str): identifier column of dest
+        pairs (List[Tuple[str, str, str]]): match field id with the columns to compare
+    """
+    source_keys = participant_keys(source, source_id)
+    dest_keys = participant_keys(dest, dest_id)
+
+    left = pd.DataFrame(
+        {KEY: source_keys.to_numpy(), ID: source[source_id].to_numpy()},
+        index=pd.RangeIndex(len(source)),
+    )
+    right = pd.DataFrame({KEY: dest_keys.to_numpy()}, index=pd.RangeIndex(len(dest)))
+    for position, (_, source_column, dest_column) in enumerate(pairs):
+        left[f"file{position}"] = source[source_column].to_numpy()
+        right[f"dest{position}"] = dest[dest_column].to_numpy()
+    right = right.dropna(subset=[KEY]).drop_duplicates(KEY)
+
+    merged = left.merge(right, on=KEY, how="left", indicator=True)
+    found = (merged["_merge"] == "both").to_numpy()
+    merged = merged[found]
+
+    results = {ppt_id: {"participantId": ppt_id, "failedRules": list(), "successRules": list()} for ppt_id in merged[ID]}
+    for position, (key_id, _, _) in enumerate(pairs):
+        file_values = merged[f"file{position}"].tolist()
+        dest_values = merged[f"dest{position}"].tolist()
+        met = (as_text(file_values) == as_text(dest_values)).to_numpy(dtype=bool)
+        for ppt_id, file_value, dest_value, matched in zip(merged[ID], file_values, dest_values, met):
+            results[ppt_id]["successRules" if matched else "failedRules"].append(
+                {
+                    "id": key_id,
+                    "uniq": key_id,
+                    "ruleName": "",
+                    "conditionName": "",
+                    "fileFieldValue": file_value,
+                    "tbaFieldValue": dest_value,
+                    "reason": MATCHED if matched else MISMATCH,
+                    "resultsVarable": list(),
+                }
+            )
+
+    missing_dest = pd.unique(left.loc[~found, ID]).tolist()
+    missing_source = np.setdiff1d(participant_ids(dest_keys), participant_ids(source_keys)).tolist()
+    return ReportComparison(list(results.values()), missing_dest, missing_source)
@@ -0,0 +1,215 @@
+"""
+In-process evaluation of simple source match rules.
+
+Match fields without a rule are compared directly: the file value against
+the TBA value, as stripped text. Rules are evaluated locally when they stay
+within this subset of the rules JSON:
+
+- a single condition group (`json`/`jsonWoutName` hold one `conditions` list)
+- conditions with the "Equal To" or "Not Equal To" operator, whose `radio` is
+  "field" (compared with another file/TBA field) or "value" (compared with
+  the `value` text), joined by an empty, "AND" or "OR" `logicalOperator` and
+  evaluated left to right
+- `variableRowOp` entries reading a file/TBA field (`varApplicationValue`),
+  reported in `resultsVarable` as {varName: value}
+
+A rule succeeds when its conditions are met. Everything else, and every field
+whose values aren't all in the Rule Engine payload, is left to the Rule
+Engine. Fields are evaluated for all participants at once.
+"""
+import json
+import operator
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+OPERATORS = {"equal to": operator.eq, "not equal to": operator.ne}
+LOGICAL = {"": np.logical_and, "and": np.logical_and, "or": np.logical_or}
+MATCHED = "Matched"
+MISMATCH = "Mismatch"
+MISSING = object()
+
+
+def rule_key(app: str, sheet: str, identifier: str, field: str) -> str:
+    """Field name the Rule Engine payload uses for a rule field (see `merge_keys`)"""
+    return "".join(value + "_" for value in (app, sheet, identifier) if value.strip() != "") + field
+
+
+def field_value(fields: List[dict], key: str):
+    for field in fields:
+        if key in field:
+            return field[key]
+    return MISSING
+
+
+def as_text(values: list) -> pd.Series:
+    return pd.Series(values, dtype=object).fillna("").astype(str).str.strip()
+
+
+class Condition:
+    """One comparison of a rule, `right` is a field key or the literal value"""
+
+    __slots__ = ("left", "compare", "right", "literal", "logical")
+
+    def __init__(self, condition: dict):
+        self.left = rule_key(
+            condition["appName"], condition["sheetName"], condition["recordIdentifier"], condition["field"]
+        )
+        self.compare = OPERATORS[condition["operator"].strip().lower()]
+        self.literal = condition["radio"].strip().lower() == "value"
+        if self.literal:
+            self.right = condition["value"]
+        else:
+            self.right = rule_key(
+                condition["valueAppName"],
+                condition["valueSheetName"],
+                condition["valueRecordIdentifier"],
+                condition["value"],
+            )
+        self.logical = LOGICAL[condition.get("logicalOperator", "").strip().lower()]
+
+
+class LocalRule:
+    """Rule of the supported subset, built with `from_definition`"""
+
+    def __init__(self, name: str, condition_name: str, conditions: List[Condition], variables: List[Tuple[str, str]]):
+        self.name = name
+        self.condition_name = condition_name
+        self.conditions = conditions
+        self.variables = variables
+
+    @classmethod
+    def from_definition(cls, definition: dict) -> Optional["LocalRule"]:
+        """None if the `rulesDefinitions` entry is outside the supported subset"""
+        try:
+            groups = json.loads(definition["json"])
+            groups_wout = json.loads(definition["jsonWoutName"])
+            variables = json.loads(definition.get("varOperationJsonWoutSpace") or "[]")
+            if len(groups) != 1 or len(groups_wout) != 1 or len(variables) > 1:
+                return None
+
+            conditions = groups_wout[0]["conditions"]
+            if not conditions or any(
+                condition["radio"].strip().lower() not in ("field", "value")
+                or condition["resultVariableRadio"].strip().lower() != "application"
+                for condition in conditions
+            ):
+                return None
+
+            var_fields = list()
+            for variable in variables[0]["variableRowOp"] if variables else []:
+                if variable["varRadio"].strip().lower() != "varapplicationvalue":
+                    return None
+                var_fields.append(
+                    (
+                        variable["varName"],
+                        rule_key(
+                            variable["varApplication"],
+                            variable["varSheetName"],
+                            variable["varRecordIdentifier"],
+                            variable["varField"],
+                        ),
+                    )
+                )
+
+            return cls(
+                definition["ruleName"],
+                groups[0]["conditions"][0].get("conditionName", ""),
+                [Condition(condition) for condition in conditions],
+                var_fields,
+            )
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    def keys(self) -> List[str]:
+        """Payload fields the rule reads"""
+        keys = [condition.left for condition in self.conditions]
+        keys += [condition.right for condition in self.conditions if not condition.literal]
+        return keys + [key for _, key in self.variables]
+
+    def met(self, values: Dict[str, pd.Series], size: int) -> np.ndarray:
+        met = np.ones(size, dtype=bool)
+        for condition in self.conditions:
+            right = condition.right.strip() if condition.literal else values[condition.right]
+            result = condition.compare(values[condition.left], right).to_numpy(dtype=bool)
+            met = condition.logical(met, result)
+        return met
+
+
+def evaluate_field(detail: dict, rule: Optional[LocalRule], participants: List[dict]) -> Optional[List[tuple]]:
+    """
+    Evaluate one `sourceMatcherDetails` entry for the participants having it
+
+    Returns:
+        Optional[List[tuple]]: (participant index, met, result) for every
+        participant, None if a value is missing from the payload
+    """
+    key_id = detail["id"]
+    rows = [index for index, participant in enumerate(participants) if key_id in participant["fileFields"]]
+    if not rows:
+        return None
+
+    file_fields = [participants[index]["fileFields"][key_id] for index in rows]
+    tba_fields = [participants[index]["tbaFields"].get(key_id, []) for index in rows]
+    file_values = [field_value(fields[1:], fields[0].get("comp_element")) for fields in file_fields]
+    tba_values = [field_value(fields[1:], fields[0].get("comp_element")) if fields else MISSING for fields in tba_fields]
+    if MISSING in file_values or MISSING in tba_values:
+        return None
+
+    if rule is None:
+        met = (as_text(file_values) == as_text(tba_values)).to_numpy(dtype=bool)
+        variables = [list() for _ in rows]
+    else:
+        raw = dict()
+        for key in set(rule.keys()):
+            raw[key] = [
+                value if value is not MISSING else field_value(tba, key)
+                for value, tba in zip((field_value(fields, key) for fields in file_fields), tba_fields)
+            ]
+            if MISSING in raw[key]:
+                return None
+        met = rule.met({key: as_text(values) for key, values in raw.items()}, len(rows))
+        variables = [[{name: raw[key][row]} for name, key in rule.variables] for row in range(len(rows))]
+
+    return [
+        (
+            index,
+            bool(met[row]),
+            {
+                "id": key_id,
+                "uniq": key_id,
+                "ruleName": detail["ruleName"],
+                "conditionName": rule.condition_name if rule is not None else "",
+                "fileFieldValue": file_values[row],
+                "tbaFieldValue": tba_values[row],
+                "reason": MATCHED if met[row] else MISMATCH,
+                "resultsVarable": variables[row],
+            },
+        )
+        for row, index in enumerate(rows)
+    ]
+
+
+def evaluate(details: List[Tuple[dict, Optional[LocalRule]]], participants: List[dict]) -> Tuple[set, List[dict]]:
+    """
+    Evaluate the fields that can be handled in-process
+
+    Returns:
+        Tuple[set, List[dict]]: ids evaluated and participants in the Rule
+        Engine response shape (`failedRules`/`successRules`)
+    """
+    evaluated = set()
+    results = [
+        {"participantId": participant["participantId"], "failedRules": list(), "successRules": list()}
+        for participant in participants
+    ]
+    for detail, rule in details:
+        outcome = evaluate_field(detail, rule, participants)
+        if outcome is None:
+            continue
+        evaluated.add(detail["id"])
+        for index, met, result in outcome:
+            results[index]["successRules" if met else "failedRules"].append(result)
+
+    return evaluated, [result for result in results if result["failedRules"] or result["successRules"]]
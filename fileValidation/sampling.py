@@ -0,0 +1,166 @@
+"""
+Participant filtering and sampling of the docstore frames.
+
+Only the identifier column is touched: it is read as strings, stripped and
+deduplicated once per frame, and the sampled participants are selected from
+every frame with one boolean mask.
+
+`CoverageStore` remembers which participants were verified recently so
+`coverage_sample` can rotate the per-run budget over the whole file.
+"""
+import os
+import sqlite3
+import threading
+import time
+from functools import reduce
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .shared_frames import materialize
+
+
+def participant_keys(frame: pd.DataFrame, identifier: str) -> pd.Series:
+    """Stripped string identifiers of `frame`, missing values stay NA"""
+    return frame[identifier].astype("string").str.strip()
+
+
+def participant_ids(keys: pd.Series) -> np.ndarray:
+    """Unique non empty identifiers"""
+    keys = keys.dropna()
+    return keys[keys != ""].unique().to_numpy(dtype=object)
+
+
+def common_participants(keys: List[pd.Series]) -> np.ndarray:
+    """Sorted identifiers present in every frame (a single frame is sorted too)"""
+    return np.unique(reduce(np.intersect1d, (participant_ids(key) for key in keys)))
+
+
+def sample_participants(participants: np.ndarray, count: int, seed: Optional[int] = None) -> np.ndarray:
+    """
+    `count` participants drawn without replacement. The same seed and
+    participants always give the same sample.
+    """
+    if count >= len(participants):
+        return participants
+    return np.random.RandomState(seed).choice(participants, size=count, replace=False)
+
+
+def select_participants(frame: pd.DataFrame, keys: pd.Series, participants: np.ndarray) -> pd.DataFrame:
+    """Rows of `participants` with missing values blanked and duplicates dropped"""
+    mask = keys.isin(participants).to_numpy(dtype=bool, na_value=False)
+    return select_rows(frame, mask)
+
+
+def select_rows(frame: pd.DataFrame, rows: np.ndarray) -> pd.DataFrame:
+    """`rows` (positions or a mask) of `frame` with missing values blanked and duplicates dropped"""
+    return materialize(frame.iloc[rows]).fillna("").drop_duplicates()
+
+
+def window_rows(keys: pd.Series, participants: np.ndarray, size: int) -> List[np.ndarray]:
+    """
+    Row positions of each window of `size` participants, in row order. The
+    windows are views of one array of a position per row of `participants`.
+    """
+    index = pd.Index(participants).get_indexer(keys.to_numpy(dtype=object, na_value=None))
+    window = np.where(index >= 0, index // size, -1)
+    del index
+    order = np.argsort(window, kind="stable")
+    bounds = np.searchsorted(window[order], np.arange(-(-len(participants) // size) + 1))
+    return [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def participant_digest(participant) -> int:
+    """Signed 64 bit digest of an identifier, the coverage store never keeps raw ids"""
+    return int.from_bytes(blake2b(str(participant).encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class LocalStore:
+    """
+    SQLite file of per participant entries expiring after `ttl` seconds.
+    Nothing is opened until first use in a process, so stores built at
+    import time in a preloading master never hand connections to forked
+    workers.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def create_schema(self):
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            with connection:
+                connection.executescript(self.schema)
+        finally:
+            connection.close()
+
+    def connection(self) -> sqlite3.Connection:
+        """One connection per thread and process, the first one in a process creates the schema"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.create_schema()
+                    # connections opened before a fork belong to the parent
+                    self._local = threading.local()
+                    self._pid = os.getpid()
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = sqlite3.connect(self.path, timeout=5)
+        return self._local.connection
+
+
+class CoverageStore(LocalStore):
+    """
+    Participants verified per (client, pjmId) scope, kept in a local SQLite
+    file. Entries older than `ttl` seconds are ignored and purged.
+    """
+
+    schema = (
+        "CREATE TABLE IF NOT EXISTS coverage ("
+        "scope TEXT, participant INTEGER, verified_at REAL, failed INTEGER, "
+        "PRIMARY KEY (scope, participant)) WITHOUT ROWID"
+    )
+
+    def history(self, scope: str) -> Dict[int, Tuple[float, bool]]:
+        """participant digest -> (verified_at, failed) of the unexpired entries"""
+        rows = self.connection().execute(
+            "SELECT participant, verified_at, failed FROM coverage WHERE scope = ? AND verified_at > ?",
+            (scope, time.time() - self.ttl),
+        )
+        return {participant: (verified_at, bool(failed)) for participant, verified_at, failed in rows}
+
+    def record(self, scope: str, verified, failed):
+        """Store the outcome of a run, `failed` is a subset of `verified`"""
+        now = time.time()
+        failed = set(failed)
+        rows = [(scope, participant_digest(ppt), now, ppt in failed) for ppt in verified]
+        with self.connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)", rows)
+            connection.execute("DELETE FROM coverage WHERE scope = ? AND verified_at <= ?", (scope, now - self.ttl))
+
+
+def coverage_sample(
+    participants: np.ndarray, count: int, history: Dict[int, Tuple[float, bool]], seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    `count` participants, recently failed ones first, then the ones not
+    verified within the store's ttl, then the least recently verified.
+    Ties are broken at random.
+    """
+    if count >= len(participants):
+        return participants
+
+    seen = [history.get(participant_digest(ppt)) for ppt in participants]
+    tier = np.array([1 if entry is None else 0 if entry[1] else 2 for entry in seen])
+    verified_at = np.array([0.0 if entry is None else entry[0] for entry in seen])
+    shuffle = np.random.RandomState(seed).permutation(len(participants))
+    # lexsort orders by the last key first
+    order = np.lexsort((shuffle, verified_at, tier))
+    return participants[order[:count]]
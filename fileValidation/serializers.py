@@ -2,6 +2,8 @@
 import json
 from rest_framework import serializers
 
+from .records import KsdFile
+
 FILE_FORMATTER = "File Formatter"
 
 
@@ -37,46 +39,30 @@ def validate_ksd_file_details(value):
     if len(value) < 1:
         raise serializers.ValidationError(error_msg["message"])
 
-    for val in value:
-        field = json.loads(val)
-        if field["pptidentifier"] is None or field["pptidentifier"].strip(" ") == "":
+    for field in value:
+        if field.pptidentifier is None or field.pptidentifier.strip(" ") == "":
             raise serializers.ValidationError(error_msg["pptidentifier"])
-        if field["fileName"] is None or field["fileName"].strip(" ") == "":
+        if field.fileName is None or field.fileName.strip(" ") == "":
             raise serializers.ValidationError(error_msg["fileName"])
-        if field["fileType"] is None or field["fileType"].strip(" ") == "":
+        if field.fileType is None or field.fileType.strip(" ") == "":
             raise serializers.ValidationError(error_msg["fileType"])
-        if field["pptidentifierType"] is None or field["pptidentifierType"].strip(" ") == "":
+        if field.pptidentifierType is None or field.pptidentifierType.strip(" ") == "":
             raise serializers.ValidationError(error_msg["pptidentifierType"])
 
     return value
 
 
-def validate_config_tables(value):
-    """Config table errors"""
- 
-    import pandas as pd
- 
-    match_list = list()
-    inq_list = list()
- 
-    if len(value.get("tbaMatchConfig", [])) > 0:
-        match_config = pd.DataFrame(value["tbaMatchConfig"])
-        match_config = match_config[match_config["matchType"].str.lower() == "compare with tba"]
-        inq_config = pd.DataFrame(value["tbaInquiryConfig"])
-        notice_config = pd.DataFrame(value["tbaNoticeInqConfig"])
- 
-        if not match_config.empty:
-            match_list = match_config.inquiryDefName.tolist()
-        if not inq_config.empty:
-            inq_list += inq_config.inquiryDefName.tolist()
-        if not notice_config.empty:
-            inq_list += notice_config.inquiryDefName.tolist()
- 
-        for match_field in match_list:
-            if match_field not in inq_list:
-                raise serializers.ValidationError("Unable to match field(s) which are not inquired")
- 
-    return value
+class KsdFileDetailsField(serializers.ListField):
+    """ksdFileDetails JSON strings decoded once into `KsdFile` records"""
+
+    child = serializers.CharField()
+
+    def to_internal_value(self, data):
+        values = super().to_internal_value(data)
+        try:
+            return [KsdFile.from_json(value) for value in values]
+        except ValueError:
+            raise serializers.ValidationError("ksdFileDetails are not proper")
 
 
 class ClientDetailsSerializer(serializers.Serializer):
@@ -108,7 +94,7 @@ class KsdConfigSerializer(serializers.Serializer):
     """"verify processJobMapping dictionary"""
 
     processJobMapping = ProcessJobMappingSerializer()
-    ksdFileDetails = serializers.ListField(required=True, validators=[validate_ksd_file_details])
+    ksdFileDetails = KsdFileDetailsField(required=True, validators=[validate_ksd_file_details])
 
 
 class RequestDetailSerializer(serializers.Serializer):
@@ -311,5 +297,5 @@ class ValidateRequestSerializer(serializers.Serializer):
     botOutput = serializers.DictField(required=True)
     requestDetails = RequestDetailSerializer()
     processFeatureConfig = ProcessFeatureConfig()
-    configTables = ConfigTableSerializer()  # validators=[validate_config_tables])
+    configTables = ConfigTableSerializer()
     redisKeys = serializers.DictField(required=False)
@@ -0,0 +1,260 @@
+"""
+Docstore frames shared by the gunicorn workers of a box.
+
+A decoded frame is written once under SHARED_FRAME_DIR as one `.npy` buffer
+per column, keyed by docstore key. Workers memory-map the buffers instead of
+downloading and unpickling the zip again, and the buffers sit once in the
+page cache for all of them. Numeric and datetime columns are mapped as they
+are, string columns as categorical codes over their decoded categories.
+Frames with other column contents (mixed objects) are not shared.
+
+Loaded frames are read-only views of the mapped buffers. `materialize`
+turns their categorical columns back into object columns and is meant for
+the rows a caller keeps, after filtering.
+
+Every loaded frame holds a shared `flock` on its entry until the last of
+its buffers is released, eviction only removes entries it can lock
+exclusively. The store is kept under SHARED_FRAME_BYTES by evicting the
+least recently read entries.
+"""
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from hashlib import blake2b
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+META = "meta.json"
+LOCK = "lock"
+
+
+@contextmanager
+def entry_lock(path: str, operation: int):
+    """flock on an entry, yields False if a non blocking lock isn't available"""
+    try:
+        handle = open(os.path.join(path, LOCK), "a")
+    except FileNotFoundError:
+        yield False
+        return
+
+    try:
+        try:
+            fcntl.flock(handle, operation)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        handle.close()
+
+
+def column_kind(column: pd.Series) -> Optional[str]:
+    """How a column is stored, None if it can't be"""
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind in "biufcmM":
+        return "array"
+    if column.dtype == object and pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty"):
+        return "category"
+    return None
+
+
+def materialize(frame: pd.DataFrame) -> pd.DataFrame:
+    """`frame` with its categorical columns as object columns, missing values as NaN"""
+    categorical = [name for name, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return frame
+    return frame.astype({name: object for name in categorical})
+
+
+class Readers:
+    """Shared lock of a loaded frame, held until each of its `count` buffers is released"""
+
+    def __init__(self, handle, count: int):
+        self.handle = handle
+        self.count = count
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            self.count -= 1
+            if self.count == 0:
+                self.handle.close()
+
+
+class SharedFrame:
+    """Entry of the shared store, `checkout` maps it into a new frame"""
+
+    __slots__ = ("store", "path", "etag", "digest")
+
+    def __init__(self, store: "SharedFrameStore", path: str, meta: dict):
+        self.store = store
+        self.path = path
+        self.etag = meta["etag"]
+        self.digest = meta["digest"]
+
+    def checkout(self) -> pd.DataFrame:
+        return self.store.load(self.path)
+
+    def fresh(self, ttl: float) -> bool:
+        """Validated by any worker less than `ttl` seconds ago"""
+        try:
+            return time.time() - os.stat(os.path.join(self.path, LOCK)).st_mtime < ttl
+        except FileNotFoundError:
+            return False
+
+    def revalidated(self):
+        try:
+            os.utime(os.path.join(self.path, LOCK))
+        except FileNotFoundError:
+            pass
+
+
+class SharedFrameStore:
+    """Frames under `directory`, at most `max_bytes` of column buffers"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, blake2b(key.encode("utf-8"), digest_size=16).hexdigest())
+
+    @staticmethod
+    def _meta(path: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(path, META), "r") as meta:
+                return json.load(meta)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def get(self, key: str) -> Optional[SharedFrame]:
+        path = self._path(key)
+        meta = self._meta(path)
+        if meta is None or meta["key"] != key:
+            return None
+        return SharedFrame(self, path, meta)
+
+    def load(self, path: str) -> pd.DataFrame:
+        """
+        Read-only frame of an entry backed by its mapped buffers. The entry
+        stays locked against eviction while any of them is referenced.
+
+        Raises:
+            FileNotFoundError: the entry was evicted
+        """
+        try:
+            handle = open(os.path.join(path, LOCK), "a")
+        except FileNotFoundError:
+            raise FileNotFoundError(path) from None
+        fcntl.flock(handle, fcntl.LOCK_SH)
+        meta = self._meta(path)
+        if meta is None:
+            handle.close()
+            raise FileNotFoundError(path)
+
+        readers = Readers(handle, len(meta["columns"]))
+        columns = dict()
+        for position, column in enumerate(meta["columns"]):
+            values = np.load(os.path.join(path, f"{position}.npy"), mmap_mode="r")
+            weakref.finalize(values, readers.release)
+            if column["kind"] == "category":
+                categories = pd.Index(np.load(os.path.join(path, f"{position}.categories.npy")), dtype=object)
+                values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+            columns[position] = values
+        os.utime(os.path.join(path, META))
+
+        frame = pd.DataFrame(columns, index=pd.RangeIndex(*meta["index"]), copy=False)
+        frame.columns = pd.Index([column["name"] for column in meta["columns"]], dtype=object)
+        return frame
+
+    def put(self, key: str, etag: Optional[str], digest: str, frame: pd.DataFrame) -> Optional[SharedFrame]:
+        """
+        Write a decoded frame, replacing an older version of the key
+
+        Returns:
+            Optional[SharedFrame]: None if the frame can't be shared
+        """
+        if frame.empty or not isinstance(frame.index, pd.RangeIndex) or not frame.columns.is_unique:
+            return None
+        if not all(isinstance(name, (str, int)) for name in frame.columns):
+            return None
+        kinds = [column_kind(frame[name]) for name in frame.columns]
+        if None in kinds:
+            return None
+
+        path = self._path(key)
+        if os.path.exists(path) and not self.evict(path):
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        meta = {
+            "key": key,
+            "etag": etag,
+            "digest": digest,
+            "index": [frame.index.start, frame.index.stop, frame.index.step],
+            "columns": list(),
+        }
+        nbytes = 0
+        for position, (name, kind) in enumerate(zip(frame.columns, kinds)):
+            column = frame[name]
+            if kind == "category":
+                categorical = pd.Categorical(column)
+                categories = categorical.categories.to_numpy(dtype=str)
+                np.save(os.path.join(staging, f"{position}.categories.npy"), categories)
+                values = categorical.codes
+                nbytes += categories.nbytes
+            else:
+                values = column.to_numpy()
+            np.save(os.path.join(staging, f"{position}.npy"), values)
+            nbytes += values.nbytes
+            meta["columns"].append({"name": name, "kind": kind})
+        meta["nbytes"] = nbytes
+
+        with open(os.path.join(staging, META), "w") as handle:
+            json.dump(meta, handle)
+        open(os.path.join(staging, LOCK), "w").close()
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # another worker stored the key first
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self.trim()
+        return self.get(key)
+
+    def evict(self, path: str) -> bool:
+        """Remove an entry no worker is reading, False if it is in use"""
+        with entry_lock(path, fcntl.LOCK_EX | fcntl.LOCK_NB) as locked:
+            if not locked:
+                return not os.path.exists(path)
+            trash = tempfile.mkdtemp(prefix=".evicted-", dir=self.directory)
+            os.rename(path, os.path.join(trash, "entry"))
+        shutil.rmtree(trash, ignore_errors=True)
+        return True
+
+    def trim(self):
+        """Evict the least recently read entries above `max_bytes`"""
+        if not os.path.isdir(self.directory):
+            return
+        entries = list()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta = self._meta(path)
+            if name.startswith(".") or meta is None:
+                continue
+            entries.append((os.stat(os.path.join(path, META)).st_mtime, meta["nbytes"], path))
+
+        total = sum(nbytes for _, nbytes, _ in entries)
+        for _, nbytes, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if self.evict(path):
+                total -= nbytes
@@ -1,11 +1,53 @@
 """testcase"""
+import fcntl
+import functools
+import gc
+import gzip
+import importlib
+import json
+import os
+import pickle
+import runpy
+import tempfile
+import threading
+import time
+import tracemalloc
 from copy import deepcopy
 from unittest import mock
 
+import numpy as np
+import pandas as pd
 from requests import Session
-from django.test import TestCase, Client, override_settings
+from django.conf import settings
+from django.test import TestCase, Client, RequestFactory, override_settings
 from rest_framework.response import Response
 
+import TBASourceMatcherV2.wsgi
+from fileValidation import utils
+from fileValidation.delta import DeltaStore, Verdict, row_fingerprints
+from fileValidation.frame_cache import CachedFrame, FrameCache
+from fileValidation.helpers import MAESTRO, FileValidationError
+from fileValidation.inquiry_cache import InquiryCache
+from fileValidation.internal_ids import InternalIdRegistry
+from fileValidation.offload import chunks, offloaded, run_chunks
+from fileValidation.records import AuditParts, AuditRow, KsdFile, KsdFileDetails
+from fileValidation.report_compare import compare_reports
+from fileValidation.rules import LocalRule, evaluate
+from fileValidation.sampling import (
+    CoverageStore,
+    common_participants,
+    coverage_sample,
+    participant_keys,
+    sample_participants,
+    select_participants,
+    window_rows,
+)
+from fileValidation.shared_frames import SharedFrameStore, entry_lock, materialize
+from fileValidation.utils import INTERNAL_ID, MET, NO_ACTION_IS_TAKEN, NOT_MET, SourceMatch
+from utilities import jsoncodec
+from utilities.jsoncodec import EmbeddedJSON, JSONCodecResponse, document_chunks, streamed_document
+from utilities.zipkinDecorator import HttpTransport, is_sampled, merge_json_spans
+
 
 content_type = "application/json"
 payload = {
@@ -130,6 +172,22 @@ payload = {
 }
 
 
+def source_stub(*methods: str, **attributes) -> mock.Mock:
+    """A mocked SourceMatch request, `methods` run the real SourceMatch code against it"""
+    attributes = {
+        "uid": "RQ-1",
+        "header_details": {},
+        "redis_keys": {},
+        "reused_verdicts": {},
+        "audit_parts": AuditParts(),
+        **attributes,
+    }
+    source = mock.Mock(**attributes)
+    for method in methods:
+        setattr(source, method, functools.partial(getattr(SourceMatch, method), source))
+    return source
+
+
 class TestEmptyConfigs(TestCase):
     def setUp(self):
         self.url = "/sourceMatcher/fileVerification/"
@@ -141,6 +199,28 @@ class TestEmptyConfigs(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json()["statusMessage"], "Some important fields are missing")
 
+    def test_malformed_ksd_file_details(self):
+        """ksdFileDetails entry which is not a json object"""
+        self.payload["ksdConfig"].update({"ksdFileDetails": ['{"fileName": "TEMP.MAINFRAME.FILE"']})
+        response = self.client.post(self.url, data=self.payload, content_type=content_type)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["statusMessage"], "Some important fields are missing")
+
+    def test_last_ksd_file_detail_wins(self):
+        """several ksdFileDetails entries configured under the same name"""
+        details = KsdFileDetails(
+            [
+                KsdFile(fileName="FILE A", fileNameWoutSpace="FILEA"),
+                KsdFile(fileName="REPORT", prevReportFileName="PREV", prevReportFileNameWs="FILEA"),
+                KsdFile(fileName="OLD", prevReportFileName="PREV B", prevReportFileNameWs="fileb"),
+                KsdFile(fileName="FILE B", fileNameWoutSpace="FILEB"),
+            ]
+        )
+        self.assertEqual(details.file_name("filea"), "PREV")
+        self.assertEqual(details.file_name("FILEB"), "FILE B")
+        self.assertIsNone(details.file_name("FILEC"))
+        self.assertTrue(details.has_file("FileA"))
+
     def test_inquiry_field_not_configured(self):
         """test inquiry field configured for matching but not configured in inquiry config(s)"""
         self.payload["configTables"]["tbaMatchConfig"][0].update(
@@ -231,3 +311,711 @@ class TestRedisFetch(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(data["status"], "Failed")
         self.assertEqual(data["statusMessage"], "Unable to get File/Report")
+
+
+class TestZipkinTransport(TestCase):
+    def test_sampled_flag_honored(self):
+        self.assertTrue(is_sampled("1", sample_rate=0))
+        self.assertFalse(is_sampled("0", sample_rate=100))
+        self.assertFalse(is_sampled(None, sample_rate=0))
+        self.assertTrue(is_sampled(None, sample_rate=100))
+
+    def test_merge_json_spans(self):
+        merged = merge_json_spans([b'[{"id": "1"}]', '[{"id": "2"},{"id": "3"}]', b"[]"])
+        self.assertEqual(merged, b'[{"id": "1"},{"id": "2"},{"id": "3"}]')
+
+    def test_send_failure_logged(self):
+        transport = HttpTransport(url="http://zipkin.invalid/api/v2/spans", flush_interval=0.01)
+        with mock.patch("requests.Session.post", side_effect=ConnectionError("refused")), self.assertLogs(
+            "utilities.zipkinDecorator", "WARNING"
+        ) as logs:
+            transport.send(b'[{"id": "1"}]')
+            transport.flush()
+            for _ in range(100):
+                if logs.records:
+                    break
+                time.sleep(0.01)
+        self.assertIn("ConnectionError('refused')", logs.output[0])
+
+    def test_flush_waits_for_batch_in_flight(self):
+        transport = HttpTransport(url="http://zipkin.invalid/api/v2/spans", flush_interval=0.01)
+        posting, release = threading.Event(), threading.Event()
+
+        def post(*args, **kwargs):
+            posting.set()
+            release.wait(5)
+
+        with mock.patch("requests.Session.post", side_effect=post):
+            transport.send(b'[{"id": "1"}]')
+            self.assertTrue(posting.wait(5))
+            transport.flush(timeout=0.1)
+            self.assertEqual(transport.queue.unfinished_tasks, 1)
+            release.set()
+            transport.flush()
+            self.assertEqual(transport.queue.unfinished_tasks, 0)
+
+    def test_dropped_payloads_logged(self):
+        transport = HttpTransport(url="http://zipkin.invalid/api/v2/spans", queue_size=1, flush_interval=0.01)
+        posting, release = threading.Event(), threading.Event()
+
+        def post(*args, **kwargs):
+            posting.set()
+            release.wait(5)
+
+        with mock.patch("requests.Session.post", side_effect=post), self.assertLogs(
+            "utilities.zipkinDecorator", "WARNING"
+        ) as logs:
+            transport.send(b'[{"id": "1"}]')
+            self.assertTrue(posting.wait(5))
+            for id_ in (2, 3, 4):
+                transport.send(b'[{"id": "%d"}]' % id_)
+            release.set()
+            transport.flush()
+        self.assertEqual(transport.dropped, 2)
+        self.assertIn("2 span payload(s) dropped", logs.output[0])
+
+
+class TestStartup(TestCase):
+    def test_eureka_registered_from_gunicorn_master_only(self):
+        with mock.patch("TBASourceMatcherV2.startup.register_in_background") as register, mock.patch(
+            "TBASourceMatcherV2.startup.prewarm"
+        ):
+            importlib.reload(TBASourceMatcherV2.wsgi)
+            register.assert_not_called()
+
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, "gunicorn.conf.py"))
+            register.assert_not_called()
+            config["when_ready"](None)
+            register.assert_called_once_with()
+
+
+class TestJSONCodec(TestCase):
+    def test_embedded_json_serialized_once(self):
+        audit = {"MFvsTba": [{"participantSsn": "XXXXX1234", "reason": 'say "hi"'}], "status": "Success"}
+        document = {"audit": {"uid": "RQ-1", "json": EmbeddedJSON(audit)}, "status": "Success"}
+        rendered = json.loads(b"".join(document_chunks(document)))
+        self.assertEqual(json.loads(rendered["audit"]["json"]), audit)
+        self.assertEqual(rendered["status"], "Success")
+
+    def test_gzip_when_accepted(self):
+        data = {"rows": ["participant"] * 1000}
+        request = RequestFactory().post("/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        response = JSONCodecResponse(data, request=request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content)), data)
+
+        response = JSONCodecResponse(data, request=RequestFactory().post("/"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(json.loads(response.content), data)
+
+    def test_streamed_document(self):
+        head = {"pjmId": "1", "sourceMatcherDetails": [{"id": "A"}]}
+        items = [{"participantId": str(index)} for index in range(7)]
+        for count in (0, 1, 7):
+            body = b"".join(streamed_document(head, "participants", items[:count], group=3))
+            self.assertEqual(json.loads(body), dict(head, participants=items[:count]))
+
+        self.assertEqual(json.loads(b"".join(streamed_document({}, "participants", items))), {"participants": items})
+        body = gzip.decompress(b"".join(streamed_document(head, "participants", items, group=2, level=1)))
+        self.assertEqual(json.loads(body), dict(head, participants=items))
+
+
+class TestAuditOffload(TestCase):
+    def setUp(self):
+        self.source = source_stub("offload_audit_rows")
+        self.audit_document = lambda rows: SourceMatch.audit_document(self.source, rows, "FILE", status="HumanInLoop")
+        self.rows = [{"participantSsn": "123456789", "reason": "Mismatch"}, {"participantSsn": "987654321"}]
+
+    @override_settings(AUDIT_OFFLOAD_ROWS=1)
+    def test_large_audit_offloaded(self):
+        self.source.set_file_redis.return_value = {"status": "success", "key": "RQ-1_audit_detail.pkl"}
+        audit = json.loads(str(self.audit_document(self.rows)))
+        self.assertEqual(audit["MFvsTba"], [])
+        self.assertEqual(audit["auditRedisKey"], "RQ-1_audit_detail.pkl")
+        self.assertEqual(audit["auditRows"], 2)
+        self.assertIn("RQ-1_audit_detail.pkl", self.source.redis_keys)
+
+    @override_settings(AUDIT_OFFLOAD_ROWS=1)
+    def test_offload_failure_keeps_rows_inline(self):
+        self.source.set_file_redis.return_value = {"status": "failed"}
+        audit = json.loads(str(self.audit_document(self.rows)))
+        self.assertEqual(len(audit["MFvsTba"]), 2)
+        self.assertNotIn("auditRedisKey", audit)
+
+    def test_window_parts_listed(self):
+        self.source.audit_parts.keys = ["RQ-1_audit_detail_part1.pkl"]
+        self.source.audit_parts.rows = 3
+        audit = json.loads(str(self.audit_document(self.rows)))
+        self.assertEqual(audit["auditRedisKeys"], ["RQ-1_audit_detail_part1.pkl"])
+        self.assertEqual(audit["auditRows"], 5)
+        self.assertEqual([row["participantSsn"] for row in audit["MFvsTba"]], ["xxxxx6789", "xxxxx4321"])
+
+
+class TestInternalIdRegistry(TestCase):
+    def test_reloaded_when_file_changes(self):
+        info = {"inquiry_name": "Unmasked SSN", "par_nm": "P6727I00", "panel_id": 6727}
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "internal_info.json")
+            with open(path, "w") as internal:
+                json.dump({"175": info}, internal)
+            registry = InternalIdRegistry(path)
+            self.assertEqual(registry.get("0175")["panel_id"], 6727)
+            self.assertIsNone(registry.get("176"))
+
+            with open(path, "w") as internal:
+                json.dump({"176": info}, internal)
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+            self.assertIsNone(registry.get("175"))
+            self.assertEqual(registry.get("176")["par_nm"], "P6727I00")
+
+    def test_inquiry_entry_per_request(self):
+        source = mock.Mock()
+        first = SourceMatch.add_internal_id_inquiry(source, "175", "SSN", "FILE")[0]
+        second = SourceMatch.add_internal_id_inquiry(source, "175", "EMPID", "FILE")[0]
+        self.assertEqual((first["identifier"], second["identifier"]), ("SSN", "EMPID"))
+        self.assertEqual(INTERNAL_ID["identifier"], "")
+
+
+class TestParticipantSampling(TestCase):
+    def test_common_participants_sampled_reproducibly(self):
+        first = pd.DataFrame(
+            {"SSN": [" 1", "2", "3", None, "", "4", "4"], "VALUE": ["a", "b", None, "d", "e", "f", "f"]}
+        )
+        second = pd.DataFrame({"PID": ["4", "3 ", "2", "5"]})
+        keys = [participant_keys(first, "SSN"), participant_keys(second, "PID")]
+
+        common = common_participants(keys)
+        self.assertEqual(common.tolist(), ["2", "3", "4"])
+        self.assertEqual(common_participants(keys[1:]).tolist(), ["2", "3", "4", "5"])
+        sample = sample_participants(common, 2, seed=7)
+        self.assertEqual(sample.tolist(), sample_participants(common, 2, seed=7).tolist())
+        self.assertEqual(len(set(sample)), 2)
+
+        selected = select_participants(first, keys[0], common)
+        self.assertEqual(selected["SSN"].tolist(), ["2", "3", "4"])
+        self.assertEqual(selected["VALUE"].tolist(), ["b", "", "f"])
+
+    def test_coverage_rotates_over_participants(self):
+        participants = np.array([str(ppt) for ppt in range(10)], dtype=object)
+        with tempfile.TemporaryDirectory() as folder:
+            store = CoverageStore(os.path.join(folder, "coverage.db"), ttl=3600)
+            first = coverage_sample(participants, 5, store.history("1:101"), seed=1).tolist()
+            store.record("1:101", first, [])
+            second = coverage_sample(participants, 5, store.history("1:101"), seed=1).tolist()
+            store.record("1:101", second, second[-1:])
+            self.assertEqual(set(first) | set(second), set(participants))
+            self.assertEqual(coverage_sample(participants, 1, store.history("1:101")).tolist(), second[-1:])
+
+    def test_store_opened_on_first_use_per_process(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "coverage.db")
+            store = CoverageStore(path, ttl=3600)
+            self.assertFalse(os.path.exists(path))
+
+            connection = store.connection()
+            self.assertEqual(store.history("1:101"), {})
+            self.assertIs(store.connection(), connection)
+
+            # as seen by a forked worker
+            store._pid = -1
+            self.assertIsNot(store.connection(), connection)
+            self.assertEqual(store.history("1:101"), {})
+
+
+class TestInquiryCache(TestCase):
+    def setUp(self):
+        self.cache = InquiryCache(ttl=60, size=10)
+        self.inquiry = {
+            "TBA": [{"inquiryDefName": "DEF_1"}],
+            "tbaNoticeInqConfig": [],
+            "participants": [{"pid": "000000001"}, {"pid": "000000002"}],
+        }
+
+    def test_cached_participants(self):
+        self.cache.store("1479", "pid", self.inquiry, {1: {"DEF_1": "B"}})
+        hits = self.cache.lookup("1479", "pid", self.inquiry)
+        self.assertEqual(hits, {1: {"DEF_1": "B"}})
+
+        hits[1]["DEF_1"] = "changed"
+        self.assertEqual(self.cache.lookup("1479", "pid", self.inquiry), {1: {"DEF_1": "B"}})
+        self.assertEqual(self.cache.lookup("9999", "pid", self.inquiry), {})
+        self.assertEqual(self.cache.lookup("1479", "pid", dict(self.inquiry, TBA=[{"inquiryDefName": "DEF_2"}])), {})
+
+    def test_updated_participants_bypassed(self):
+        self.cache.store("1479", "pid", self.inquiry, {0: {"DEF_1": "A"}, 1: {"DEF_1": "B"}})
+        self.cache.touch("1479", ["000000002"])
+        self.assertEqual(self.cache.lookup("1479", "pid", self.inquiry), {0: {"DEF_1": "A"}})
+
+    def test_misses_inquired(self):
+        source = source_stub(client_id="1479")
+        source.post_tba_inquiry.return_value = [[{"DEF_1": "A"}], [{"index": 1, "pid": "000000003"}]]
+        self.cache.store("1479", "pid", self.inquiry, {1: {"DEF_1": "B"}})
+        inquiry = dict(self.inquiry, participants=self.inquiry["participants"] + [{"pid": "000000003"}])
+
+        with mock.patch.object(utils, "INQUIRY_CACHE", self.cache):
+            response = SourceMatch.call_tba_inquiry(source, inquiry, "FILE", identifier_type="pid")
+
+        sent = source.post_tba_inquiry.call_args[0][0]["participants"]
+        self.assertEqual(sent, [{"pid": "000000001"}, {"pid": "000000003"}])
+        self.assertEqual(response, [[{"DEF_1": "A"}, {"DEF_1": "B"}], [{"index": 2, "pid": "000000003"}]])
+
+    def test_updated_participants_touched_after_update(self):
+        source = source_stub(client_id="1479", process_job_mapping={"clientDetails": {}})
+        payload = {"rerun": [], "comment": [], "requestData": [], "notice": []}
+        source.tba_update_payload_data.return_value = (payload, [{"participantSsn": "000000002"}], [])
+        source.updated_fields.return_value = []
+        source.get_complete_request.return_value = []
+        touched = list()
+
+        def post(**kwargs):
+            # an inquiry finishing while the update runs caches the old values
+            self.cache.store("1479", "pid", self.inquiry, {1: {"DEF_1": "B"}})
+            touched.append(len(self.cache.touch.call_args_list))
+            return mock.Mock(status_code=200, content=b'{"NewUpdate": []}')
+
+        with mock.patch.object(utils, "INQUIRY_CACHE", self.cache), mock.patch.object(
+            self.cache, "touch", wraps=self.cache.touch
+        ), mock.patch.object(utils, "Session") as session:
+            session.return_value.post.side_effect = post
+            SourceMatch.call_tba_update(source, 1, "FILE", [], [{"pptidentifierType": "PID"}])
+            self.assertEqual((touched, self.cache.touch.call_count), ([1], 2))
+
+        self.assertEqual(self.cache.lookup("1479", "pid", self.inquiry), {})
+
+
+class TestFrameCache(TestCase):
+    def test_bounded_by_bytes(self):
+        frames = {key: pd.DataFrame({"SSN": [key] * 100}) for key in "abc"}
+        nbytes = CachedFrame(None, "a", frames["a"]).nbytes
+        cache = FrameCache(max_bytes=nbytes * 2)
+        cache.put("a", None, "a", frames["a"])
+        cache.put("b", None, "b", frames["b"])
+        cache.get("a")
+        cache.put("c", None, "c", frames["c"])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((len(cache), cache.nbytes), (2, nbytes * 2))
+
+    @override_settings(FRAME_CACHE_TTL=0)
+    def test_fetch_revalidates(self):
+        frame = pd.DataFrame({"SSN": ["1", "2"]})
+        source = source_stub()
+        response = mock.Mock(status_code=200, content=utils.zip_pickle(frame, "key"), headers={"ETag": '"v1"'})
+
+        with mock.patch.object(utils, "FRAME_CACHE", FrameCache(10 ** 6)), mock.patch.object(
+            Session, "get", return_value=response
+        ) as get, mock.patch.object(pd, "read_pickle", wraps=pd.read_pickle) as read_pickle:
+            first = SourceMatch.fetch_file_redis(source, "key", "FILE")
+            first["SSN"] = first["SSN"].str.zfill(3)
+            response.status_code = 304
+            second = SourceMatch.fetch_file_redis(source, "key", "FILE")
+
+        self.assertEqual(get.call_args[1]["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(read_pickle.call_count, 1)
+        self.assertEqual(second["SSN"].tolist(), ["1", "2"])
+
+    @override_settings(FRAME_CACHE_TTL=60)
+    def test_fresh_frame_not_fetched(self):
+        frame = pd.DataFrame({"SSN": ["1", "2"]})
+        source = source_stub()
+        response = mock.Mock(status_code=200, content=utils.zip_pickle(frame, "key"), headers={})
+
+        with mock.patch.object(utils, "FRAME_CACHE", FrameCache(10 ** 6)), mock.patch.object(
+            Session, "get", return_value=response
+        ) as get:
+            first = SourceMatch.fetch_file_redis(source, "key", "FILE")
+            second = SourceMatch.fetch_file_redis(source, "key", "FILE")
+
+        self.assertEqual(get.call_count, 1)
+        self.assertIsNot(first, second)
+        self.assertTrue(np.shares_memory(first["SSN"].to_numpy(), second["SSN"].to_numpy()))
+
+
+class TestSharedFrameStore(TestCase):
+    def test_frames_shared_through_directory(self):
+        frame = pd.DataFrame({"SSN": ["1", None, "3"], "AMOUNT": [1.5, 2.0, np.nan], 7: [1, 2, 3]})
+        with tempfile.TemporaryDirectory() as folder:
+            store = SharedFrameStore(os.path.join(folder, "frames"), max_bytes=10 ** 6)
+            self.assertFalse(os.path.exists(store.directory))
+            store.put("key", '"v1"', "digest", frame)
+            entry = SharedFrameStore(store.directory, max_bytes=10 ** 6).get("key")
+            self.assertEqual((entry.etag, entry.digest), ('"v1"', "digest"))
+
+            shared = entry.checkout()
+            self.assertIsInstance(shared["SSN"].dtype, pd.CategoricalDtype)
+            self.assertFalse(shared["AMOUNT"].to_numpy().flags.writeable)
+            codes = shared["SSN"].array.codes
+            while codes.base is not None and not isinstance(codes, np.memmap):
+                codes = codes.base
+            self.assertIsInstance(codes, np.memmap)
+            self.assertRaises(ValueError, shared.loc.__setitem__, (0, "AMOUNT"), 0.0)
+            pd.testing.assert_frame_equal(materialize(shared), frame)
+
+            self.assertIsNone(store.put("mixed", None, "digest", pd.DataFrame({"A": ["1", 2]})))
+            with entry_lock(entry.path, fcntl.LOCK_SH):
+                self.assertFalse(store.evict(entry.path))
+            # the frame still maps the entry
+            self.assertFalse(store.evict(entry.path))
+            del shared, codes
+            gc.collect()
+            self.assertTrue(store.evict(entry.path))
+            self.assertRaises(FileNotFoundError, entry.checkout)
+
+    def test_selected_rows_materialized(self):
+        frame = pd.DataFrame({"SSN": [" 1", "2", "3"], "NAME": ["a", None, "c"]})
+        with tempfile.TemporaryDirectory() as folder:
+            shared = SharedFrameStore(folder, max_bytes=10 ** 6).put("key", None, "digest", frame).checkout()
+            selected = select_participants(shared, participant_keys(shared, "SSN"), np.array(["1", "2"]))
+
+        self.assertEqual(selected.dtypes.tolist(), [object, object])
+        self.assertEqual(selected.to_dict("records"), [{"SSN": " 1", "NAME": "a"}, {"SSN": "2", "NAME": ""}])
+
+
+class TestLocalRules(TestCase):
+    def setUp(self):
+        self.participants = [
+            {
+                "participantId": ppt_id,
+                "fileFields": {"1": [{"comp_element": "AMT"}, {"AMT": amount}], "2": [{"comp_element": "X"}]},
+                "tbaFields": {"1": [{"comp_element": "DEF_1"}, {"DEF_1": tba_amount}], "2": []},
+            }
+            for ppt_id, amount, tba_amount in (("1", "10 ", "10"), ("2", "5", "6"))
+        ]
+
+    def test_plain_comparison(self):
+        details = [({"id": "1", "ruleName": ""}, None), ({"id": "2", "ruleName": ""}, None)]
+        evaluated, results = evaluate(details, self.participants)
+        # "2" has no values in the payload and is left to the Rule Engine
+        self.assertEqual(evaluated, {"1"})
+        self.assertEqual([len(result["successRules"]) for result in results], [1, 0])
+        self.assertEqual(results[1]["failedRules"][0]["reason"], "Mismatch")
+
+    def test_rule_subset(self):
+        condition = {
+            "appName": "FILE",
+            "sheetName": "",
+            "recordIdentifier": "",
+            "field": "AMT",
+            "operator": "Equal To",
+            "radio": "value",
+            "value": "5",
+            "resultVariableRadio": "application",
+            "logicalOperator": "",
+            "conditionName": "is five",
+        }
+        variable = {
+            "varRadio": "varApplicationValue",
+            "varName": "amount",
+            "varApplication": "FILE",
+            "varSheetName": "",
+            "varRecordIdentifier": "",
+            "varField": "AMT",
+        }
+        definition = {
+            "ruleName": "R1",
+            "json": json.dumps([{"conditions": [condition]}]),
+            "jsonWoutName": json.dumps([{"conditions": [condition]}]),
+            "varOperationJsonWoutSpace": json.dumps([{"variableRowOp": [variable]}]),
+        }
+        rule = LocalRule.from_definition(definition)
+        for participant in self.participants:
+            participant["fileFields"]["1"][1]["FILE_AMT"] = participant["fileFields"]["1"][1]["AMT"]
+
+        evaluated, results = evaluate([({"id": "1", "ruleName": "R1"}, rule)], self.participants)
+        self.assertEqual(evaluated, {"1"})
+        self.assertEqual(results[1]["successRules"][0]["resultsVarable"], [{"amount": "5"}])
+        self.assertEqual(results[0]["failedRules"][0]["conditionName"], "is five")
+
+        definition["json"] = json.dumps([{"conditions": [dict(condition, radio="function")]}] * 2)
+        self.assertIsNone(LocalRule.from_definition(definition))
+
+
+class TestReportComparison(TestCase):
+    def test_joined_on_participant(self):
+        source = pd.DataFrame({"SSN": ["1", "2 ", "3"], "AMT": ["10", "5", "7"], "CODE": ["A", "B", "C"]})
+        dest = pd.DataFrame({"ID": ["2", "1", "1", "4"], "AMOUNT": ["6", "10 ", "11", "1"], "CD": ["B", "A", "A", ""]})
+        comparison = compare_reports(source, "SSN", dest, "ID", [("1", "AMT", "AMOUNT"), ("2", "CODE", "CD")])
+
+        results = {result["participantId"]: result for result in comparison.results}
+        self.assertEqual(set(results), {"1", "2 "})
+        self.assertEqual([rule["id"] for rule in results["1"]["successRules"]], ["1", "2"])
+        self.assertEqual(results["2 "]["failedRules"][0]["tbaFieldValue"], "6")
+        self.assertEqual((comparison.missing_dest, comparison.missing_source), (["3"], ["4"]))
+
+
+class TestDeltaVerification(TestCase):
+    def test_fingerprints_follow_row_changes(self):
+        frame = pd.DataFrame({"SSN": ["1", "2", "2", None], "AMT": ["10", "5", "6", "1"], "NOTE": ["a", "b", "c", ""]})
+        keys = frame["SSN"].astype("string").str.strip()
+        fingerprints = row_fingerprints(frame, keys, ["AMT"])
+        self.assertEqual(list(fingerprints.index), ["1", "2"])
+
+        changed = frame.assign(AMT=["10 ", "5", "7", "1"], NOTE="x")
+        reordered = frame.iloc[[2, 1, 0, 3]]
+        self.assertEqual(row_fingerprints(changed, keys, ["AMT"])["1"], fingerprints["1"])
+        self.assertNotEqual(row_fingerprints(changed, keys, ["AMT"])["2"], fingerprints["2"])
+        self.assertTrue(row_fingerprints(reordered, keys[[2, 1, 0, 3]], ["AMT"]).equals(fingerprints))
+
+        with tempfile.TemporaryDirectory() as folder:
+            shared = SharedFrameStore(folder, max_bytes=10 ** 6).put("key", None, "digest", frame).checkout()
+            self.assertTrue(row_fingerprints(shared, keys, ["AMT"]).equals(fingerprints))
+
+    def test_unchanged_participants_reuse_verdict(self):
+        with tempfile.NamedTemporaryFile(suffix=".sqlite3") as database:
+            store = DeltaStore(database.name, ttl=60)
+            actions = {"7": [[], "No action is taken"], "8": [["Human In Loop"], "Success"]}
+            store.record("client", [("123456789", 11, Verdict(actions)), ("2", 22, Verdict(dict()))])
+            verdicts = store.verdicts("client", {"123456789": 11, "2": 23, "3": 33})
+            self.assertEqual(list(verdicts), ["123456789"])
+            self.assertEqual(verdicts["123456789"].actions, actions)
+            self.assertEqual(store.verdicts("other", {"123456789": 11}), {})
+            with open(database.name, "rb") as content:
+                self.assertNotIn(b"123456789", content.read())
+
+    def test_reused_rows_rebuilt_from_frame(self):
+        fields = [
+            {
+                "id": id_,
+                "fileName": "FILE",
+                "sheetName": "",
+                "mfFieldName": name,
+                "mfFieldWoutSpace": name,
+                "matchType": "Compare with TBA",
+                "tbaFieldName": "T" + name,
+                "ruleName": "NA",
+            }
+            for id_, name in ((7, "AMT"), (8, "DOB"))
+        ]
+        source = source_stub(
+            uid="RQ-2",
+            reused_verdicts={"1": Verdict({"7": [[], NO_ACTION_IS_TAKEN], "8": [["Human In Loop"], "Success"]})},
+        )
+        source.get_fields_to_match.return_value = (fields, None)
+        source.get_tba_report_field = lambda match_type, field: field["tbaFieldName"]
+        frame = pd.DataFrame({"SSN": [" 1", "2"], "AMT": ["10", "5"], "DOB": ["2000", "1990"]})
+        item = {"required_frame": frame, "fileName": "FILE", "identifierName": "SSN"}
+
+        rows = SourceMatch.reused_audit_rows(source, [item], [frame["SSN"].astype("string").str.strip()])
+        self.assertEqual([(row["id"], row["mainframeValue"]) for row in rows], [("7", "10"), ("8", "2000")])
+        self.assertTrue(all("reused" not in row and row["uid"] == "RQ-2" and row["reason"] == "" for row in rows))
+        self.assertEqual([row["actionStatus"] for row in rows], [NO_ACTION_IS_TAKEN, "Success"])
+        self.assertEqual([row["correctiveAction"] for row in rows], [[], ["Human In Loop"]])
+
+        audit = json.loads(str(SourceMatch.audit_document(source, rows, "FILE")))
+        self.assertEqual(audit["participantsReused"], 1)
+
+
+class TestFullVerification(TestCase):
+    @override_settings(VERIFY_WINDOW=2)
+    def test_participants_verified_in_windows(self):
+        frame = pd.DataFrame({"SSN": ["4", "1", "2", None, "3", "5"], "AMT": ["4", "1", "2", "0", "3", "5"]})
+        participants = np.array(["1", "2", "3", "4", "5"], dtype=object)
+        positions = window_rows(participant_keys(frame, "SSN"), participants, 2)
+        details = [{"ssn": "SSN", "required_frame": frame, "windows": positions}]
+        windows = list()
+
+        def verify_participants(ksdfiles_details, files):
+            ppt_ids = ksdfiles_details[0]["required_frame"]["SSN"].tolist()
+            windows.append(ppt_ids)
+            return (ppt_ids == ["5"], [{"participantSsn": "5"}] if ppt_ids == ["5"] else [], [{"ids": ppt_ids}])
+
+        source = source_stub(sampled_ppt=["1", "2", "3", "4", "5"])
+        source.verify_participants = verify_participants
+        not_in_tba, audit_resp, rule_resp = SourceMatch.verify_in_windows(source, details, ["FILE"])
+
+        self.assertEqual(windows, [["1", "2"], ["4", "3"], ["5"]])
+        self.assertFalse(not_in_tba)
+        self.assertEqual((audit_resp, rule_resp), ([], []))
+        self.assertEqual(
+            [call.args for call in source.store_window.call_args_list],
+            [
+                ([{"ids": ["1", "2"]}], ["1", "2"], True, "FILE"),
+                ([{"ids": ["4", "3"]}], ["3", "4"], True, "FILE"),
+                ([{"ids": ["5"]}, {"participantSsn": "5"}], ["5"], False, "FILE"),
+            ],
+        )
+        self.assertIs(source.ksdfiles_details, details)
+
+    def verify_windows(self, participants: int) -> tuple:
+        """Audit parts and traced peak memory of verifying `participants` rows, one row each"""
+        ppt_ids = [f"{index:09d}" for index in range(participants)]
+        frame = pd.DataFrame({"SSN": ppt_ids})
+        windows = window_rows(participant_keys(frame, "SSN"), np.array(ppt_ids, dtype=object), settings.VERIFY_WINDOW)
+        details = [{"ssn": "SSN", "required_frame": frame, "windows": windows, "pptidentifierType": "SSN"}]
+        stored = list()
+
+        def verify_participants(ksdfiles_details, files):
+            rows = [
+                {
+                    "participantSsn": ppt,
+                    "dataMismatch": "AMT",
+                    "mainframeValue": "x" * 200,
+                    "eventName": "",
+                    "correctiveAction": [],
+                    "actionStatus": "Success" if int(ppt) % 100 else "Failed",
+                }
+                for ppt in ksdfiles_details[0]["required_frame"]["SSN"]
+            ]
+            return (False, list(), rows)
+
+        def offload_audit_rows(rows, files, part):
+            stored.append(len(rows))
+            return f"RQ-1_audit_detail_{part}.pkl"
+
+        source = source_stub("is_human_in_loop", "store_window", sampled_ppt=ppt_ids, update_event_name={})
+        source.verify_participants = verify_participants
+        source.offload_audit_rows = offload_audit_rows
+        source.record_verdicts = lambda *args: None
+
+        gc.collect()
+        tracemalloc.start()
+        SourceMatch.verify_in_windows(source, details, ["FILE"])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return source.audit_parts, stored, peak
+
+    @override_settings(VERIFY_WINDOW=500)
+    def test_window_rows_not_held(self):
+        parts, stored, peak = self.verify_windows(2000)
+        self.assertEqual(stored, [500] * 4)
+        self.assertEqual(parts.keys, [f"RQ-1_audit_detail_part{index}.pkl" for index in range(1, 5)])
+        self.assertEqual((parts.rows, len(parts.failed)), (2000, 20))
+        self.assertTrue(parts.human_in_loop)
+
+        # four times the participants, about the same peak
+        _, _, larger_peak = self.verify_windows(8000)
+        self.assertLess(larger_peak, peak * 1.5)
+
+    def test_window_fails_without_docstore(self):
+        source = source_stub()
+        source.offload_audit_rows.return_value = None
+        source.is_human_in_loop.return_value = False
+        rows = [{"participantSsn": "123456789", "dataMismatch": "AMT", "actionStatus": "Success"}]
+
+        with self.assertRaises(FileValidationError) as raised:
+            SourceMatch.store_window(source, rows, ["123456789"], False, "FILE")
+        self.assertEqual(raised.exception.detail["maestro"], MAESTRO["audit_store"])
+        self.assertEqual(source.audit_parts.rows, 0)
+
+
+class TestPipelinedVerification(TestCase):
+    @override_settings(PIPELINE_WORKERS=2)
+    def test_identifiers_matched_independently(self):
+        details = [{"identifierName": "A"}, {"identifierName": "B"}]
+        released = threading.Event()
+
+        def inquire_participants(ksdfile, files):
+            # B's inquiry only completes once A is matched
+            if ksdfile["identifierName"] == "B":
+                self.assertTrue(released.wait(5))
+            return ksdfile["identifierName"]
+
+        def call_rule_engine(ksdfiles_details, file_names, units):
+            released.set()
+            return ([{"mismatch": units[0]["identifierName"]}], [{"success": units[0]["identifierName"]}])
+
+        source = source_stub()
+        source.inquire_participants = inquire_participants
+        source.is_not_in_tba = lambda ksdfiles, responses: (False, [{"inquired": responses[0]}])
+        source.reads_other_identifiers.return_value = False
+        source.call_rule_engine = call_rule_engine
+        source.apply_corrective_actions = lambda rows, files, ksdfiles_details: rows
+
+        not_in_tba, audit_resp, rule_resp = SourceMatch.verify_pipelined(source, details, ["FILE"])
+        self.assertFalse(not_in_tba)
+        self.assertEqual(audit_resp, [{"inquired": "A"}, {"inquired": "B"}])
+        self.assertEqual(rule_resp, [{"mismatch": "A"}, {"mismatch": "B"}, {"success": "A"}, {"success": "B"}])
+
+
+class TestProcessOffload(TestCase):
+    def test_chunks_keep_order(self):
+        self.assertEqual(chunks(list(range(7)), 3), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(chunks([], 3), [])
+
+    @override_settings(OFFLOAD_WORKERS=1, OFFLOAD_MIN_ROWS=2)
+    def test_chunks_run_in_pool(self):
+        self.assertFalse(offloaded(1))
+        self.assertTrue(offloaded(2))
+        self.assertEqual(run_chunks(divmod, [(7, 2), (9, 3)]), [(3, 1), (3, 0)])
+
+    def test_copy_restricted_to_participants(self):
+        frame = pd.DataFrame({"SSN": ["1", "2", "3"], "AMT": ["a", "b", "c"]})
+        details = [{"ssn": "SSN", "required_frame": frame, "tba_frame": {"1": {}, "2": {}, "3": {}}}]
+        source = SourceMatch.__new__(SourceMatch)
+        source.ksdfiles_details = details
+
+        matcher, restricted = SourceMatch.for_participants(source, ["2", "3"], details)
+        self.assertEqual(restricted[0]["required_frame"]["SSN"].tolist(), ["2", "3"])
+        self.assertEqual(sorted(restricted[0]["tba_frame"]), ["2", "3"])
+        self.assertIs(matcher.ksdfiles_details[0], restricted[0])
+        self.assertEqual(len(details[0]["required_frame"]), 3)
+
+
+class TestActionTable(TestCase):
+    def test_rows_from_action_table(self):
+        actions = [
+            {"condition": "C1", "satisfied": NOT_MET, "correctAction": "Human in Loop", "actions": []},
+            {
+                "condition": "C1",
+                "satisfied": MET,
+                "correctAction": "Rerun-Event",
+                "actions": [{"eventName": "E1", "reRunEvent": "R1"}, {"eventName": "E2", "reRunEvent": "R2"}],
+            },
+        ]
+        match_config = {
+            "7": {
+                "id": 7,
+                "actions": json.dumps(actions),
+                "fileName": "FILE",
+                "sheetName": "SHEET",
+                "mfFieldName": "Amount",
+                "matchType": "Compare with TBA",
+                "tbaFieldName": "AMT",
+            }
+        }
+        source = SourceMatch.__new__(SourceMatch)
+        source.uid = "RQ-1"
+        source.action_tables = dict()
+        field = {"id": "7", "uniq": "7", "fileFieldValue": "1", "tbaFieldValue": "2", "ruleName": "", "reason": "x"}
+
+        with mock.patch("fileValidation.utils.json.loads", side_effect=json.loads) as loads:
+            details = SourceMatch.get_participant_details
+            failed = details(source, dict(field, conditionName="C1"), "1", match_config, "Failed")
+            success = details(source, dict(field, conditionName="C1"), "2", match_config, "Success")
+            unknown = details(source, dict(field, conditionName="C9"), "3", match_config, "Failed")
+        self.assertEqual(loads.call_count, 1)
+
+        self.assertEqual([row["correctiveAction"] for row in failed], [["Human in Loop"]])
+        self.assertEqual([(row["eventName"], row["rerunEvent"]) for row in success], [("E1", "R1"), ("E2", "R2")])
+        self.assertEqual([row["participantSsn"] for row in success], ["2", "2"])
+        self.assertEqual([row["correctiveAction"] for row in unknown], [["Human in Loop"], ["Rerun-Event"]])
+        self.assertEqual(unknown[1]["eventName"], "")
+
+
+class TestAuditRow(TestCase):
+    def test_reads_and_writes_like_a_dict(self):
+        fields = {"id": "1", "participantSsn": "123456789", "reason": "Mismatch", "correctiveAction": ["Human In Loop"]}
+        row = AuditRow(dict(fields, tbaUpdate="Success"))
+        expected = dict(fields, tbaUpdate="Success")
+        self.assertEqual(row, expected)
+        self.assertEqual(list(row), list(expected))
+        self.assertEqual(len(row), 5)
+        self.assertNotIn("internalId", row)
+        with self.assertRaises(KeyError):
+            row["internalId"]
+
+        row.update({"internalId": "INT1", "reason": "Matched"})
+        self.assertEqual(row.pop("id"), "1")
+        self.assertIsNone(row.pop("id", None))
+        self.assertEqual(row.get("eventName", ""), "")
+        expected = {
+            "participantSsn": "123456789",
+            "reason": "Matched",
+            "correctiveAction": ["Human In Loop"],
+            "internalId": "INT1",
+            "tbaUpdate": "Success",
+        }
+        self.assertEqual(row.to_dict(), expected)
+
+        self.assertEqual(jsoncodec.loads(jsoncodec.dumpb({"MFvsTba": [row]})), {"MFvsTba": [expected]})
+        self.assertEqual(pickle.loads(pickle.dumps(row)), expected)
+        self.assertEqual(pd.DataFrame([row]).to_dict("records"), [expected])
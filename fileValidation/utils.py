@@ -1,31 +1,71 @@
 """This module contain all logic functions"""
 import json
 import copy
+import contextvars
 import warnings
 from io import BytesIO
 from builtins import Exception
 from datetime import datetime
 import dateutil
 from typing import Dict, List, Optional, Tuple
-import random
 from collections import defaultdict
+from concurrent import futures
+from types import MappingProxyType
 from operator import itemgetter
 import os
+import pickle
+import sqlite3
+import zipfile
 
+import numpy as np
 import pandas as pd
 from django.conf import settings
 from requests import Session
 from requests.utils import quote
 from py_zipkin.zipkin import create_http_headers_for_new_span
 
+from utilities import jsoncodec
+
 from .helpers import (
     LOGGER,
     FileValidationError,
 )
+from .delta import DeltaStore, Verdict, combine_fingerprints, config_digest, row_fingerprints
 from .effectivedate import dateproperformat
+from .inquiry_cache import inquiry_cache
+from .frame_cache import FrameCache, content_digest
+from . import offload
+from .internal_ids import REGISTRY as INTERNAL_ID_REGISTRY
+from .records import AuditParts, AuditRow, InquiryIndex
+from .report_compare import compare_reports
+from .rules import LocalRule, evaluate as evaluate_rules
+from .sampling import (
+    CoverageStore,
+    common_participants,
+    coverage_sample,
+    participant_keys,
+    sample_participants,
+    select_participants,
+    select_rows,
+    window_rows,
+)
+from .shared_frames import SharedFrameStore, materialize
 
 warnings.simplefilter(action="ignore", category=FutureWarning)
 
+INQUIRY_CACHE = inquiry_cache(settings.INQUIRY_CACHE_TTL, settings.INQUIRY_CACHE_SIZE, settings.INQUIRY_CACHE_SHARED)
+if settings.SHARED_FRAME_DIR:
+    FRAME_CACHE = SharedFrameStore(settings.SHARED_FRAME_DIR, settings.SHARED_FRAME_BYTES)
+elif settings.FRAME_CACHE_BYTES:
+    FRAME_CACHE = FrameCache(settings.FRAME_CACHE_BYTES)
+else:
+    FRAME_CACHE = None
+# the SQLite stores open their files on first use in each process
+COVERAGE_STORE = (
+    CoverageStore(settings.PPT_COVERAGE_DB, settings.PPT_COVERAGE_TTL) if settings.PPT_COVERAGE_DB else None
+)
+DELTA_STORE = DeltaStore(settings.DELTA_DB, settings.DELTA_TTL) if settings.DELTA_DB else None
+
 # Satisfied/Not Satisfied
 MET = "Met"
 NOT_MET = "Not Met"
@@ -45,6 +85,8 @@ FILE_REPORT_UPDATE = "File/Report Update"
 
 NO_MISMATCH = "No Mismatch"
 HUMAN_IN_LOOP = "HumanInLoop"
+# pptVerifyTba verifying every participant, in VERIFY_WINDOW sized windows
+VERIFY_ALL = "ALL"
 NO_ACTION_IS_TAKEN = "no action is taken"
 
 FAILED_TO_GET_RESPONSE = "Failed to get response"
@@ -74,26 +116,29 @@ COMPARE_REPORT = (
     "compare with other report",
     "comparepreviousreport",
 )
-INTERNAL_ID = {
-    "id": 0,
-    "inquiryName": "Unmasked SSN/Taxpayer ID",
-    "parNM": "",
-    "panelId": "",
-    "tbaFieldName": "internalId",
-    "fieldType": "String",
-    "jsonKey": "intnId",
-    "subJsonKey": "",
-    "metaData": "",
-    "identifier": "",
-    "recordIdentifier": "",
-    "inquiryDefName": "UNMASKEDSSN_INTERNALID",
-    "sequence": "1",
-    "effDateType": "date",
-    "effFromDate": '{"effectiveFromDateAppNameWithoutSpace":"","effectiveFromDateSheetName":"","effectiveFromDateRIdentifier":"","effectiveFromDateField":"","effectiveFromDatePeriod":"Current","effectiveFromDateInterval":"Date"}',
-    "effToDate": '{"effectiveToDateAppNameWithoutSpace":"","effectiveToDateSheetName":"","effectiveToDateRIdentifier":"","effectiveToDateField":"","effectiveToDatePeriod":"","effectiveToDateFrequency":"","effectiveToDateInterval":""}',
-    "rowMatrix": "",
-    "columnMatrix": "",
-}
+# template of the internal ID inquiry field, copied per request
+INTERNAL_ID = MappingProxyType(
+    {
+        "id": 0,
+        "inquiryName": "Unmasked SSN/Taxpayer ID",
+        "parNM": "",
+        "panelId": "",
+        "tbaFieldName": "internalId",
+        "fieldType": "String",
+        "jsonKey": "intnId",
+        "subJsonKey": "",
+        "metaData": "",
+        "identifier": "",
+        "recordIdentifier": "",
+        "inquiryDefName": "UNMASKEDSSN_INTERNALID",
+        "sequence": "1",
+        "effDateType": "date",
+        "effFromDate": '{"effectiveFromDateAppNameWithoutSpace":"","effectiveFromDateSheetName":"","effectiveFromDateRIdentifier":"","effectiveFromDateField":"","effectiveFromDatePeriod":"Current","effectiveFromDateInterval":"Date"}',
+        "effToDate": '{"effectiveToDateAppNameWithoutSpace":"","effectiveToDateSheetName":"","effectiveToDateRIdentifier":"","effectiveToDateField":"","effectiveToDatePeriod":"","effectiveToDateFrequency":"","effectiveToDateInterval":""}',
+        "rowMatrix": "",
+        "columnMatrix": "",
+    }
+)
 
 
 def clean_pid(pid: str) -> str:
@@ -227,6 +272,14 @@ def combined_name(f_name: str, i_name: str, s_name: str) -> str:
     return key_name
 
 
+def zip_pickle(frame: pd.DataFrame, name: str) -> bytes:
+    """Docstore format (zip compressed pickle) built in memory"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(name, pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+    return buffer.getvalue()
+
+
 def common_keys(l1: list, l2: list) -> list:
     """
     Get common fields
@@ -235,6 +288,35 @@ def common_keys(l1: list, l2: list) -> list:
     return list(set(l1).intersection(set(l2)))
 
 
+def build_rule_participants(
+    matcher: "SourceMatch", ksdfile_deails: List[dict], sm_details: list, frame: pd.DataFrame, unit: int
+) -> Tuple[list, dict]:
+    """Rule Engine participants of the rows of frame, `unit` is the position of their ksd file"""
+    change_sm = dict()
+    participants = [
+        matcher.get_file_tba_fields(index, sm_details, row, ksdfile_deails[unit], ksdfile_deails, change_sm)
+        for index, row in frame.iterrows()
+    ]
+    return (participants, change_sm)
+
+
+def build_mismatch_success(matcher: "SourceMatch", match_config: dict, participants: List[dict]) -> Tuple[list, list]:
+    """Mismatch and success rows of Rule Engine response participants"""
+    mismatch_data = list()
+    success_data = list()
+    for participant in participants:
+        mismatch, success = matcher.get_participant_mismatch_success(match_config, participant)
+        mismatch_data.extend(mismatch)
+        success_data.extend(success)
+    return (mismatch_data, success_data)
+
+
+def build_tba_update_payload(
+    matcher: "SourceMatch", file_details: List[dict], rule_resp: List[dict]
+) -> Tuple[Dict[str, list], List[dict], List[dict]]:
+    return matcher.tba_update_payload_data(rule_resp, file_details)
+
+
 class SourceMatch:
     """SourceMatch class is to call Redis, TBAInquiry and Rule Engine"""
 
@@ -246,7 +328,7 @@ class SourceMatch:
         self.process_job_mapping = request["processJobMapping"]
         self.client_id = request["clientId"]
         self.client_name = request["clientName"]
-        self.ksd_file_details = request["ksdFileDetails"]
+        self.ksd_file_details = request["ksdFileDetails"]  # KsdFileDetails records
         self.file_formatter = request["File Formatter"]
         self.file_validator = request["File Validator"]
         self.uid = request["uid"]
@@ -276,10 +358,14 @@ class SourceMatch:
         self.notice_config = request["tbaNoticeInqConfig"]
         self.tba_event_hist_inq_config = request["tbaEventHistInqConfig"]
         self.tba_pend_event_inq_config = request["tbaPendEventInqConfig"]
+        self.inquiry_index = InquiryIndex(
+            self.inquiry_config, self.notice_config, self.tba_event_hist_inq_config, self.tba_pend_event_inq_config
+        )
         self.ksd_output_file_details = request["ksdOutputFileDetails"]
         self.layout_config = request["layoutConfig"]
         self.redis_keys = request["redisKeys"]
         self.internal_id = dict()  # store internal id's with ssn as key
+        self.action_tables = dict()  # audit row actions per match id, see get_action_table
         self.audit = {
             "uid": self.uid,
             "clientDet": self.client_id,
@@ -299,6 +385,13 @@ class SourceMatch:
         }
         self.ppt_total = 0
         self.ppt_verified = 0
+        self.sampled_ppt = list()
+        self.verify_all = False
+        self.delta_scope = ""
+        self.delta_fingerprints = dict()
+        self.reused_verdicts = dict()
+        self.reused_rows = list()
+        self.audit_parts = AuditParts()
         self.ppt_success = 0
         self.ppt_failed = 0
         self.excel_botoutput = ""
@@ -306,43 +399,26 @@ class SourceMatch:
     
 
 
-    def in_inquiry(self, def_name: str, identifier: str, config: List[dict]):
-        for field in config:
-            if field["inquiryDefName"] == def_name and field["identifier"] == identifier:
-                if "effDateType" in field.keys() and field["effDateType"] == "application":
-                    self.ppt_specific_fields(field["effFromDate"], field["effToDate"])
-                return True
-        return False
-
-    def inq_wout_identifier(self, def_name: str, config: List[dict], inq_def_name: str = "inquiryDefName"):
-        for field in config:
-            if field[inq_def_name] == def_name:
-                return True
-        return False
-
     # Look for the configured inquiry fields with proper identifier configurations
     def inquiry_lookup(self, def_name: str, identifier: str):
         """
         Look for the given def_name with it's identifier in inquiry fields.
         If not configured properly add error msg to `self.errors`.
         """
-        if self.in_inquiry(def_name, identifier, self.inquiry_config) or self.in_inquiry(
-            def_name, identifier, self.notice_config
-        ):
+        field = self.inquiry_index.field(def_name, identifier)
+        if field is not None:
+            if "effDateType" in field.keys() and field["effDateType"] == "application":
+                self.ppt_specific_fields(field["effFromDate"], field["effToDate"])
             self.required_fields.add((def_name, identifier))
             return
-        elif self.inq_wout_identifier(
-            def_name, self.tba_event_hist_inq_config, "eventHistDefName"
-        ) or self.inq_wout_identifier(def_name, self.tba_pend_event_inq_config, "pendgEvntDefName"):
+        elif def_name in self.inquiry_index.without_identifier:
             self.required_fields.add((def_name))
             return
-        elif self.inq_wout_identifier(def_name, self.inquiry_config) or self.inq_wout_identifier(
-            def_name, self.notice_config
-        ):
+        elif def_name in self.inquiry_index.def_names:
             self.errors.add(f"{def_name} not configured with identifier '{identifier}' in TBA")
             return
         self.errors.add(f"{def_name} is not configured in TBA")
-    
+
     def ppt_specific_fields(self, frm_date: str, to_date: str):
         eff_frm_date = json.loads(frm_date)
         eff_to_date = json.loads(to_date)
@@ -491,13 +567,7 @@ class SourceMatch:
         """
 
         for field in self.tba_match_config:
-            fname = field["fileNameWoutSpace"]
-
-            for ksdfile in self.ksd_file_details:
-                _file = json.loads(ksdfile)
-                if _file["fileNameWoutSpace"].lower() == fname.lower():
-                    break
-            else:
+            if not self.ksd_file_details.has_file(field["fileNameWoutSpace"]):
                 self.errors.add("File name mismatch for few fields of Match TBA")
 
     def check_identifiers(self, identifiers: set, keys, name: str):
@@ -519,16 +589,7 @@ class SourceMatch:
         """
 
         for namewoutspace, identifiers in self.file_identifier.items():
-            name = None
-            for ksdfile in self.ksd_file_details:
-                _file = json.loads(ksdfile)
-                if _file["fileNameWoutSpace"].lower() == namewoutspace.lower():
-                    name = _file["fileName"]
-                elif (
-                    _file.get("prevReportFileNameWs") is not None
-                    and _file.get("prevReportFileNameWs", "").lower() == namewoutspace.lower()
-                ):
-                    name = _file["prevReportFileName"]
+            name = self.ksd_file_details.file_name(namewoutspace)
 
             if name is None:
                 raise FileValidationError(self, f"{namewoutspace}'s configurations not found.", maestro="not_valid")
@@ -587,31 +648,204 @@ class SourceMatch:
         get filetered participant from each detail redis key of a mainframe file.
         """
 
-        list_of_participant_set = list()
-        for redis_key in detail_redis_key:
-            ppt_identifier = redis_key["ssn"]
-            redis_frame = redis_key["required_frame"]
-            redis_frame.fillna("", inplace=True)
-            redis_frame.drop_duplicates(inplace=True)
-            redis_frame = redis_frame[pd.notnull(redis_frame[ppt_identifier])]
-            redis_frame[ppt_identifier] = redis_frame[ppt_identifier].map(str)
-            redis_frame = redis_frame[redis_frame[ppt_identifier].apply(lambda x: x.strip()) != ""]
-            list_of_participant_set.append(set(redis_frame[ppt_identifier]))
+        keys = [participant_keys(item["required_frame"], item["ssn"]) for item in detail_redis_key]
         LOGGER.info("Filtering participants", extra=self.header_details)
-        common_ppt_list = list(set.intersection(*list_of_participant_set))
+        common_ppt = common_participants(keys)
+        ppt_tot = len(common_ppt)
+        if DELTA_STORE is not None:
+            common_ppt = self.skip_unchanged(detail_redis_key, keys, common_ppt)
         ppt_ver = 5
-        if "pptVerifyTba" in self.tba_match_config[0] and self.tba_match_config[0]["pptVerifyTba"] not in ("NA", ""):
-            ppt_ver = int(self.tba_match_config[0]["pptVerifyTba"])
+        verify_tba = str(self.tba_match_config[0].get("pptVerifyTba", "NA")).strip()
+        if verify_tba.upper() == VERIFY_ALL:
+            self.verify_all = True
+            ppt_ver = len(common_ppt)
+            LOGGER.info("PPTVerify given ALL, verifying every participant", extra=self.header_details)
+        elif verify_tba not in ("NA", ""):
+            ppt_ver = int(verify_tba)
             LOGGER.info(f"PPTVerify given {ppt_ver}", extra=self.header_details)
-        ppt_tot = len(common_ppt_list)
-        if ppt_tot <= ppt_ver:
-            ppt_ver = ppt_tot
-        random_ppt_list = random.sample(common_ppt_list, ppt_ver)
+        if len(common_ppt) <= ppt_ver:
+            ppt_ver = len(common_ppt)
+        sampled_ppt = self.pick_participants(common_ppt, ppt_ver)
+        self.sampled_ppt = sampled_ppt.tolist()
         self.ppt_total += ppt_tot
-        self.ppt_verified += ppt_ver
-        for item in detail_redis_key:
-            df = item["required_frame"]
-            item["required_frame"] = df[df[ppt_identifier].isin(random_ppt_list)]
+        self.ppt_verified += ppt_ver + len(self.reused_verdicts)
+        for item, key in zip(detail_redis_key, keys):
+            if self.verify_all:
+                # the rows are selected one window at a time by verify_in_windows
+                item["windows"] = window_rows(key, sampled_ppt, settings.VERIFY_WINDOW)
+            else:
+                item["required_frame"] = select_participants(item["required_frame"], key, sampled_ppt)
+
+    def get_fingerprint_columns(self, item: dict) -> List[str]:
+        """Matched and rule columns of a frame, every column if it has none"""
+        frame = item["required_frame"]
+        match_fields, _ = self.get_fields_to_match(item["fileName"], item["identifierName"])
+        columns = [field["mfFieldWoutSpace"] for field in match_fields]
+        for field in match_fields:
+            if field["ruleName"] not in ("NA", ""):
+                f_rule_fields, _ = self.get_rules_fields(field, item["fileName"], "tba")
+                columns.extend(rule_field[0] for rule_field in f_rule_fields)
+        columns = [column for column in dict.fromkeys(columns) if column in frame.columns]
+        return columns or list(frame.columns)
+
+    def skip_unchanged(self, detail_redis_key: list, keys: List[pd.Series], participants):
+        """
+        Participants new or changed since their last verification. The audit
+        rows of the unchanged ones are reused from DELTA_DB.
+        """
+        fingerprints = [
+            row_fingerprints(item["required_frame"], key, self.get_fingerprint_columns(item))
+            for item, key in zip(detail_redis_key, keys)
+        ]
+        current = dict(zip(participants.tolist(), combine_fingerprints(fingerprints, participants).tolist()))
+        self.delta_scope = f"{self.client_id}:" + config_digest(
+            self.pjm_id,
+            [(item["fileName"], item["sheetName"], item["identifierName"]) for item in detail_redis_key],
+            self.tba_match_config,
+            self.rules_config,
+            self.inquiry_config,
+            self.tba_update_config,
+        )
+        try:
+            self.reused_verdicts = DELTA_STORE.verdicts(self.delta_scope, current)
+        except sqlite3.Error as err:
+            LOGGER.warning(f"Delta history unavailable, verifying every participant: {err}", extra=self.header_details)
+            self.reused_verdicts = dict()
+
+        self.delta_fingerprints = {ppt: value for ppt, value in current.items() if ppt not in self.reused_verdicts}
+        self.reused_rows = self.reused_audit_rows(detail_redis_key, keys)
+        LOGGER.info(
+            f"{len(self.reused_verdicts)} participant(s) unchanged since their last verification",
+            extra=self.header_details,
+        )
+        return participants[np.array([ppt in self.delta_fingerprints for ppt in participants], dtype=bool)]
+
+    def reused_audit_rows(self, detail_redis_key: list, keys: List[pd.Series]) -> List[AuditRow]:
+        """
+        Audit rows of the participants reusing a verdict, rebuilt from their current rows with the
+        corrective action and action status of the run that verified them
+        """
+        rows = list()
+        if not self.reused_verdicts:
+            return rows
+
+        for item, key in zip(detail_redis_key, keys):
+            frame = item["required_frame"]
+            mask = key.isin(list(self.reused_verdicts)).to_numpy(dtype=bool, na_value=False)
+            frame = (
+                materialize(frame[mask])
+                .fillna("")
+                .assign(__participant=key[mask].to_numpy())
+                .drop_duplicates("__participant")
+            )
+            match_fields, _ = self.get_fields_to_match(item["fileName"], item["identifierName"])
+
+            for record in frame.to_dict("records"):
+                verdict = self.reused_verdicts[record["__participant"]]
+                for field in match_fields:
+                    field_id = str(field["id"])
+                    if field_id not in verdict.actions:
+                        continue
+                    corrective_action, action_status = verdict.actions[field_id]
+                    rows.append(
+                        AuditRow(
+                            {
+                                "id": field_id,
+                                "uid": self.uid,
+                                "participantSsn": record["__participant"],
+                                "participantName": "",
+                                "fileName": field["fileName"],
+                                "sheetName": field["sheetName"],
+                                "dataMismatch": field["mfFieldName"],
+                                "tbaFieldName": self.get_tba_report_field(field["matchType"], field),
+                                "mainframeValue": record.get(field["mfFieldWoutSpace"], ""),
+                                "tbaValue": "",
+                                "ruleName": field["ruleName"] if field["ruleName"] != "NA" else "",
+                                "ruleFailedOnField": [field["mfFieldName"]],
+                                "reason": "",
+                                "eventName": "",
+                                "rerunEvent": "",
+                                "noticeCancel": list(),
+                                "noticeUpdate": "",
+                                "pendingEventName": "",
+                                "effectiveDate": "",
+                                "resultsVarable": list(),
+                                "matchType": field["matchType"],
+                                "correctiveAction": corrective_action,
+                                "conditionName": list(),
+                                "ifCondition": "",
+                                "actionStatus": action_status,
+                                "updateAction": list(),
+                                "internalId": "",
+                            }
+                        )
+                    )
+        return rows
+
+    def record_verdicts(self, audit_rows: List[dict], ksdfiles_details: List[dict], participants: list = None):
+        """
+        Remember the corrective action and action status of every match field id of the verified
+        participants (every sampled participant by default) with their fingerprints, a mismatched
+        row of a field wins over a matched one. Participants with a row outside a match field
+        (e.g. not found in TBA) are verified again next time.
+        """
+        participants = self.sampled_ppt if participants is None else participants
+        if DELTA_STORE is None or not participants:
+            return
+
+        identifiers = {str(ksdfile["pptidentifierType"]).lower() for ksdfile in ksdfiles_details}
+        owners = dict()
+        for ppt in participants:
+            owners.update((strip_pid(identifier, ppt), ppt) for identifier in identifiers)
+            owners[ppt] = ppt
+        verdicts = {ppt: Verdict(dict()) for ppt in participants}
+        for row in audit_rows:
+            ppt = owners.get(str(row["participantSsn"]).strip())
+            if ppt is None or ppt not in verdicts:
+                continue
+            if "id" not in row:
+                del verdicts[ppt]
+                continue
+            actions = verdicts[ppt].actions
+            field_id = str(row["id"])
+            if field_id not in actions or row["actionStatus"].lower() not in ("success", NO_ACTION_IS_TAKEN):
+                actions[field_id] = [list(row["correctiveAction"]), row["actionStatus"]]
+        try:
+            DELTA_STORE.record(
+                self.delta_scope, ((ppt, self.delta_fingerprints[ppt], verdict) for ppt, verdict in verdicts.items())
+            )
+        except sqlite3.Error as err:
+            LOGGER.warning(f"Unable to record verified participants: {err}", extra=self.header_details)
+
+    def pick_participants(self, participants, count: int):
+        """
+        Participants to verify. With PPT_COVERAGE_DB set, recently failed and
+        not yet verified participants of the client/pjmId are picked first.
+        """
+        if COVERAGE_STORE is not None:
+            try:
+                history = COVERAGE_STORE.history(f"{self.client_id}:{self.pjm_id}")
+                return coverage_sample(participants, count, history, seed=settings.PPT_SAMPLE_SEED)
+            except sqlite3.Error as err:
+                LOGGER.warning(f"Coverage history unavailable, sampling at random: {err}", extra=self.header_details)
+
+        return sample_participants(participants, count, seed=settings.PPT_SAMPLE_SEED)
+
+    def record_coverage(self, failed_ssn: set, ksdfiles_details: List[dict]):
+        """Remember the verified participants and which of them failed"""
+        if COVERAGE_STORE is None:
+            return
+
+        identifiers = {str(ksdfile["pptidentifierType"]).lower() for ksdfile in ksdfiles_details}
+        failed = [
+            ppt
+            for ppt in self.sampled_ppt
+            if any(strip_pid(identifier, ppt) in failed_ssn for identifier in identifiers)
+        ]
+        try:
+            COVERAGE_STORE.record(f"{self.client_id}:{self.pjm_id}", self.sampled_ppt, failed)
+        except sqlite3.Error as err:
+            LOGGER.warning(f"Unable to record verified participants: {err}", extra=self.header_details)
 
     def get_redis_keys(self, file_name):
         """
@@ -637,21 +871,20 @@ class SourceMatch:
         source_match_files = phase_names.split(",")
         LOGGER.info(f"ksd_files_details data: {self.ksd_file_details}", extra=self.header_details)
 
-        for ksd_file in self.ksd_file_details:
+        for _file in self.ksd_file_details:
             _detail = dict()
-            _file = json.loads(ksd_file)
-            if _file["fileNameWoutSpace"].lower() in self.required_files and _file["fileName"] in source_match_files:
+            if _file.fileNameWoutSpace.lower() in self.required_files and _file.fileName in source_match_files:
                 _detail["ssn"] = self.get_pptidentifier(
-                    _file["fileName"],
-                    _file["pptidentifier"],
+                    _file.fileName,
+                    _file.pptidentifier,
                     self.layout_config,
                     {"fieldName": "mfFieldName", "fieldNameWoutSpace": "mfFieldWoutSpace"},
                 )
-                _detail["fileName"] = _file["fileName"]
-                _detail["fileNameWoutSpace"] = _file["fileNameWoutSpace"]
-                _detail["sheetName"] = _file["sheetName"]
-                _detail["fileType"] = _file["fileType"]
-                _detail["pptidentifierType"] = _file["pptidentifierType"]
+                _detail["fileName"] = _file.fileName
+                _detail["fileNameWoutSpace"] = _file.fileNameWoutSpace
+                _detail["sheetName"] = _file.sheetName
+                _detail["fileType"] = _file.fileType
+                _detail["pptidentifierType"] = _file.pptidentifierType
 
                 temp_files = list()
                 temp_files.append(
@@ -665,14 +898,14 @@ class SourceMatch:
                     }
                 )
                 if (
-                    _file.get("prevReportFileName", None) is not None
-                    and _file.get("prevReportFileNameWs", "").lower() in self.required_files
+                    _file.prevReportFileName is not None
+                    and (_file.prevReportFileNameWs or "").lower() in self.required_files
                 ):
                     temp_files.append(
                         {
                             "ssn": _detail["ssn"],
-                            "fileName": _file["prevReportFileName"],
-                            "fileNameWoutSpace": _file["prevReportFileNameWs"],
+                            "fileName": _file.prevReportFileName,
+                            "fileNameWoutSpace": _file.prevReportFileNameWs,
                             "sheetName": _detail["sheetName"],
                             "fileType": _detail["fileType"],
                             "pptidentifierType": _detail["pptidentifierType"],
@@ -738,10 +971,66 @@ class SourceMatch:
 
         if response.status_code == 201:
             LOGGER.info("File set successfully", extra=self.header_details)
-            return response.json()
+            return jsoncodec.response_json(response)
         LOGGER.error(f"Unable to get File/Report {response.content}", extra=self.header_details)
         raise FileValidationError(self, ERROR_MSG_FILE_REPORT, maestro="redis_response", name=file_name)
 
+    def offload_audit_rows(self, rows: List[dict], files: str, part: str = "") -> Optional[str]:
+        """
+        Store audit rows (one `part` of them when given) in the docstore as a zip compressed
+        DataFrame pickle
+
+        Returns:
+            Optional[str]: docstore key, None if the rows couldn't be stored
+        """
+        key = combined_name(f"{self.uid}_audit_detail", part, "")
+        data = {"file": (key, zip_pickle(pd.DataFrame(rows), key.replace(".pkl", "")))}
+        try:
+            response = self.set_file_redis(files, data)
+        except FileValidationError:
+            LOGGER.warning("Unable to offload audit rows, keeping them inline", extra=self.header_details)
+            return None
+
+        if response.get("status") != "success":
+            LOGGER.warning(f"Audit rows not stored: {response}, keeping them inline", extra=self.header_details)
+            return None
+
+        key = response.get("key", key)
+        self.redis_keys.update({key: key})
+        return key
+
+    def audit_document(self, rows: List[dict], files: str, **summary) -> jsoncodec.EmbeddedJSON:
+        """
+        Audit json with the masked participant rows and the summary. When
+        AUDIT_OFFLOAD_ROWS is set and exceeded the rows are written to the
+        docstore and the audit carries `auditRedisKey` instead. Rows of the
+        verified windows already in the docstore are listed in `auditRedisKeys`.
+        Participants reusing a verdict are counted in `participantsReused`.
+        """
+        rows = mask_ssn(rows)
+        if self.reused_verdicts:
+            summary["participantsReused"] = len(self.reused_verdicts)
+        parts = self.audit_parts
+        if parts.rows:
+            return jsoncodec.EmbeddedJSON(
+                {
+                    "MFvsTba": rows,
+                    "auditRedisKeys": parts.keys,
+                    "auditRows": parts.rows + len(rows),
+                    **summary,
+                }
+            )
+
+        if settings.AUDIT_OFFLOAD_ROWS and len(rows) > settings.AUDIT_OFFLOAD_ROWS:
+            key = self.offload_audit_rows(rows, files)
+            if key is not None:
+                LOGGER.info(f"{len(rows)} audit rows stored at {key}", extra=self.header_details)
+                return jsoncodec.EmbeddedJSON(
+                    {"MFvsTba": [], "auditRedisKey": key, "auditRows": len(rows), **summary}
+                )
+
+        return jsoncodec.EmbeddedJSON({"MFvsTba": rows, **summary})
+
     def fetch_file_redis(self, rediskey: str, file_name: str) -> pd.DataFrame:
         """Try to fetch file from redis"""
 
@@ -749,6 +1038,16 @@ class SourceMatch:
             session = Session()
             payload = {"key": quote(rediskey, safe="")}
             headers = create_http_headers_for_new_span()
+            cached = FRAME_CACHE.get(rediskey) if FRAME_CACHE is not None else None
+            if cached is not None and cached.fresh(settings.FRAME_CACHE_TTL):
+                try:
+                    frame = cached.checkout()
+                    LOGGER.info("Using cached frame validated recently", extra=self.header_details)
+                    return frame
+                except FileNotFoundError:
+                    cached = None
+            if cached is not None and cached.etag:
+                headers["If-None-Match"] = cached.etag
             try:
                 LOGGER.info(
                     f"Hitting cache storage at URL: {settings.REDIS_URL} with payload: {payload}",
@@ -761,10 +1060,36 @@ class SourceMatch:
                     self, ERROR_MSG_UNABLE_TO_CONNECT_REDIS, maestro="redis_connect", name=file_name
                 )
 
+            if response.status_code == 304 and cached is not None:
+                try:
+                    frame = cached.checkout()
+                    cached.revalidated()
+                    LOGGER.info("File not modified, using cached frame", extra=self.header_details)
+                    return frame
+                except FileNotFoundError:
+                    LOGGER.warning("Cached frame evicted, fetching file again", extra=self.header_details)
+                    del headers["If-None-Match"]
+                    cached = None
+                    response = session.get(url=settings.REDIS_URL, params=payload, headers=headers)
+
             if response.status_code == 200:
+                if FRAME_CACHE is None:
+                    redis_data_frame = pd.read_pickle(BytesIO(response.content), compression="zip")
+                    LOGGER.info("File fetched successfully", extra=self.header_details)
+                    return redis_data_frame
+
+                digest = content_digest(response.content)
+                if cached is not None and cached.digest == digest:
+                    try:
+                        frame = cached.checkout()
+                        cached.revalidated()
+                        return frame
+                    except FileNotFoundError:
+                        pass
                 redis_data_frame = pd.read_pickle(BytesIO(response.content), compression="zip")
+                cached = FRAME_CACHE.put(rediskey, response.headers.get("ETag"), digest, redis_data_frame)
                 LOGGER.info("File fetched successfully", extra=self.header_details)
-                return redis_data_frame
+                return redis_data_frame if cached is None else cached.checkout()
 
             LOGGER.error(f"Unable to get File/Report {response.content}", extra=self.header_details)
             raise FileValidationError(self, ERROR_MSG_FILE_REPORT, maestro="redis_response", name=file_name)
@@ -794,8 +1119,55 @@ class SourceMatch:
 
         return fields_to_inquire
 
-    def call_tba_inquiry(self, inquiry_data: List[dict], files) -> list:
-        """Call TBA Inquiry bot and get the participants data"""
+    def call_tba_inquiry(self, inquiry_data: dict, files, identifier_type: Optional[str] = None) -> list:
+        """
+        Call TBA Inquiry bot and get the participants data. With the
+        identifier type given, cached participants aren't inquired again.
+        """
+
+        if len(inquiry_data["participants"]) == 0 or not any(
+            len(inquiry_data[inq]) > 0
+            for inq in (
+                "TBA",
+                "tbaNoticeInqConfig",
+                "tbaPendEventInqConfig",
+                "tbaEventHistInqConfig",
+            )
+        ):
+            return [list(), list()]
+
+        if INQUIRY_CACHE is None or identifier_type is None:
+            return self.post_tba_inquiry(inquiry_data, files)
+
+        hits = INQUIRY_CACHE.lookup(self.client_id, identifier_type, inquiry_data)
+        misses = [index for index in range(len(inquiry_data["participants"])) if index not in hits]
+        LOGGER.info(f"TBA Inquiry cache: {len(hits)} hits, {len(misses)} misses", extra=self.header_details)
+        if not misses:
+            return [[hits[index] for index in sorted(hits)], list()]
+
+        inquiry = dict(inquiry_data, participants=[inquiry_data["participants"][index] for index in misses])
+        response = self.post_tba_inquiry(inquiry, files)
+        try:
+            success, failed = response
+            # successes come back in participant order without the failed ones
+            failed_positions = {participant["index"] for participant in failed}
+        except (TypeError, ValueError, KeyError):
+            success, failed_positions = None, set()
+        answered = [index for position, index in enumerate(misses) if position not in failed_positions]
+        if success is None or len(success) != len(answered):
+            LOGGER.warning("Unexpected TBA Inquiry response, not cached", extra=self.header_details)
+            return self.post_tba_inquiry(inquiry_data, files) if hits else response
+
+        fetched = dict(zip(answered, success))
+        INQUIRY_CACHE.store(self.client_id, identifier_type, inquiry_data, fetched)
+        results = {**hits, **fetched}
+        return [
+            [results[index] for index in sorted(results)],
+            [dict(participant, index=misses[participant["index"]]) for participant in failed],
+        ]
+
+    def post_tba_inquiry(self, inquiry_data: dict, files) -> list:
+        """Send an inquiry payload to TBA Inquiry"""
 
         session = Session()
         payload = {
@@ -809,27 +1181,18 @@ class SourceMatch:
             "inquiryData": [inquiry_data],
         }
         response = None
-        if len(inquiry_data["participants"]) == 0 or not any(
-            len(inquiry_data[inq]) > 0
-            for inq in (
-                "TBA",
-                "tbaNoticeInqConfig",
-                "tbaPendEventInqConfig",
-                "tbaEventHistInqConfig",
-            )
-        ):
-            return [list(), list()]
         try:
             headers = create_http_headers_for_new_span()
+            headers["Content-Type"] = settings.CONTENT_TYPE
             LOGGER.info(f"Hitting TBA Inquiry at URL: {settings.TBA_INQUIRY_URL}", extra=self.header_details)
-            response = session.post(url=settings.TBA_INQUIRY_URL, json=payload, headers=headers)
+            response = session.post(url=settings.TBA_INQUIRY_URL, data=jsoncodec.dumpb(payload), headers=headers)
         except Exception as err:
             LOGGER.error(ERROR_MSG_TBAINQUIRY_CONNECT + f"{repr(err)}", extra=self.header_details)
             raise FileValidationError(self, ERROR_MSG_TBAINQUIRY_CONNECT, maestro="inq_connect", name=files)
 
         if response and response.status_code == 200:
             LOGGER.info("Got Response from Inquiry", extra=self.header_details)
-            return response.json()
+            return jsoncodec.response_json(response)
 
         LOGGER.error(ERROR_MSG_UNABLE_GET_RESPONSE_TBAINQUIRY + f" {response.content}", extra=self.header_details)
         raise FileValidationError(self, ERROR_MSG_UNABLE_GET_RESPONSE_TBAINQUIRY, maestro="inq_resp", name=files)
@@ -965,28 +1328,21 @@ class SourceMatch:
         """
         Add internal ID field to TBA in inquiry payload
         """
-        info_path = os.path.join(os.getcwd(), "fileValidation", "static", "internal_info.json")
-        with open(info_path, "r") as internal:
-            internal_info = json.load(internal)
-
-        if client_id not in internal_info.keys() and str(int(client_id)) not in internal_info.keys():
+        info = INTERNAL_ID_REGISTRY.get(client_id)
+        if info is None:
             raise FileValidationError(
                 self, f"{client_id} ID not configured for internal id", maestro="config", name=file_name
             )
 
-        try:
-            info = internal_info[client_id]
-        except KeyError:
-            info = internal_info[str(int(client_id))]
-        INTERNAL_ID.update(
-            {
-                "inquiryName": info["inquiry_name"],
-                "parNM": info["par_nm"],
-                "panelId": str(info["panel_id"]),
-                "identifier": identifier,
-            }
-        )
-        return [INTERNAL_ID]
+        return [
+            dict(
+                INTERNAL_ID,
+                inquiryName=info["inquiry_name"],
+                parNM=info["par_nm"],
+                panelId=str(info["panel_id"]),
+                identifier=identifier,
+            )
+        ]
 
     def add_internal_id(self, response: List[dict]):
         """
@@ -1260,6 +1616,67 @@ class SourceMatch:
                     action_list.append(act)
             return action_list
 
+    def action_fields(self, action: dict, action_status: str) -> dict:
+        """Corrective action fields of the audit rows of a configured action"""
+        correct_action, status = self.get_corrective_action(action["correctAction"], action["satisfied"], action_status)
+        return {
+            "correctiveAction": [correct_action],
+            "conditionName": [action["condition"]],
+            "ifCondition": action["satisfied"],
+            "actionStatus": status,
+            "updateAction": action.get("actions", []),
+        }
+
+    def action_templates(self, actions: List[dict], action_status: str) -> List[dict]:
+        """
+        Action fields of the audit rows of `actions` (see is_cond_available), one row per
+        update action and one for an action without any
+        """
+        templates = list()
+        for action in actions:
+            template = self.action_fields(action, action_status)
+            correct_action = template["correctiveAction"][0]
+            if len(action["actions"]) == 0:
+                templates.append(template)
+
+            for act in action["actions"]:
+                templates.append(
+                    dict(
+                        template,
+                        eventName=act.get("eventName", ""),
+                        effectiveDate=act.get("effectiveFromDate", ""),
+                        rerunEvent=self.check_action([correct_action], (RERUN_EVENT,), act, "reRunEvent"),
+                        noticeCancel=self.check_action([correct_action], (TBA_NOTICE_CANCEL,), act, "tbaNoticeCancel"),
+                        noticeUpdate=self.check_action([correct_action], (TBA_NOTICE_UPDATE,), act, "noticeUpdate"),
+                        pendingEventName=self.check_action(
+                            [correct_action], (TBA_PENDEVNT_CANCEL, TBA_PENDEVNT_UPDATE), act, "pendingEventName"
+                        ),
+                    )
+                )
+        return templates
+
+    def get_action_table(self, match_field: dict) -> dict:
+        """
+        Action fields of the audit rows of a match field per (conditionName, actionStatus),
+        built once per match id. The actionStatus entry alone holds the rows of a condition
+        without actions: one per configured action.
+        """
+        key = str(match_field["id"])
+        if key in self.action_tables:
+            return self.action_tables[key]
+
+        actions = json.loads(match_field["actions"])
+        table = dict()
+        for action_status in ("Failed", "Success"):
+            table[action_status] = [self.action_fields(action, action_status) for action in actions]
+            for condition in {action["condition"] for action in actions}:
+                available = self.is_cond_available(actions, {"conditionName": condition}, action_status)
+                if available:
+                    table[(condition, action_status)] = self.action_templates(available, action_status)
+
+        self.action_tables[key] = table
+        return table
+
     def get_participant_details(
         self,
         field: dict,
@@ -1280,18 +1697,9 @@ class SourceMatch:
             list: containing all the required details
         """
 
-        eff_date = ""
-        event_name = ""
-        rerun_event = ""
-        notice_cancel = list()
-        notice_update = ""
-        if_condition = ""
-        pendevnt_name = ""
         match_field = match_config[field["uniq"]]
+        table = self.get_action_table(match_field)
 
-        field_resp = list()
-
-        _actions = json.loads(match_field["actions"])
         cmn_value = {
             "id": field["id"],
             "uid": self.uid,
@@ -1306,86 +1714,20 @@ class SourceMatch:
             "ruleName": field["ruleName"],
             "ruleFailedOnField": [match_field["mfFieldName"]],
             "reason": field["reason"],
-            "eventName": event_name,
-            "rerunEvent": rerun_event,
-            "noticeCancel": notice_cancel,
-            "noticeUpdate": notice_update,
-            "pendingEventName": pendevnt_name,
-            "effectiveDate": eff_date,
+            "eventName": "",
+            "rerunEvent": "",
+            "noticeCancel": list(),
+            "noticeUpdate": "",
+            "pendingEventName": "",
+            "effectiveDate": "",
             "resultsVarable": field.get("resultsVarable", list()),
             "matchType": match_field["matchType"],
         }
 
-        actions = self.is_cond_available(_actions, field, action_status)
-
-        if actions:
-            for action in actions:
-                condition_name = action["condition"]
-                if_condition = action["satisfied"]
-                correct_action, status = self.get_corrective_action(
-                    action["correctAction"], if_condition, action_status
-                )
-
-                field_value = dict(cmn_value)
-                field_value.update(
-                    {
-                        "correctiveAction": [correct_action],
-                        "conditionName": [condition_name],
-                        "ifCondition": if_condition,
-                        "actionStatus": status,
-                        "updateAction": action.get("actions", []),
-                    }
-                )
-                if len(action["actions"]) == 0:
-                    field_resp.append(field_value)
-
-                for act in action["actions"]:
-                    action_value = dict(field_value)
-                    event_name = act.get("eventName", "")
-                    eff_date = act.get("effectiveFromDate", "")
-
-                    rerun_event = self.check_action([correct_action], (RERUN_EVENT,), act, "reRunEvent")
-                    notice_cancel = self.check_action([correct_action], (TBA_NOTICE_CANCEL,), act, "tbaNoticeCancel")
-                    notice_update = self.check_action([correct_action], (TBA_NOTICE_UPDATE,), act, "noticeUpdate")
-                    pendevnt_name = self.check_action(
-                        [correct_action],
-                        (
-                            TBA_PENDEVNT_CANCEL,
-                            TBA_PENDEVNT_UPDATE,
-                        ),
-                        act,
-                        "pendingEventName",
-                    )
-                    action_value.update(
-                        {
-                            "eventName": event_name,
-                            "effectiveDate": eff_date,
-                            "rerunEvent": rerun_event,
-                            "noticeCancel": notice_cancel,
-                            "noticeUpdate": notice_update,
-                            "pendingEventName": pendevnt_name,
-                        }
-                    )
-                    field_resp.append(action_value)
-
-        else:
-            for action in _actions:
-                cnd_not_found = dict(cmn_value)
-                condition_name = action["condition"]
-                if_cond = action["satisfied"]
-                correct_action, status = self.get_corrective_action(action["correctAction"], if_cond, action_status)
-                cnd_not_found.update(
-                    {
-                        "correctiveAction": [correct_action],
-                        "conditionName": [condition_name],
-                        "ifCondition": if_cond,
-                        "actionStatus": status,
-                        "updateAction": action.get("actions", []),
-                    }
-                )
-                field_resp.append(cnd_not_found)
-
-        return field_resp
+        templates = table.get((field["conditionName"], action_status))
+        if templates is None:
+            templates = table[action_status]
+        return [AuditRow({**cmn_value, **template}) for template in templates]
 
     def get_participant_mismatch_success(
         self,
@@ -1668,11 +2010,9 @@ class SourceMatch:
 
         return required_fields
 
-    def get_another_file_row(
-        self, ppt_id: str, file_name: str, sheet_name: str, identifier_name: str
-    ) -> Tuple[pd.Series, dict]:
+    def get_dest_file_details(self, file_name: str, sheet_name: str, identifier_name: str) -> Optional[dict]:
         """
-        Get destination file row for particular participant
+        Get ksd file details of a destination file/report
         """
         for file_details in self.ksdfiles_details:
             if (
@@ -1680,9 +2020,20 @@ class SourceMatch:
                 and file_details["sheetName"] == sheet_name
                 and file_details["identifierName"] == identifier_name
             ):
-                rdf_frame = file_details["required_frame"]
-                rdf_row = rdf_frame[rdf_frame[file_details["ssn"]] == ppt_id]
-                return rdf_row.iloc[0], file_details
+                return file_details
+        return None
+
+    def get_another_file_row(
+        self, ppt_id: str, file_name: str, sheet_name: str, identifier_name: str
+    ) -> Tuple[pd.Series, dict]:
+        """
+        Get destination file row for particular participant
+        """
+        file_details = self.get_dest_file_details(file_name, sheet_name, identifier_name)
+        if file_details is not None:
+            rdf_frame = file_details["required_frame"]
+            rdf_row = rdf_frame[rdf_frame[file_details["ssn"]] == ppt_id]
+            return rdf_row.iloc[0], file_details
         LOGGER.error(f"{file_name} destination file ({sheet_name, identifier_name}) don't have participant required")
         raise FileValidationError(
             self, "Comparison File/Report don't have common participant(s)", maestro="empty_file", name=file_name
@@ -1813,31 +2164,219 @@ class SourceMatch:
             "tbaFields": tba_fieldd,
         }
 
-    def call_rule_engine(self, ksdfile_deails: List[dict], file_names: str) -> Tuple[list, list]:
+    def get_local_rule(self, rule_name: str) -> Optional[LocalRule]:
+        """
+        Business rule `rule_name` if it can be evaluated in-process
+
+        Returns:
+            Optional[LocalRule]: None if the rule isn't found, is defined more than once or is outside
+            the subset of fileValidation/rules.py
+        """
+        definitions = [
+            rule["rulesDefinitions"][0]
+            for rule in self.rules_config
+            if rule["rulesDefinitions"][0]["validationType"]["valTypeName"].lower() == "business"
+            and rule["rulesDefinitions"][0]["ruleName"] == rule_name
+        ]
+        if len(definitions) != 1:
+            return None
+        return LocalRule.from_definition(definitions[0])
+
+    def evaluate_local_rules(
+        self, sm_details: list, participants: list, match_config: dict, mismatch_data: list, success_data: list
+    ) -> list:
+        """
+        Evaluate the Compare with TBA fields with no rule or a simple one in-process, their results are
+        added to mismatch_data/success_data and their fields removed from the participants
+
+        Returns:
+            list: source matcher details left for the Rule Engine
+        """
+        local = list()
+        for key in sm_details:
+            if match_config[key["id"]]["matchType"].lower() not in COMPARE_TBA:
+                continue
+            if key["ruleName"] == "":
+                local.append((key, None))
+                continue
+            rule = self.get_local_rule(key["ruleName"])
+            if rule is not None:
+                local.append((key, rule))
+
+        evaluated, results = evaluate_rules(local, participants)
+        for participant in results:
+            mismatch, success = self.get_participant_mismatch_success(match_config, participant)
+            mismatch_data.extend(mismatch)
+            success_data.extend(success)
+
+        for participant in participants:
+            for key_id in evaluated:
+                participant["fileFields"].pop(key_id, None)
+                participant["tbaFields"].pop(key_id, None)
+        participants[:] = [participant for participant in participants if participant["fileFields"]]
+        LOGGER.info(f"Evaluated {len(evaluated)} match fields in-process", extra=self.header_details)
+
+        return [key for key in sm_details if key["id"] not in evaluated]
+
+    def missing_participant_row(self, ppt_id: str, ksdfile: dict, dest_name: str) -> dict:
+        """Audit row of a participant the comparison file/report doesn't have"""
+        return {
+            "uid": self.uid,
+            "participantSsn": ppt_id,
+            "internalId": "",
+            "participantName": "",
+            "fileName": ksdfile["fileName"],
+            "sheetName": ksdfile["sheetName"],
+            "dataMismatch": "",
+            "tbaFieldName": "",
+            "mainframeValue": "",
+            "tbaValue": "",
+            "ruleName": "",
+            "ruleFailedOnField": [],
+            "correctiveAction": [HUMAN_IN_LOOP],
+            "conditionName": [],
+            "ifCondition": "",
+            "reason": f"Participant not found in {dest_name}",
+            "eventName": "",
+            "effectiveDate": "",
+            "actionStatus": "",
+        }
+
+    def compare_report_fields(
+        self,
+        sm_details: list,
+        ksdfile: dict,
+        redis_df: pd.DataFrame,
+        match_config: dict,
+        mismatch_data: list,
+        success_data: list,
+    ) -> list:
+        """
+        Compare the report fields without a rule by joining the file with the compared file/report,
+        their results are added to mismatch_data/success_data
+
+        Returns:
+            list: source matcher details left for the Rule Engine
+        """
+        dest_fields = defaultdict(list)
+        for key in sm_details:
+            if key["destFlag"] != "tba" and key["ruleName"] == "":
+                dest_fields[key["destFlag"]].append(key)
+
+        compared = set()
+        for dest_flag, keys in dest_fields.items():
+            dest_ksd_file = self.get_dest_file_details(*dest_flag.split("__"))
+            if dest_ksd_file is None:
+                continue
+            dest_df = dest_ksd_file["required_frame"]
+            pairs = [
+                (key["id"], key["fileFieldName"], key["tbaFieldName"])
+                for key in keys
+                if key["fileFieldName"] in redis_df.columns and key["tbaFieldName"] in dest_df.columns
+            ]
+            if not pairs:
+                continue
+
+            comparison = compare_reports(redis_df, ksdfile["ssn"], dest_df, dest_ksd_file["ssn"], pairs)
+            for participant in comparison.results:
+                mismatch, success = self.get_participant_mismatch_success(match_config, participant)
+                mismatch_data.extend(mismatch)
+                success_data.extend(success)
+            mismatch_data.extend(
+                self.missing_participant_row(ppt_id, ksdfile, dest_ksd_file["fileName"])
+                for ppt_id in comparison.missing_dest
+            )
+            if comparison.missing_source:
+                LOGGER.info(
+                    f"{len(comparison.missing_source)} participant(s) of {dest_ksd_file['fileName']} "
+                    f"not in {ksdfile['fileName']}",
+                    extra=self.header_details,
+                )
+            compared.update(key_id for key_id, _, _ in pairs)
+
+        return [key for key in sm_details if key["id"] not in compared]
+
+    def for_participants(self, ppt_ids, ksdfiles_details: List[dict]) -> Tuple["SourceMatch", List[dict]]:
+        """
+        Copy of the SourceMatch and ksdfiles_details holding only the frame
+        rows and TBA data of ppt_ids, sent to the offload processes
+        """
+        ppt_ids = set(ppt_ids)
+
+        def restrict(ksdfile: dict) -> dict:
+            frame = ksdfile["required_frame"]
+            restricted = dict(ksdfile, required_frame=frame[frame[ksdfile["ssn"]].isin(ppt_ids)])
+            if "tba_frame" in ksdfile:
+                tba_frame = ksdfile["tba_frame"]
+                restricted["tba_frame"] = {ppt: tba_frame[ppt] for ppt in ppt_ids if ppt in tba_frame}
+            return restricted
+
+        restricted = {id(ksdfile): restrict(ksdfile) for ksdfile in ksdfiles_details}
+        matcher = copy.copy(self)
+        matcher.ksdfiles_details = [
+            restricted[id(ksdfile)] if id(ksdfile) in restricted else restrict(ksdfile)
+            for ksdfile in getattr(self, "ksdfiles_details", [])
+        ]
+        matcher.sampled_ppt = list()
+        matcher.delta_fingerprints = dict()
+        matcher.reused_verdicts = dict()
+        matcher.reused_rows = list()
+        matcher.audit_parts = AuditParts()
+        return (matcher, [restricted[id(ksdfile)] for ksdfile in ksdfiles_details])
+
+    def call_rule_engine(
+        self, ksdfile_deails: List[dict], file_names: str, units: Optional[List[dict]] = None
+    ) -> Tuple[list, list]:
         """
-        Call Rule Engine
+        Call Rule Engine for the participants of `units` (every ksd file by default)
         """
         source_match_details = list()
         id_match_config = dict()
         participants = list()
         change_sm = dict()
+        mismatch_data = list()
+        success_data = list()
 
-        for ksdfile in ksdfile_deails:
+        for ksdfile in ksdfile_deails if units is None else units:
             sm_details = self.get_sm_details(ksdfile["identifierName"], ksdfile["fileName"], id_match_config)
             redis_df = ksdfile["required_frame"]
             redis_df = redis_df[redis_df[ksdfile["ssn"]].isin(ksdfile["ppt_list"])]
+            if settings.LOCAL_RULES:
+                sm_details = self.compare_report_fields(
+                    sm_details, ksdfile, redis_df, id_match_config, mismatch_data, success_data
+                )
             redis_df = redis_df.set_index(ksdfile["ssn"], drop=False)
 
             if len(sm_details) > 0:
-                for index, redis_row in redis_df.iterrows():
-                    participants.append(
-                        self.get_file_tba_fields(index, sm_details, redis_row, ksdfile, ksdfile_deails, change_sm)
-                    )
+                if offload.offloaded(len(redis_df)):
+                    unit = next(index for index, detail in enumerate(ksdfile_deails) if detail is ksdfile)
+                    for chunk_participants, chunk_change_sm in offload.run_chunks(
+                        build_rule_participants,
+                        [
+                            (*self.for_participants(chunk.index, ksdfile_deails), sm_details, chunk, unit)
+                            for chunk in offload.chunks(redis_df, settings.OFFLOAD_WORKERS)
+                        ],
+                    ):
+                        participants.extend(chunk_participants)
+                        change_sm.update(chunk_change_sm)
+                else:
+                    for index, redis_row in redis_df.iterrows():
+                        participants.append(
+                            self.get_file_tba_fields(index, sm_details, redis_row, ksdfile, ksdfile_deails, change_sm)
+                        )
 
                 source_match_details.extend(sm_details)
 
         self.update_sm_details(source_match_details, change_sm)
-        session = Session()
+        if settings.LOCAL_RULES:
+            source_match_details = self.evaluate_local_rules(
+                source_match_details, participants, id_match_config, mismatch_data, success_data
+            )
+            if not source_match_details:
+                return (mismatch_data, success_data)
+        if not participants:
+            return (mismatch_data, success_data)
+
         payload = {
             "pjmId": self.pjm_id,
             "phaseId": str(self.phase_id),
@@ -1846,15 +2385,56 @@ class SourceMatch:
             "sourceMatcherDetails": source_match_details,
         }
         LOGGER.info(f"Rule Engine Payload for {file_names}: {payload}", extra=self.header_details)
-        payload.update({"participants": participants})
 
+        size = settings.RULE_ENGINE_BATCH or len(participants)
+        batches = [participants[start : start + size] for start in range(0, len(participants), size)]
+        if len(batches) == 1:
+            responses = [self.post_rule_engine(payload, batches[0], file_names)]
+        else:
+            LOGGER.info(
+                f"Rule Engine request split in {len(batches)} batches of {size} participants",
+                extra=self.header_details,
+            )
+            with futures.ThreadPoolExecutor(max_workers=min(settings.RULE_ENGINE_IN_FLIGHT, len(batches))) as pool:
+                pending = [
+                    pool.submit(contextvars.copy_context().run, self.post_rule_engine, payload, batch, file_names)
+                    for batch in batches
+                ]
+                responses = [request.result() for request in pending]
+        rule_participants = [row for response in responses for row in response["participants"]]
+
+        if offload.offloaded(len(rule_participants)):
+            matcher, _ = self.for_participants([], [])
+            results = offload.run_chunks(
+                build_mismatch_success,
+                [
+                    (matcher, id_match_config, chunk)
+                    for chunk in offload.chunks(rule_participants, settings.OFFLOAD_WORKERS)
+                ],
+            )
+        else:
+            results = [build_mismatch_success(self, id_match_config, rule_participants)]
+        for mismatch, success in results:
+            mismatch_data.extend(mismatch)
+            success_data.extend(success)
+        return (mismatch_data, success_data)
+
+    def post_rule_engine(self, payload: dict, participants: List[dict], file_names: str) -> dict:
+        """
+        Send `payload` with one batch of participants to the Rule Engine. The
+        body is generated while it is sent, gzip compressed with RULE_ENGINE_GZIP.
+        """
+        session = Session()
         try:
             headers = create_http_headers_for_new_span()
             headers["Content-Type"] = settings.CONTENT_TYPE
+            level = settings.RULE_ENGINE_GZIP_LEVEL if settings.RULE_ENGINE_GZIP else None
+            if level is not None:
+                headers["Content-Encoding"] = "gzip"
             LOGGER.info(f"Hitting Rule Engine at URL: {settings.RULE_ENGINE_URL}", extra=self.header_details)
             response = session.post(
                 url=settings.RULE_ENGINE_URL,
-                data=json.dumps(payload),
+                data=jsoncodec.streamed_document(payload, "participants", participants, level=level),
                 headers=headers,
             )
 
@@ -1864,19 +2444,10 @@ class SourceMatch:
 
         if response and response.status_code == 200:
             LOGGER.info("Got Response from Rule Engine", extra=self.header_details)
-            rule_response = response.json()
-            mismatch_data = list()
-            success_data = list()
-            for participant in rule_response["participants"]:
-                mismatch, success = self.get_participant_mismatch_success(id_match_config, participant)
-                mismatch_data.extend(mismatch)
-                success_data.extend(success)
-            return (mismatch_data, success_data)
-        else:
-            LOGGER.error(f"Unable to get response from Rule Engine {response.content}", extra=self.header_details)
-            raise FileValidationError(
-                self, "Unable to get response from Rule Engine", maestro="rule_resp", name=file_names
-            )
+            return jsoncodec.response_json(response)
+
+        LOGGER.error(f"Unable to get response from Rule Engine {response.content}", extra=self.header_details)
+        raise FileValidationError(self, "Unable to get response from Rule Engine", maestro="rule_resp", name=file_names)
 
     def get_complete_request(self):
         """Add required/default keys in tba Update"""
@@ -2305,7 +2876,28 @@ class SourceMatch:
             List[dict]: returns updated rule engine resposne data after TBA Update
         """
 
-        payload_data, used_resp, unused_resp = self.tba_update_payload_data(rule_engine_resp, ksd_files_details)
+        if offload.offloaded(len(rule_engine_resp)):
+            payload_data, used_resp, unused_resp = dict(), list(), list()
+            for chunk_payload, chunk_used, chunk_unused in offload.run_chunks(
+                build_tba_update_payload,
+                [
+                    (*self.for_participants([item["participantSsn"] for item in chunk], ksd_files_details), chunk)
+                    for chunk in offload.chunks(rule_engine_resp, settings.OFFLOAD_WORKERS)
+                ],
+            ):
+                for name, values in chunk_payload.items():
+                    payload_data.setdefault(name, list()).extend(values)
+                used_resp.extend(chunk_used)
+                unused_resp.extend(chunk_unused)
+        else:
+            payload_data, used_resp, unused_resp = self.tba_update_payload_data(rule_engine_resp, ksd_files_details)
+        updated_ppt = set()
+        if INQUIRY_CACHE is not None:
+            identifiers = {str(ksdfile["pptidentifierType"]).lower() for ksdfile in ksd_files_details}
+            updated_ppt = {item["participantSsn"] for item in used_resp} | {
+                strip_pid(identifier, item["participantSsn"]) for item in used_resp for identifier in identifiers
+            }
+            INQUIRY_CACHE.touch(self.client_id, updated_ppt)
         tba_update_config = self.get_complete_request()
         client_id = {"clientId": self.client_id}
         self.process_job_mapping.update(client_id)
@@ -2331,17 +2923,21 @@ class SourceMatch:
             LOGGER.info(f"Hitting TBA Update at URL: {settings.TBA_UPDATE_URL}", extra=self.header_details)
             response = session.post(
                 url=settings.TBA_UPDATE_URL,
-                data=json.dumps(payload),
+                data=jsoncodec.dumpb(payload),
                 headers=headers,
             )
 
         except Exception as err:
             LOGGER.error(f"Unable to connect TBA Update {repr(err)}", extra=self.header_details)
             raise FileValidationError(self, "Unable to connect TBA Update", maestro="update_connect", name=files)
+        finally:
+            # inquiries cached while the update was running are stale as well
+            if updated_ppt:
+                INQUIRY_CACHE.touch(self.client_id, updated_ppt)
 
         if response and response.status_code == 200:
             LOGGER.info("Got Response from TBA Update", extra=self.header_details)
-            update_response = response.json()
+            update_response = jsoncodec.response_json(response)
             if any(
                 item in ("NewUpdate", "TBA_Rerun_response", "TBA_Notice_response", "TBA_pendingevents_response")
                 for item in update_response.keys()
@@ -2572,14 +3168,14 @@ class SourceMatch:
             headers = create_http_headers_for_new_span()
             headers["Content-Type"] = settings.CONTENT_TYPE
             LOGGER.info(f"Hitting Excel Formatter at URL: {settings.EXCEL_FORMATTER_URL}", extra=self.header_details)
-            response = session.post(url=settings.EXCEL_FORMATTER_URL, data=json.dumps(payload), headers=headers)
+            response = session.post(url=settings.EXCEL_FORMATTER_URL, data=jsoncodec.dumpb(payload), headers=headers)
 
         except Exception as err:
             LOGGER.error(f"Unable to connect Excel Formatter {repr(err)}", extra=self.header_details)
             raise FileValidationError(self, "Unable to connect Excel Formatter", maestro="excel_connect", name=files)
 
         if response is not None and response.status_code == 200:
-            response_json = response.json()
+            response_json = jsoncodec.response_json(response)
 
             if response_json["status"].lower() == "success":
                 return response_json["botOutput"]
@@ -2669,8 +3265,10 @@ class SourceMatch:
                 detail.update({"sheetNameWoutSpace": key["sheet_name"]})
                 detail.update({"detailRedisKey": key["key"]})
                 detail.update({"sheetNameWoutSpace": key["sheet_name"]})
+                # the fetched frame shares its values with FRAME_CACHE, the row filter and materialize copy
+                # them before update_output_frame writes into the frame
                 redis_frame = self.fetch_file_redis(key["key"], file_name)
-                redis_frame = redis_frame[pd.notnull(redis_frame[ppt_identifier])]
+                redis_frame = materialize(redis_frame[pd.notnull(redis_frame[ppt_identifier])])
                 redis_frame = redis_frame[redis_frame[ppt_identifier].apply(lambda x: x.strip()) != ""]
                 redis_frame = self.populate_tba_values(redis_frame, _detail)
                 detail.update({"required_frame": redis_frame})
@@ -2986,6 +3584,180 @@ class SourceMatch:
                 temp[participant].update({tuple(set(field_list)): data})
         return temp
 
+    def verify_participants(self, ksdfiles_details: List[dict], files: list) -> Tuple[bool, list, list]:
+        """
+        Inquire the participants of ksdfiles_details, match them and apply the updates
+
+        Returns:
+            Tuple[bool, list, list]: all participants not in TBA, their audit rows and the matched rows
+        """
+        if settings.PIPELINE_WORKERS > 1 and len(ksdfiles_details) > 1:
+            return self.verify_pipelined(ksdfiles_details, files)
+
+        response_from_inquiry = [self.inquire_participants(ksdfile, files) for ksdfile in ksdfiles_details]
+        participant_not_in_tba_flag, audit_resp = self.is_not_in_tba(ksdfiles_details, response_from_inquiry)
+        if participant_not_in_tba_flag:
+            return (True, audit_resp, list())
+
+        rule_audit_resp, rule_success_resp = self.call_rule_engine(ksdfiles_details, ",".join(files))
+
+        full_rule_resp = list()
+        full_rule_resp.extend(rule_audit_resp)
+        full_rule_resp.extend(rule_success_resp)
+        return (False, audit_resp, self.apply_corrective_actions(full_rule_resp, files, ksdfiles_details))
+
+    def inquire_participants(self, ksdfile: dict, files: list) -> dict:
+        """TBA Inquiry of the participants of one ksd file"""
+        LOGGER.info(f"Hitting TBA Inquiry for identifier: ({ksdfile['identifierName']})", extra=self.header_details)
+
+        participant_list, inquiry_payload = self.get_tba_inquiry_payload(
+            file_name=ksdfile["fileName"],
+            file_type=ksdfile["fileType"],
+            redis_frame=ksdfile["required_frame"],
+            identifier_name=ksdfile["identifierName"],
+            redis_pid_name=ksdfile["ssn"],
+            identifier_type=ksdfile["pptidentifierType"],
+        )
+        inquiry_response_details = dict()
+        inquiry_response_details["participant_list"] = participant_list
+        inquiry_response_details["inquiry_response"] = self.call_tba_inquiry(
+            inquiry_data=inquiry_payload,
+            files=",".join(files),
+            identifier_type=str(ksdfile["pptidentifierType"]).lower(),
+        )
+        LOGGER.info(
+            f"Got response from TBA Inquiry for identifier: ({ksdfile['identifierName']})",
+            extra=self.header_details,
+        )
+        return inquiry_response_details
+
+    def reads_other_identifiers(self, ksdfile: dict) -> bool:
+        """True if rules of the ksd file read the TBA data of another identifier"""
+        match_fields, _ = self.get_fields_to_match(ksdfile["fileName"], ksdfile["identifierName"])
+        for field in match_fields:
+            if field["ruleName"] in ("NA", ""):
+                continue
+            _, t_rule_fields = self.get_rules_fields(field, ksdfile["fileName"], "tba")
+            if any(rule_field[-1][-1] != ksdfile["identifierName"] for rule_field in t_rule_fields):
+                return True
+        return False
+
+    def verify_pipelined(self, ksdfiles_details: List[dict], files: list) -> Tuple[bool, list, list]:
+        """
+        verify_participants with every ksd file going through TBA Inquiry and the Rule Engine on its own,
+        in PIPELINE_WORKERS threads. The Rule Engine request of a ksd file is sent as soon as its inquiry
+        is done (once every inquiry is done if its rules read another identifier), corrective actions are
+        applied once all are matched.
+        """
+
+        def inquire(ksdfile: dict) -> Tuple[bool, list]:
+            return self.is_not_in_tba([ksdfile], [self.inquire_participants(ksdfile, files)])
+
+        def match(index: int) -> Tuple[bool, list, list, list]:
+            not_in_tba, audit_resp = inquiries[index].result()
+            if not_in_tba:
+                return (True, audit_resp, list(), list())
+            if self.reads_other_identifiers(ksdfiles_details[index]):
+                futures.wait(inquiries)
+            ksdfile = ksdfiles_details[index]
+            mismatch, success = self.call_rule_engine(ksdfiles_details, ",".join(files), units=[ksdfile])
+            return (False, audit_resp, mismatch, success)
+
+        with futures.ThreadPoolExecutor(max_workers=min(settings.PIPELINE_WORKERS, len(ksdfiles_details))) as pool:
+            # every inquiry is queued before the matches waiting on them
+            inquiries = [pool.submit(contextvars.copy_context().run, inquire, ksdfile) for ksdfile in ksdfiles_details]
+            matches = [
+                pool.submit(contextvars.copy_context().run, match, index) for index in range(len(ksdfiles_details))
+            ]
+            results = [future.result() for future in matches]
+
+        audit_resp = [row for result in results for row in result[1]]
+        if all(result[0] for result in results):
+            return (True, audit_resp, list())
+
+        full_rule_resp = [row for result in results for row in result[2]]
+        full_rule_resp.extend(row for result in results for row in result[3])
+        return (False, audit_resp, self.apply_corrective_actions(full_rule_resp, files, ksdfiles_details))
+
+    def apply_corrective_actions(self, full_rule_resp: list, files: list, ksdfiles_details: List[dict]) -> list:
+        """Add internal ids and apply the file/TBA updates of the matched rows"""
+        self.add_internal_id(full_rule_resp)
+
+        # check for file Update
+        if self.isupdate(full_rule_resp, [FILE_REPORT_UPDATE], ft_flag="file"):
+            full_rule_resp = self.call_file_update(files, full_rule_resp)
+
+        # check for tba Update
+        if self.isupdate(full_rule_resp, CORRECTIVE_ACTIONS):
+            full_rule_resp = self.call_tba_update(
+                pjm_id=self.pjm_id,
+                files=",".join(files),
+                rule_engine_resp=full_rule_resp,
+                ksd_files_details=ksdfiles_details,
+            )
+
+        return full_rule_resp
+
+    def verify_in_windows(self, ksdfiles_details: List[dict], files: list) -> Tuple[bool, list, list]:
+        """
+        Verify every participant VERIFY_WINDOW participants at a time. Only one
+        window's rows, inquiry responses, Rule Engine payload and audit rows are
+        held, the audit rows of each window go to the docstore as it finishes.
+
+        What still grows with the file: the fetched frames (memory mapped with
+        SHARED_FRAME_DIR), one row position per row (`windows`), the sampled
+        participant ids and the failed ones.
+
+        Returns:
+            Tuple[bool, list, list]: all participants not in TBA, no rows are returned
+        """
+        participant_not_in_tba_flag = True
+        total = len(self.sampled_ppt)
+
+        for number, start in enumerate(range(0, total, settings.VERIFY_WINDOW)):
+            window = self.sampled_ppt[start : start + settings.VERIFY_WINDOW]
+            LOGGER.info(
+                f"Verifying participants {start + 1} to {start + len(window)} of {total}", extra=self.header_details
+            )
+            self.ksdfiles_details = [
+                dict(ksdfile, required_frame=select_rows(ksdfile["required_frame"], ksdfile["windows"][number]))
+                for ksdfile in ksdfiles_details
+            ]
+            not_in_tba, window_audit, window_rule = self.verify_participants(self.ksdfiles_details, files)
+            participant_not_in_tba_flag = participant_not_in_tba_flag and not_in_tba
+            window_rule.extend(window_audit)
+            self.store_window(window_rule, window, not not_in_tba, ",".join(files))
+
+        self.ksdfiles_details = ksdfiles_details
+        return (participant_not_in_tba_flag, list(), list())
+
+    def store_window(self, rows: List[dict], window: list, matched: bool, files: str):
+        """
+        Finish the audit rows of a verified window: record the verdicts of its `matched`
+        participants, count its failures and store the masked rows in the docstore
+
+        Raises:
+            FileValidationError: the docstore didn't take the rows
+        """
+        parts = self.audit_parts
+        if matched:
+            self.record_verdicts(rows, self.ksdfiles_details, window)
+        parts.failed.update(
+            row["participantSsn"] for row in rows if row["actionStatus"].lower() not in ("success", NO_ACTION_IS_TAKEN)
+        )
+        parts.human_in_loop = self.is_human_in_loop(rows) or parts.human_in_loop
+        if not rows:
+            return
+
+        rows = mask_ssn(sorted(rows, key=itemgetter("participantSsn", "dataMismatch")))
+        key = self.offload_audit_rows(rows, files, f"part{len(parts.keys) + 1}")
+        if key is None:
+            msg = "Unable to store the audit rows of the verified participants"
+            LOGGER.error(msg, extra=self.header_details)
+            raise FileValidationError(self, msg, maestro="audit_store", name=files)
+        parts.keys.append(key)
+        parts.rows += len(rows)
+
     def get_response(self) -> dict:
         """get_response will call required functions to complete the task"""
 
@@ -3015,7 +3787,7 @@ class SourceMatch:
             self.audit.update({"fileName": ""})
             self.audit.update({"fileType": ""})
             self.audit.update({"createTimestamp": self.create_time_stamp})
-            self.audit.update({"json": json.dumps(audit_response)})
+            self.audit.update({"json": jsoncodec.EmbeddedJSON(audit_response)})
             return {
                 "audit": self.audit,
                 "maestro": {},
@@ -3052,51 +3824,33 @@ class SourceMatch:
                 self, "None of the identifier have match fields", maestro="identifier_mismatch", name=",".join(files)
             )
 
-        response_from_inquiry = list()
         files = list(files)
         sheets = list(sheets)
         files_type = list(files_type)
 
-        for ksdfile in ksdfiles_details:
-
-            LOGGER.info(f"Hitting TBA Inquiry for identifier: ({ksdfile['identifierName']})", extra=self.header_details)
-
-            participant_list, inquiry_payload = self.get_tba_inquiry_payload(
-                file_name=ksdfile["fileName"],
-                file_type=ksdfile["fileType"],
-                redis_frame=ksdfile["required_frame"],
-                identifier_name=ksdfile["identifierName"],
-                redis_pid_name=ksdfile["ssn"],
-                identifier_type=ksdfile["pptidentifierType"],
-            )
-            inquiry_response_details = dict()
-            inquiry_response_details["participant_list"] = participant_list
-            inquiry_response_details["inquiry_response"] = self.call_tba_inquiry(
-                inquiry_data=inquiry_payload, files=",".join(files)
-            )
-            response_from_inquiry.append(inquiry_response_details)
-            LOGGER.info(
-                f"Got response from TBA Inquiry for identifier: ({ksdfile['identifierName']})",
-                extra=self.header_details,
-            )
-
-        participant_not_in_tba_flag, audit_resp = self.is_not_in_tba(ksdfiles_details, response_from_inquiry)
+        if self.verify_all:
+            participant_not_in_tba_flag, audit_resp, full_rule_resp = self.verify_in_windows(ksdfiles_details, files)
+        else:
+            participant_not_in_tba_flag, audit_resp, full_rule_resp = self.verify_participants(ksdfiles_details, files)
 
-        if participant_not_in_tba_flag:
+        # nothing to verify when every participant is unchanged since the last run
+        if participant_not_in_tba_flag and (audit_resp or self.audit_parts.rows or not self.reused_verdicts):
             LOGGER.error(ERROR_MSG_PARTICIPANT_NOT_TBA, extra=self.header_details)
-            audit_response = json.dumps(
-                {
-                    "MFvsTba": mask_ssn(audit_resp),
-                    "status": HUMAN_IN_LOOP,
-                    "statusMessage": ERROR_MSG_PARTICIPANT_NOT_TBA,
-                    "overAllStatus": False,
-                    "fileName": ",".join(files),
-                    "sheetName": ",".join(sheets),
-                    "participants": self.ppt_total,
-                    "participantsVerified": 0,
-                    "participantsSuccess": 0,
-                    "participantsFailed": 0,
-                }
+            self.record_coverage(
+                {ppt["participantSsn"] for ppt in audit_resp} | self.audit_parts.failed, ksdfiles_details
+            )
+            audit_response = self.audit_document(
+                audit_resp,
+                ",".join(files),
+                status=HUMAN_IN_LOOP,
+                statusMessage=ERROR_MSG_PARTICIPANT_NOT_TBA,
+                overAllStatus=False,
+                fileName=",".join(files),
+                sheetName=",".join(sheets),
+                participants=self.ppt_total,
+                participantsVerified=0,
+                participantsSuccess=0,
+                participantsFailed=0,
             )
 
             match_response = {
@@ -3143,59 +3897,42 @@ class SourceMatch:
 
             return response
 
-        rule_audit_resp, rule_success_resp = self.call_rule_engine(ksdfiles_details, ",".join(files))
-
-        full_rule_resp = list()
-        full_rule_resp.extend(rule_audit_resp)
-        full_rule_resp.extend(rule_success_resp)
-        self.add_internal_id(full_rule_resp)
-
-        # check for file Update
-        if self.isupdate(full_rule_resp, [FILE_REPORT_UPDATE], ft_flag="file"):
-            full_rule_resp = self.call_file_update(files, full_rule_resp)
-
-        # check for tba Update
-        if self.isupdate(full_rule_resp, CORRECTIVE_ACTIONS):
-            full_rule_resp = self.call_tba_update(
-                pjm_id=self.pjm_id,
-                files=",".join(files),
-                rule_engine_resp=full_rule_resp,
-                ksd_files_details=ksdfiles_details,
-            )
-
         full_rule_resp.extend(audit_resp)
         LOGGER.info(f"Not_Found_ppt length: {len(audit_resp)}", extra=self.header_details)
+        if not self.verify_all:
+            self.record_verdicts(full_rule_resp, ksdfiles_details)
+        full_rule_resp.extend(self.reused_rows)
 
         # Get set of failed ppt and calculate success ppt from verified
         failed_count = {
             failed["participantSsn"]
             for failed in full_rule_resp
             if failed["actionStatus"].lower() not in ("success", NO_ACTION_IS_TAKEN)
-        }
+        } | self.audit_parts.failed
         self.ppt_failed = len(failed_count)
         self.ppt_success = self.ppt_verified - self.ppt_failed
+        self.record_coverage(failed_count, ksdfiles_details)
         LOGGER.info(
             f"Participants: {self.ppt_verified}\n Success: {self.ppt_success}\n Failed: {self.ppt_failed}",
             extra=self.header_details,
         )
 
-        if self.is_human_in_loop(full_rule_resp):
+        if self.is_human_in_loop(full_rule_resp) or self.audit_parts.human_in_loop:
             sorted_full_resp = sorted(full_rule_resp, key=itemgetter("participantSsn", "dataMismatch"))
             LOGGER.info(f"Human In Loop Response for UID: {self.uid}", extra=self.header_details)
 
-            audit_response = json.dumps(
-                {
-                    "MFvsTba": mask_ssn(sorted_full_resp),
-                    "status": HUMAN_IN_LOOP,
-                    "statusMessage": "Mismatch data found",
-                    "overAllStatus": False,
-                    "fileName": ",".join(files),
-                    "sheetName": ",".join(sheets),
-                    "participants": self.ppt_total,
-                    "participantsVerified": self.ppt_verified,
-                    "participantsSuccess": self.ppt_success,
-                    "participantsFailed": self.ppt_failed,
-                }
+            audit_response = self.audit_document(
+                sorted_full_resp,
+                ",".join(files),
+                status=HUMAN_IN_LOOP,
+                statusMessage="Mismatch data found",
+                overAllStatus=False,
+                fileName=",".join(files),
+                sheetName=",".join(sheets),
+                participants=self.ppt_total,
+                participantsVerified=self.ppt_verified,
+                participantsSuccess=self.ppt_success,
+                participantsFailed=self.ppt_failed,
             )
             self.audit.update({"fileName": ",".join(files)})
             self.audit.update({"fileType": ",".join(files_type)})
@@ -3240,19 +3977,18 @@ class SourceMatch:
             LOGGER.info(f"Success Response for UID: {self.uid}", extra=self.header_details)
             sorted_full_resp = sorted(full_rule_resp, key=itemgetter("participantSsn", "dataMismatch"))
 
-            audit_response = json.dumps(
-                {
-                    "MFvsTba": mask_ssn(sorted_full_resp),
-                    "status": "Success",
-                    "statusMessage": NO_MISMATCH,
-                    "overAllStatus": True,
-                    "fileName": ",".join(files),
-                    "sheetName": ",".join(sheets),
-                    "participants": self.ppt_total,
-                    "participantsVerified": self.ppt_verified,
-                    "participantsSuccess": self.ppt_success,
-                    "participantsFailed": self.ppt_failed,
-                }
+            audit_response = self.audit_document(
+                sorted_full_resp,
+                ",".join(files),
+                status="Success",
+                statusMessage=NO_MISMATCH,
+                overAllStatus=True,
+                fileName=",".join(files),
+                sheetName=",".join(sheets),
+                participants=self.ppt_total,
+                participantsVerified=self.ppt_verified,
+                participantsSuccess=self.ppt_success,
+                participantsFailed=self.ppt_failed,
             )
             self.audit.update({"fileName": ",".join(files)})
             self.audit.update({"fileType": ",".join(files_type)})
@@ -2,12 +2,12 @@
 import json
 import socket
 from django.conf import settings
-from django.http import JsonResponse
 from rest_framework.views import APIView
-from rest_framework.parsers import JSONParser
 from .utils import SourceMatch
 from .helpers import LOGGER, ConfigError
+from .records import KsdFileDetails
 from .serializers import ValidateRequestSerializer
+from utilities.jsoncodec import JSONCodecParser, JSONCodecResponse
 from utilities.zipkinDecorator import zipkin_custom_span
 
 
@@ -15,7 +15,7 @@ class Processing(APIView):
     """Processing is the class responsible for
     processing orchestrator request"""
 
-    parser_classes = (JSONParser,)
+    parser_classes = (JSONCodecParser,)
 
     @zipkin_custom_span
     def post(self, request):
@@ -39,7 +39,7 @@ class Processing(APIView):
                 request_data["clientId"] = serialized_data["ksdConfig"]["processJobMapping"]["clientDetails"]["clientCode"]
                 request_data["clientName"] = serialized_data["ksdConfig"]["processJobMapping"]["clientDetails"]["clientName"]
                 request_data["botOutput"] = serialized_data["botOutput"] # For excel formatter
-                request_data["ksdFileDetails"] = serialized_data["ksdConfig"]["ksdFileDetails"]
+                request_data["ksdFileDetails"] = KsdFileDetails(serialized_data["ksdConfig"]["ksdFileDetails"])
                 botoutput = serialized_data.get("botOutput")
                 request_data["File Formatter"] = botoutput.get("File Formatter", {})
                 request_data["File Validator"] = botoutput.get("File Validator", {})
@@ -85,7 +85,7 @@ class Processing(APIView):
             )
             message = "Some important fields are missing"
 
-            return JsonResponse({"status": "Failed", "statusMessage": message,}, status=400,)
+            return JSONCodecResponse({"status": "Failed", "statusMessage": message,}, request=request, status=400,)
 
         uid = request_data["uid"]
         time_stamp = request_data["createTimeStamp"]
@@ -94,4 +94,4 @@ class Processing(APIView):
         )
         source_match = SourceMatch(request_data, header_details=header_details)
 
-        return JsonResponse(source_match.get_response(), status=200)
+        return JSONCodecResponse(source_match.get_response(), request=request, status=200)
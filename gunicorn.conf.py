@@ -1,6 +1,17 @@
 from gunicorn.http import wsgi
+import multiprocessing
 import os
-from TBASourceMatcherV2.settings import APPLICATION_PORT, WORKERS
+from TBASourceMatcherV2.startup import prewarm, register_in_background
+from TBASourceMatcherV2.settings import (
+    APPLICATION_PORT,
+    GUNICORN_PROFILE,
+    WORKERS,
+    WORKER_CLASS,
+    WORKER_THREADS,
+    WORKER_TIMEOUT,
+    MAX_REQUESTS,
+    MAX_REQUESTS_JITTER,
+)
 
 
 class Response(wsgi.Response):
@@ -14,10 +25,69 @@ class Response(wsgi.Response):
 
 wsgi.Response = Response
 
-workers = WORKERS
 
-# reload for any code changes automatically
-reload = True
+def cpu_workers() -> int:
+    """Workers for I/O bound downstream calls: (2 * cores) + 1"""
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+PROFILES = {
+    # single reloading worker, file watcher only makes sense while developing
+    "dev": {
+        "workers": 1,
+        "worker_class": "sync",
+        "threads": 1,
+        "reload": True,
+        "preload_app": False,
+        "max_requests": 0,
+        "max_requests_jitter": 0,
+        "timeout": WORKER_TIMEOUT,
+    },
+    # gthread threads keep the worker busy while waiting on Redis/TBA
+    # Inquiry/Rule Engine, max_requests recycles workers
+    # to cap pandas memory growth and preload_app forks from a warm master
+    "prod": {
+        "workers": WORKERS or cpu_workers(),
+        "worker_class": WORKER_CLASS,
+        "threads": WORKER_THREADS,
+        "reload": False,
+        "preload_app": True,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS_JITTER,
+        "timeout": WORKER_TIMEOUT,
+    },
+}
+
+if GUNICORN_PROFILE not in PROFILES:
+    raise ValueError(f"Unknown GUNICORN_PROFILE {GUNICORN_PROFILE!r}, expected one of {', '.join(PROFILES)}")
+profile = PROFILES[GUNICORN_PROFILE]
+
+workers = profile["workers"]
+worker_class = profile["worker_class"]
+threads = profile["threads"]
+
+reload = profile["reload"]
+preload_app = profile["preload_app"]
+
+max_requests = profile["max_requests"]
+max_requests_jitter = profile["max_requests_jitter"]
+
+# downstream calls (Rule Engine, TBA Update) can take minutes for big files
+timeout = profile["timeout"]
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    """
+    Register the instance with Eureka from the master, once and after the
+    socket is bound, and import pandas/dateutil and the views there so
+    forked workers start warm
+    """
+    register_in_background()
+    if preload_app:
+        prewarm()
+
 
 app_port = str(APPLICATION_PORT)
 bind = "0.0.0.0:" + app_port
@@ -14,6 +14,15 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
+    if len(sys.argv) > 1 and sys.argv[1] == "runserver":
+        from django.core.management.commands.runserver import Command as runserver
+
+        runserver.default_port = os.getenv("TBA_PORT", os.getenv("APPLICATION_PORT", runserver.default_port))
+        # the autoreloader runs the server in a child process, register from that one only
+        if os.environ.get("RUN_MAIN") == "true" or "--noreload" in sys.argv:
+            from TBASourceMatcherV2.startup import register_in_background
+
+            register_in_background()
     execute_from_command_line(sys.argv)
 
 
@@ -0,0 +1,225 @@
+"""
+Pluggable JSON codec.
+
+Uses orjson or ujson when installed and falls back to the standard library.
+`JSON_CODEC` picks a backend explicitly ("orjson", "ujson", "json"), the
+default "auto" takes the fastest one available. Every backend writes UTF-8
+JSON, turns numpy/pandas scalars into plain values and keeps key order.
+
+`EmbeddedJSON` holds a document that travels as a JSON string inside another
+one (the audit `json`). It is encoded once and spliced into the outer
+document by the response classes instead of being serialized twice.
+"""
+import json
+import re
+import zlib
+from collections.abc import Mapping
+from datetime import date, datetime
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+from TBASourceMatcherV2.settings import JSON_CODEC, RESPONSE_GZIP_LEVEL, RESPONSE_GZIP_MIN_LENGTH
+
+BACKENDS = ("orjson", "ujson", "json")
+# marks where an EmbeddedJSON goes in the outer document
+PLACEHOLDER = "\x01embedded-json-"
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def _default(obj):
+    """Values the backends can't serialize natively (numpy/pandas scalars, dates, mappings)"""
+    if isinstance(obj, EmbeddedJSON):
+        return str(obj)
+    if isinstance(obj, Mapping):
+        return obj.to_dict() if hasattr(obj, "to_dict") else dict(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib():
+    def dumpb(obj) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+    return dumpb, json.loads
+
+
+def _orjson():
+    import orjson
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumpb(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=options)
+
+    return dumpb, orjson.loads
+
+
+def _ujson():
+    import ujson
+
+    def dumpb(obj) -> bytes:
+        return ujson.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+    return dumpb, ujson.loads
+
+
+LOADERS = {"orjson": _orjson, "ujson": _ujson, "json": _stdlib}
+
+
+def select(name: str = "auto") -> tuple:
+    """(backend name, dumpb, loads) for `name`, "auto" tries the fastest first"""
+    candidates = BACKENDS if name == "auto" else (name,)
+    for candidate in candidates:
+        try:
+            return (candidate, *LOADERS[candidate]())
+        except ImportError:
+            continue
+    return ("json", *_stdlib())
+
+
+BACKEND, dumpb, loads = select(JSON_CODEC)
+
+
+def dumps(obj) -> str:
+    """Serialize to str, for values embedded in other documents"""
+    return dumpb(obj).decode("utf-8")
+
+
+def response_json(response):
+    """Decode a `requests` response body"""
+    return loads(response.content)
+
+
+class JSONCodecParser(BaseParser):
+    """DRF parser decoding request bodies with the selected backend"""
+
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as err:
+            raise ParseError(f"JSON parse error - {err}")
+
+
+class EmbeddedJSON:
+    """Document encoded once, rendered as a JSON string inside an outer document"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, value):
+        self.data = dumpb(value)
+
+    def __str__(self):
+        return self.data.decode("utf-8")
+
+
+def _with_placeholders(obj, embedded: list):
+    """Copy of the outer document with every EmbeddedJSON swapped for a placeholder"""
+    if isinstance(obj, EmbeddedJSON):
+        embedded.append(obj)
+        return f"{PLACEHOLDER}{len(embedded) - 1}"
+    if isinstance(obj, Mapping):
+        return {key: _with_placeholders(value, embedded) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_with_placeholders(value, embedded) for value in obj]
+    return obj
+
+
+def document_chunks(obj) -> list:
+    """
+    Encode `obj` as a list of byte chunks. Embedded documents are spliced in
+    as escaped JSON strings without encoding their content again.
+    """
+    embedded = list()
+    remainder = dumpb(_with_placeholders(obj, embedded))
+    chunks = list()
+
+    for index, document in enumerate(embedded):
+        head, remainder = remainder.split(dumpb(f"{PLACEHOLDER}{index}"), 1)
+        chunks.append(head)
+        chunks.append(dumpb(str(document)))
+    chunks.append(remainder)
+
+    return chunks
+
+
+def accepts_gzip(request) -> bool:
+    return bool(ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+
+
+def gzip_chunks(chunks: list, level: int = RESPONSE_GZIP_LEVEL) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return b"".join([compressor.compress(chunk) for chunk in chunks] + [compressor.flush()])
+
+
+def streamed_document(head: dict, key: str, items: list, group: int = 100, level: int = None):
+    """
+    Generate `head` with `items` as its `key` list, encoding `group` items at
+    a time so the whole body never sits in memory. Chunks are gzip compressed
+    at `level` when given.
+    """
+
+    def chunks():
+        yield dumpb(head)[:-1] + (b"," if head else b"") + dumpb(key) + b":["
+        for start in range(0, len(items), group):
+            yield (b"," if start else b"") + dumpb(items[start : start + group])[1:-1]
+        yield b"]}"
+
+    if level is None:
+        return chunks()
+
+    def compressed():
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks():
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    return compressed()
+
+
+class JSONCodecRenderer(BaseRenderer):
+    """DRF renderer encoding responses with the selected backend"""
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return b"".join(document_chunks(data))
+
+
+class JSONCodecResponse(HttpResponse):
+    """
+    `JsonResponse` counterpart encoding with the selected backend. Given the
+    `request`, bodies of at least RESPONSE_GZIP_MIN_LENGTH bytes are gzip
+    compressed when the client accepts it.
+    """
+
+    def __init__(self, data, request=None, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        chunks = document_chunks(data)
+        compress = (
+            request is not None
+            and sum(len(chunk) for chunk in chunks) >= RESPONSE_GZIP_MIN_LENGTH
+            and accepts_gzip(request)
+        )
+        super().__init__(content=gzip_chunks(chunks) if compress else b"".join(chunks), **kwargs)
+
+        if compress:
+            self["Content-Encoding"] = "gzip"
+        if request is not None:
+            patch_vary_headers(self, ("Accept-Encoding",))
@@ -13,8 +13,7 @@ host : name of kafka Server
 import json
 import logging
 import socket
-
-from kafka import KafkaProducer
+import threading
 
 PROJECT_NAME = "TBASourceMatcher"
 
@@ -24,12 +23,25 @@ class KafkaHandler(logging.Handler):
 
     def __init__(self, host, topic):
         logging.Handler.__init__(self)
-        self.producer = KafkaProducer(
-            bootstrap_servers=host,
-            client_id=PROJECT_NAME,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-        )
+        self.host = host
         self.topic = topic
+        self._producer = None
+        self._producer_lock = threading.Lock()
+
+    @property
+    def producer(self):
+        """Connect to kafka on first emit instead of at import time."""
+        if self._producer is None:
+            with self._producer_lock:
+                if self._producer is None:
+                    from kafka import KafkaProducer
+
+                    self._producer = KafkaProducer(
+                        bootstrap_servers=self.host,
+                        client_id=PROJECT_NAME,
+                        value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+                    )
+        return self._producer
 
     # except Exception as e:
     #     print(f"Kafka not working. Error:{e}")
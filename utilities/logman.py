@@ -24,6 +24,11 @@ print(f"KT: {KAFKA_TOPIC}\nKA: {KAFKA_ADDRESS}")
 class CustomHandler(handlers.RotatingFileHandler):
     """handles file rollover"""
 
+    def _open(self):
+        """Create the log folder on first write (handler is created with delay=True)"""
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
     def doRollover(self):
         """
         Do a rollover, as described in __init__().
@@ -90,13 +95,13 @@ def logman(logname="", loglevel=LOGLEVEL):
     logger.setLevel(loglevel)
 
     # ----------------ADD ROTATING FILE HANDLER-------------------------------
-    # check if there is a log folder to write to
-    if not os.path.isdir(os.path.join(os.getcwd(), "logs")):
-        os.mkdir(os.path.join(os.getcwd(), "logs"))
+    # log folder and file are created lazily on the first record
     name_of_logfile = "Sourcematch.log"
     path_of_logfile = os.path.join(os.getcwd(), "logs", name_of_logfile)
     # create and add the rHandler
-    rfh = CustomHandler(filename=path_of_logfile, mode="a+", maxBytes=1024 * 1024 * 50, backupCount=10)
+    rfh = CustomHandler(
+        filename=path_of_logfile, mode="a+", maxBytes=1024 * 1024 * 50, backupCount=10, delay=True
+    )
     rfh.setLevel(loglevel)
     rfh.setFormatter(logging.Formatter(json_log_format))
     logger.addHandler(rfh)
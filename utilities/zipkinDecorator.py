@@ -1,53 +1,217 @@
 import functools
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
 import requests
 
+from py_zipkin.encoding import Encoding
+from py_zipkin.storage import get_default_tracer
 from py_zipkin.transport import BaseTransportHandler
 from py_zipkin.zipkin import ZipkinAttrs, zipkin_span
 
-from TBASourceMatcherV2.settings import ZIPKIN_URL, ZIPKIN_SPAN, ZIPKIN_SAMPLE_RATE
+from TBASourceMatcherV2.settings import (
+    ZIPKIN_URL,
+    ZIPKIN_SPAN,
+    ZIPKIN_SAMPLE_RATE,
+    ZIPKIN_QUEUE_SIZE,
+    ZIPKIN_BATCH_SIZE,
+    ZIPKIN_FLUSH_INTERVAL,
+)
+
+LOGGER = logging.getLogger(__name__)
 
 zipkin_span_port = ZIPKIN_SPAN
 zipkin_span_sample_rate = ZIPKIN_SAMPLE_RATE
 
+SAMPLED_VALUES = ("1", "true", "d")
+NOT_SAMPLED_VALUES = ("0", "false")
+
 
 class HttpTransport(BaseTransportHandler):
-    """Override the default handle for Zipkin."""
+    """
+    Asynchronous batching transport for Zipkin.
+
+    Encoded span lists (V2 JSON) are put on a bounded queue and shipped by a
+    background thread, either when `batch_size` payloads are waiting or
+    `flush_interval` seconds after the first one of a batch arrived. When the
+    queue is full new spans are dropped instead of blocking the request, the
+    sender logs how many were dropped.
+    """
+
+    def __init__(
+        self,
+        url: str = ZIPKIN_URL,
+        queue_size: int = ZIPKIN_QUEUE_SIZE,
+        batch_size: int = ZIPKIN_BATCH_SIZE,
+        flush_interval: float = ZIPKIN_FLUSH_INTERVAL,
+    ):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._reported = 0
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
 
     def get_max_payload_bytes(self):
         return None
 
+    def _ensure_worker(self):
+        """Start the sender thread once per process (gunicorn forks after import)."""
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="zipkin-transport", daemon=True)
+            self._worker.start()
+
     def send(self, encoded_span):
-        # print("Sending Payload to Zipkin.")
-        # try:
-        #     requests.post(url=ZIPKIN_URL,
-        #                   data=encoded_span,
-        #                   headers={'Content-Type': 'application/x-thrift'},
-        #                   )
-        # except Exception:
-        #     pass
-        pass
+        if not self.url:
+            return
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(encoded_span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _collect(self) -> list:
+        """
+        Block until one payload arrives, then drain up to `batch_size` payloads
+        within `flush_interval` of it.
+        """
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _report_dropped(self):
+        dropped = self.dropped - self._reported
+        if dropped:
+            self._reported += dropped
+            LOGGER.warning(f"{dropped} span payload(s) dropped, the Zipkin queue is full")
+
+    def _run(self):
+        session = requests.Session()
+        while True:
+            batch = self._collect()
+            self._report_dropped()
+            try:
+                session.post(
+                    self.url,
+                    data=merge_json_spans(batch),
+                    headers={"Content-Type": "application/json"},
+                    timeout=5,
+                )
+            except Exception as err:
+                LOGGER.warning(f"Unable to send {len(batch)} span payload(s) to Zipkin: {repr(err)}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until every queued payload has been sent, including the batch in flight."""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.queue.all_tasks_done.wait(remaining)
+
+
+def merge_json_spans(payloads: list) -> bytes:
+    """Merge several V2 JSON span lists (``[{...}, ...]``) into a single list."""
+    spans = list()
+    for payload in payloads:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        body = payload.strip()[1:-1].strip()
+        if body:
+            spans.append(body)
+    return b"[" + b",".join(spans) + b"]"
+
+
+TRANSPORT = HttpTransport()
+
+
+def is_sampled(header_value, sample_rate=zipkin_span_sample_rate) -> bool:
+    """
+    Honor the incoming `X-B3-Sampled` flag, otherwise roll the dice with `sample_rate`.
+    """
+    if header_value is not None:
+        value = str(header_value).strip().lower()
+        if value in SAMPLED_VALUES:
+            return True
+        if value in NOT_SAMPLED_VALUES:
+            return False
+    if sample_rate <= 0:
+        return False
+    return sample_rate >= 100 or random.random() * 100 < sample_rate
 
 
 def zipkin_custom_span(func):
     @functools.wraps(func)
     def wrapper_method(self, request, *args, **kwargs):
+        headers = request.headers
+        trace_id = headers.get("X-B3-TraceID")
+        sampled = bool(TRANSPORT.url) and is_sampled(headers.get("X-B3-Sampled"))
 
-        with zipkin_span(
+        if not sampled:
+            # No span bookkeeping, only keep the incoming trace context for downstream headers
+            if not trace_id:
+                return func(self, request, *args, **kwargs)
+            tracer = get_default_tracer()
+            tracer.push_zipkin_attrs(
+                ZipkinAttrs(
+                    trace_id=trace_id,
+                    span_id=headers.get("X-B3-SpanID"),
+                    parent_span_id=headers.get("X-B3-ParentSpanID"),
+                    flags=headers.get("X-B3-Flags", "0"),
+                    is_sampled=False,
+                )
+            )
+            try:
+                return func(self, request, *args, **kwargs)
+            finally:
+                tracer.pop_zipkin_attrs()
+
+        span_args = dict(
             service_name="Rservice",
-            zipkin_attrs=ZipkinAttrs(
-                trace_id=request.headers.get("X-B3-TraceID"),
-                span_id=request.headers.get("X-B3-SpanID"),
-                parent_span_id=request.headers.get("X-B3-ParentSpanID"),
-                flags=request.headers.get("X-B3-Flags"),
-                is_sampled=request.headers.get("X-B3-Sampled"),
-            ),
             span_name="index_service1",
-            transport_handler=HttpTransport().send,
+            transport_handler=TRANSPORT,
             port=zipkin_span_port,
-            sample_rate=zipkin_span_sample_rate,  # Value between 0 and 100.0
-        ):
-            value = func(self, request)
-            # print("ValueResp:", value)
+            encoding=Encoding.V2_JSON,
+        )
+        if trace_id:
+            span_args["zipkin_attrs"] = ZipkinAttrs(
+                trace_id=trace_id,
+                span_id=headers.get("X-B3-SpanID"),
+                parent_span_id=headers.get("X-B3-ParentSpanID"),
+                flags=headers.get("X-B3-Flags", "0"),
+                is_sampled=True,
+            )
+        else:
+            span_args["sample_rate"] = 100.0
+
+        with zipkin_span(**span_args):
+            value = func(self, request, *args, **kwargs)
         return value
 
     return wrapper_method